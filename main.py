@@ -12,18 +12,34 @@ MCP 主入口文件
 创建日期：[请替换为实际创建日期]
 """
 
-import json
 import os
+import sys
+import secrets
 import argparse
 import hashlib
 import webbrowser
 import subprocess
 import time
 import threading
-from mcp.api.client import get_book_list,search_category
+import queue
+import urllib.request
+from mcp.api.client import get_book_list,search_category,book_list_request_stats
 from mcp.scraper.scraper import get_dynamic_page
-from mcp.decoder.decoder import FontDecoder
-from tools.font_ocr_mapping_paddle import generate_ocr_mapping, batch_paddle_easyocr_images, render_char_to_image
+from mcp.decoder.decoder import FontDecoder, fetch_html
+from mcp.orchestrator import StageTracker, run_branches, print_critical_path
+from mcp import tracing
+from mcp.tracing import profile_run
+from mcp.sinks import open_sink, iter_book_records
+from mcp import jsonio
+from mcp.jsonio import load_json, dump_json, loads
+from mcp.history import HistoryStore, make_list_key
+from mcp.decode_cache import DecodeCache
+from mcp.covers import download_covers, parse_rate
+from tools.font_render_utils import render_chars_to_images
+from tools.font_template_match import generate_template_mapping
+
+# 默认从该页面提取字体URL
+DEFAULT_PAGE_URL = 'https://fanqienovel.com/library/all/page_1?sort=hottes'
 
 def recursive_decode(obj, decoder):
     """
@@ -49,8 +65,7 @@ def ensure_char_images_exist(mapping_file_path, font_path):
             print(f"错误: 映射文件不存在: {mapping_file_path}")
             return False
             
-        with open(mapping_file_path, 'r', encoding='utf-8') as f:
-            mapping = json.load(f)
+        mapping = load_json(mapping_file_path)
         
         # 确保ocr_chars目录存在
         ocr_chars_dir = os.path.abspath(os.path.join('tools', 'ocr_chars'))
@@ -75,15 +90,7 @@ def ensure_char_images_exist(mapping_file_path, font_path):
                 return False
                 
             print(f"发现 {len(missing_chars)} 个字符缺少图片，正在生成...")
-            success_count = 0
-            for i, (char, img_path) in enumerate(missing_chars):
-                try:
-                    render_char_to_image(font_path, char, img_path)
-                    success_count += 1
-                    if (i + 1) % 10 == 0 or i + 1 == len(missing_chars):
-                        print(f"进度: {i + 1}/{len(missing_chars)} ({(i + 1) / len(missing_chars) * 100:.1f}%)")
-                except Exception as e:
-                    print(f"生成图片失败: {img_path}, 字符: '{char}', 错误: {e}")
+            success_count = len(render_chars_to_images(font_path, missing_chars))
             
             print(f"图片生成完成，成功: {success_count}/{len(missing_chars)}")
         else:
@@ -96,6 +103,59 @@ def ensure_char_images_exist(mapping_file_path, font_path):
         traceback.print_exc()
         return False
 
+def relay_process_output(process, prefixes):
+    """
+    同时转发子进程的stdout和stderr
+    每个管道由独立线程读取并放入队列，主线程从队列取出打印，任何一个管道写满都不会阻塞另一个
+    子进程退出且两个管道都读完后返回
+    """
+    lines = queue.Queue()
+
+    def reader(name, pipe):
+        try:
+            for raw in iter(pipe.readline, b''):
+                lines.put((name, raw.decode('utf-8', errors='ignore').rstrip()))
+        finally:
+            lines.put((name, None))
+
+    streams = {'stdout': process.stdout, 'stderr': process.stderr}
+    for name, pipe in streams.items():
+        if pipe is not None:
+            threading.Thread(target=reader, args=(name, pipe), daemon=True).start()
+    open_streams = sum(1 for pipe in streams.values() if pipe is not None)
+    while open_streams:
+        try:
+            name, line = lines.get(timeout=1)
+        except queue.Empty:
+            continue
+        if line is None:
+            open_streams -= 1
+        elif line:
+            print(f"{prefixes.get(name, '')} {line}")
+    process.wait()
+
+REVIEW_HOST = '127.0.0.1'
+REVIEW_PORT = 5001
+
+def wait_for_server(host, port, token, timeout=30, process=None, interval=0.05):
+    """
+    轮询 /healthz 直到返回的令牌与启动时传入的一致，返回是否就绪
+    端口被其他进程占用时能连上但令牌不符，不算就绪；process 提前退出（如端口被占用、导入失败）时立即返回False
+    """
+    url = f'http://{host}:{port}/healthz'
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=max(interval * 4, 0.5)) as response:
+                if loads(response.read()).get('token') == token:
+                    return process is None or process.poll() is None
+        except (OSError, ValueError, AttributeError):
+            pass
+        time.sleep(interval)
+    return False
+
 def open_ocr_review_html(mapping_file_path=None, font_path=None):
     """
     启动Flask服务器并打开OCR校验页面
@@ -131,18 +191,28 @@ def open_ocr_review_html(mapping_file_path=None, font_path=None):
     # 使用子进程启动Flask服务器
     try:
         print(f"启动Flask服务器: {server_path}")
+        # 服务器在 /healthz 返回该令牌，据此区分本次启动的进程和占用端口的其他进程
+        token = secrets.token_hex(16)
         flask_process = subprocess.Popen(
-            ['python', server_path],
+            [sys.executable, server_path, '--host', REVIEW_HOST, '--port', str(REVIEW_PORT)],
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+            stderr=subprocess.PIPE,
+            env=dict(os.environ, OCR_REVIEW_TOKEN=token)
         )
         
-        # 等待服务器启动
+        # 等待本次启动的服务器响应存活检查
         print("正在启动Flask服务器...")
-        time.sleep(2)  # 给服务器一些启动时间
+        start = time.time()
+        if not wait_for_server(REVIEW_HOST, REVIEW_PORT, token, process=flask_process):
+            print(f"错误: Flask服务器未能启动，请检查端口 {REVIEW_PORT} 是否被其他进程占用")
+            if flask_process.poll() is None:
+                flask_process.terminate()
+            relay_process_output(flask_process, {'stdout': '[Flask]', 'stderr': '[Flask Error]'})
+            return False
+        print(f"Flask服务器就绪，用时 {time.time() - start:.2f}秒")
         
         # 打开浏览器访问Flask服务
-        url = 'http://localhost:5001/'
+        url = f'http://localhost:{REVIEW_PORT}/'
         print(f"正在打开OCR校验页面: {url}")
         webbrowser.open(url)
         
@@ -159,22 +229,16 @@ def open_ocr_review_html(mapping_file_path=None, font_path=None):
         # 输出一些服务器状态信息
         print("\nFlask服务器已启动")
         print("- 图片目录: tools/ocr_chars")
-        print("- 提示: 如果图片加载缓慢，可以尝试刷新页面或点击'重试加载失败的图片'按钮")
+        print("- 字形图片通过 /sprite.png 精灵图一次加载")
         print("- 提示: 完成校验后，点击'保存为JSON'按钮保存结果")
         print("- 按Ctrl+C退出程序...\n")
         
+        print(f"- 实时日志: {url}logs/stream")
+        
         # 阻止主线程退出，但允许Ctrl+C中断
         try:
             # 输出Flask服务器的输出
-            while True:
-                output = flask_process.stdout.readline().decode('utf-8', errors='ignore').strip()
-                error = flask_process.stderr.readline().decode('utf-8', errors='ignore').strip()
-                if output:
-                    print(f"[Flask] {output}")
-                if error:
-                    print(f"[Flask Error] {error}")
-                if not output and not error:
-                    time.sleep(1)
+            relay_process_output(flask_process, {'stdout': '[Flask]', 'stderr': '[Flask Error]'})
         except KeyboardInterrupt:
             print("接收到退出信号")
         
@@ -185,53 +249,105 @@ def open_ocr_review_html(mapping_file_path=None, font_path=None):
         traceback.print_exc()
         return False
 
-def main():
+def ensure_mapping_file(font_file_path, mapping_file_path, args):
     """
-    主函数
+    映射表不存在（或指定了 --force-ocr-mapping）时按 --mapping-method 生成
+    """
+    if not os.path.exists(mapping_file_path) or args.force_ocr_mapping:
+        print("需要生成OCR映射表...")
+        if args.mapping_method == 'template':
+            generate_template_mapping(font_file_path, mapping_file_path, reference_font=args.reference_font)
+        else:
+            # OCR依赖较重，仅在需要生成映射表时才导入
+            from tools.font_ocr_mapping_paddle import generate_ocr_mapping
+            generate_ocr_mapping(font_file_path, mapping_file_path,
+                                 incremental=args.incremental_ocr, mapping_dir=args.ocr_mapping_dir)
+        print(f"OCR映射表已生成: {mapping_file_path}")
+    else:
+        print(f"OCR映射表已存在: {mapping_file_path}，跳过生成步骤")
+
+def fetch_books_branch(args, tracker):
+    """
+    分支一：从API获取书籍列表，返回待解码的API数据，失败返回None
     """
-    # 解析命令行参数
-    parser = argparse.ArgumentParser(description='番茄小说榜单爬取和解码任务')
-    parser.add_argument('--force-ocr-mapping', action='store_true', help='强制重新生成OCR映射表，即使已存在')
-    parser.add_argument('--ocr-mapping-dir', default='cache/mappings', help='OCR映射表存储目录')
-    parser.add_argument('--api-data-file', default='debug/raw_api_data.json', help='API数据文件路径')
-    parser.add_argument('--review-html', action='store_true', help='生成并打开OCR人工校验页面')
-    args = parser.parse_args()
-    
-    print("开始执行番茄小说榜单爬取和解码任务...")
-    
-    # 1. 从API获取书籍列表
     print("\n--- 步骤 1: 从API获取书籍列表 ---")
-    book_data, api_data_file = get_book_list()
+    with tracker.stage('fetch', 'api'):
+        book_data, _ = get_book_list(api_url=args.api_url, save_raw=not args.no_raw_dump)
     if not book_data:
         print("获取书籍列表失败或数据格式不正确")
-        return
+        return None
     
-    # 如果指定了API数据文件，则使用指定的文件路径
+    # 如果指定了API数据文件，则解码该文件，否则直接使用内存中的数据
     if args.api_data_file and args.api_data_file != 'debug/raw_api_data.json':
-        api_data_file = args.api_data_file
-        print(f"将使用指定的API数据文件: {api_data_file}")
-    
+        print(f"将使用指定的API数据文件: {args.api_data_file}")
+        if not os.path.exists(args.api_data_file):
+            print(f"API数据文件不存在: {args.api_data_file}")
+            return None
+        return load_json(args.api_data_file)
+    return book_data
+
+def save_decoded_json(decoded_json, output_filename):
+    """
+    把解码后的完整数据写成一个JSON文件（默认紧凑格式，--pretty-json 时缩进）
+    """
+    # 如果是dict，按key的Unicode码点升序排序
+    if isinstance(decoded_json, dict):
+        decoded_json = dict(sorted(decoded_json.items(), key=lambda x: ord(x[0]) if isinstance(x[0], str) and len(x[0]) == 1 else float('inf')))
+    dump_json(decoded_json, output_filename)
+
+def write_output(kind, decoded_json):
+    """
+    按输出类型写出解码结果：json 为完整结构，其他为逐条书籍记录
+    """
+    if kind == 'json':
+        output_filename = os.path.join('output', 'decoded_api_data.json')
+        save_decoded_json(decoded_json, output_filename)
+        print(f"解码后的API数据已保存到 {output_filename}")
+    else:
+        with open_sink(kind) as sink:
+            sink.write(iter_book_records(decoded_json))
+        print(f"解码后的 {sink.count} 条书籍记录已写入 {sink.path}")
+
+def prepare_decoder_branch(args, tracker, cancel=None):
+    """
+    分支二：抓取动态页面 → 下载字体 → 准备映射表 → 初始化解码器
+    返回 (decoder, mapping_file_path, font_file_path)，失败返回None
+    cancel（threading.Event）被设置时（如API分支已失败），在下一个阶段开始前放弃并返回None
+    """
+    def cancelled():
+        if cancel is not None and cancel.is_set():
+            print("其他分支已失败，放弃字体处理")
+            return True
+        return False
+
     # 2. 抓取动态页面以获取字体文件信息
     print("\n--- 步骤 2: 抓取动态页面以获取字体 ---")
-    target_url = 'https://fanqienovel.com/library/all/page_1?sort=hottes'
-    html_content = get_dynamic_page(target_url, wait_selector='.book-list', wait_time=10)
+    with tracker.stage('page', 'font'):
+        if args.no_browser:
+            html_content = fetch_html(args.page_url)
+        else:
+            html_content = get_dynamic_page(args.page_url, wait_selector='.book-list', wait_time=10)
     if not html_content:
         print("获取动态页面内容失败")
-        return
+        return None
+
+    if cancelled():
+        return None
 
     # 3. 处理字体映射
     print("\n--- 步骤 3: 处理字体映射 ---")
-    temp_decoder = FontDecoder()
-    font_url = temp_decoder.extract_font_url(html_content)
-    if not font_url:
-        print("无法从HTML提取字体URL")
-        return
-    
-    print(f"提取到字体URL: {font_url}")
-    font_data = temp_decoder.download_font(font_url)
-    if not font_data:
-        print("字体下载失败")
-        return
+    with tracker.stage('font', 'font'):
+        temp_decoder = FontDecoder()
+        font_url = temp_decoder.extract_font_url(html_content)
+        if not font_url:
+            print("无法从HTML提取字体URL")
+            return None
+        
+        print(f"提取到字体URL: {font_url}")
+        font_data = temp_decoder.download_font(font_url)
+        if not font_data:
+            print("字体下载失败")
+            return None
     
     font_hash = hashlib.md5(font_data).hexdigest()[:16]
     font_file_path = os.path.join('cache', 'fonts', f"{font_hash}.otf")
@@ -247,53 +363,186 @@ def main():
     else:
         print(f"字体文件已存在: {font_file_path}")
     
-    if not os.path.exists(mapping_file_path) or args.force_ocr_mapping:
-        print("需要生成OCR映射表...")
-        generate_ocr_mapping(font_file_path, mapping_file_path)
-        print(f"OCR映射表已生成: {mapping_file_path}")
-    else:
-        print(f"OCR映射表已存在: {mapping_file_path}，跳过生成步骤")
+    if cancelled():
+        return None
+    with tracker.stage('mapping', 'font'):
+        ensure_mapping_file(font_file_path, mapping_file_path, args)
     
+    if cancelled():
+        return None
     print("\n--- 步骤 4: 初始化字体解码器并更新映射 ---")
-    decoder = FontDecoder(ocr_mapping_path=mapping_file_path)
-    if not decoder.update_font_mapping(font_path=font_file_path):
-        print("字体映射更新失败，解码结果可能不准确")
+    with tracker.stage('decoder', 'font'):
+        decoder = FontDecoder(ocr_mapping_path=mapping_file_path)
+        if not decoder.update_font_mapping(font_path=font_file_path):
+            print("字体映射更新失败，解码结果可能不准确")
+    return decoder, mapping_file_path, font_file_path
 
-    # 5. 递归替换API数据文件中的所有文本
-    print("\n--- 步骤 5: 全量递归解码API数据文件 ---")
+def run_daemon(args):
+    """
+    守护进程模式：会话、浏览器、解码器常驻，按榜单自适应调度刷新，Ctrl+C退出
+    """
+    from mcp.daemon import RankingDaemon, parse_list_specs
+    lists = parse_list_specs(args.lists)
+    daemon = RankingDaemon(
+        lists,
+        ensure_mapping=lambda font_path, mapping_path: ensure_mapping_file(font_path, mapping_path, args),
+        decode=recursive_decode,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        font_interval=args.font_interval,
+        mapping_dir=args.ocr_mapping_dir,
+        use_browser=not args.no_browser,
+        page_url=args.page_url,
+        api_url=args.api_url,
+        history_path=args.history,
+        decode_cache_path=None if args.no_decode_cache else args.decode_cache,
+    )
+    print(f"守护进程启动，刷新 {len(lists)} 个榜单，结果输出到 {daemon.output_dir}")
     try:
-        if not os.path.exists(api_data_file):
-            print(f"API数据文件不存在: {api_data_file}")
-            return
-        with open(api_data_file, 'r', encoding='utf-8') as f:
-            api_json = json.load(f)
-        decoded_json = recursive_decode(api_json, decoder)
+        daemon.run()
+    except KeyboardInterrupt:
+        print("接收到退出信号")
+    finally:
+        daemon.close()
+    print(f"守护进程已退出: {daemon.stats}，榜单请求: {book_list_request_stats()}")
+
+def build_parser():
+    """
+    命令行参数定义（基准测试等工具复用同一套参数运行主流程）
+    """
+    parser = argparse.ArgumentParser(description='番茄小说榜单爬取和解码任务')
+    parser.add_argument('--force-ocr-mapping', action='store_true', help='强制重新生成OCR映射表，即使已存在')
+    parser.add_argument('--ocr-mapping-dir', default='cache/mappings', help='OCR映射表存储目录')
+    parser.add_argument('--api-data-file', default='debug/raw_api_data.json', help='API数据文件路径')
+    parser.add_argument('--incremental-ocr', action='store_true', help='增量生成OCR映射表，复用历史映射中相同字形的结果')
+    parser.add_argument('--mapping-method', choices=['ocr', 'template'], default='ocr', help='映射表生成方式：ocr(Paddle+EasyOCR) 或 template(参考字体模板匹配，歧义时OCR兜底)')
+    parser.add_argument('--reference-font', default=None, help='模板匹配使用的本地中文参考字体路径，默认自动查找系统字体')
+    parser.add_argument('--sink', action='append', choices=['json', 'ndjson', 'csv', 'sqlite'],
+                        help='解码结果输出格式，可重复指定多个：json(完整结构，默认)、ndjson/csv/sqlite(逐条书籍记录，写到 output/decoded_books.*)')
+    parser.add_argument('--history', default=None, help='榜单历史数据库路径（SQLite），每次爬取只写入发生变化的记录')
+    parser.add_argument('--decode-cache', default=os.path.join('cache', 'decoded_records.sqlite'),
+                        help='解码结果缓存路径（SQLite），按 (book_id, 字体, 原始记录) 缓存，只解码新出现或变化的书籍')
+    parser.add_argument('--no-decode-cache', action='store_true', help='不使用解码结果缓存，每次全量解码')
+    parser.add_argument('--no-raw-dump', action='store_true', help='不保存原始API数据到 debug/raw_api_data.json')
+    parser.add_argument('--sequential', action='store_true', help='按顺序执行各步骤（默认API获取与页面/字体处理并行执行）')
+    parser.add_argument('--review-html', action='store_true', help='生成并打开OCR人工校验页面')
+    parser.add_argument('--daemon', action='store_true', help='守护进程模式：常驻运行并按自适应间隔持续刷新榜单')
+    parser.add_argument('--lists', default='-1:-1:0', help='守护进程刷新的榜单，格式 gender:category_id:sort，多个用逗号分隔')
+    parser.add_argument('--min-interval', type=float, default=60, help='守护进程榜单最短刷新间隔（秒）')
+    parser.add_argument('--max-interval', type=float, default=1800, help='守护进程榜单最长刷新间隔（秒）')
+    parser.add_argument('--font-interval', type=float, default=900, help='守护进程检查字体轮换的间隔（秒）')
+    parser.add_argument('--no-browser', action='store_true', help='直接请求页面HTML获取字体，不启动浏览器')
+    parser.add_argument('--api-url', default=None, help='榜单接口地址（默认番茄小说接口，可指向替身服务器）')
+    parser.add_argument('--page-url', default=DEFAULT_PAGE_URL, help='提取字体URL的榜单页面地址')
+    parser.add_argument('--covers', action='store_true', help='下载解码结果中的书籍封面到 output/covers（按内容去重，已下载的跳过）')
+    parser.add_argument('--cover-bandwidth', type=parse_rate, default=None,
+                        help='下载封面的总带宽上限，如 500K、2M、2MiB/s（字节/秒，按1024进制）')
+    parser.add_argument('--pretty-json', action='store_true', help='JSON文件输出缩进格式（默认紧凑格式）')
+    parser.add_argument('--trace', default=None, help='记录各阶段的span，写出 Chrome trace 格式JSON（chrome://tracing 或 ui.perfetto.dev 打开）')
+    parser.add_argument('--profile', default=None,
+                        help='在性能分析器下运行：以 .prof 结尾时用cProfile，否则用采样分析器写出折叠栈（可生成火焰图）')
+    return parser
+
+def main():
+    """
+    主函数
+    """
+    args = build_parser().parse_args()
+    if args.pretty_json:
+        jsonio.set_pretty(True)
+
+    tracer = tracing.enable() if args.trace else None
+    try:
+        if args.profile:
+            profile_run(lambda: run(args), args.profile)
+        else:
+            run(args)
+    finally:
+        if tracer is not None:
+            tracing.disable()
+            tracer.write_chrome_trace(args.trace)
+            tracing.print_summary(tracer)
+            print(f"阶段追踪已保存到 {args.trace}")
+
+def run(args, tracker=None):
+    """
+    按命令行参数执行守护进程模式或单次爬取流程
+    单次流程完成时返回记录各阶段耗时的 StageTracker，失败返回None
+    """
+    if args.daemon:
+        run_daemon(args)
+        return None
+    
+    print("开始执行番茄小说榜单爬取和解码任务...")
+    tracker = tracker or StageTracker()
+    
+    # 步骤1与步骤2~4互不依赖，默认并行执行，在解码前汇合
+    if args.sequential:
+        api_json = fetch_books_branch(args, tracker)
+        if not api_json:
+            return None
+        prepared = prepare_decoder_branch(args, tracker)
+    else:
+        # 任一分支失败（返回空）即通知另一分支取消并立即结束，不再等待浏览器/OCR
+        cancel = threading.Event()
+        results = run_branches({
+            'api': lambda: fetch_books_branch(args, tracker),
+            'font': lambda: prepare_decoder_branch(args, tracker, cancel=cancel),
+        }, failed=lambda name, result: not result, cancel=cancel)
+        api_json, prepared = results.get('api'), results.get('font')
+        if not api_json:
+            return None
+    if not prepared:
+        return None
+    decoder, mapping_file_path, font_file_path = prepared
+
+    # 5. 递归替换API数据中的所有文本
+    print("\n--- 步骤 5: 全量递归解码API数据 ---")
+    try:
+        with tracker.stage('decode'):
+            if args.no_decode_cache:
+                decoded_json = recursive_decode(api_json, decoder)
+            else:
+                # 字体文件以内容哈希命名
+                font_hash = os.path.splitext(os.path.basename(font_file_path))[0]
+                with DecodeCache(args.decode_cache) as cache:
+                    decoded_json = cache.decode_page(api_json, decoder, font_hash)
+                print(f"解码缓存: 命中 {cache.stats['hits']} 条，新解码 {cache.stats['misses']} 条")
     except Exception as e:
         print(f"解密过程发生错误: {e}")
-        return
+        return None
 
     # 6. 保存解码后的数据
     print("\n--- 步骤 6: 保存解码后的数据 ---")
-    output_filename = os.path.join('output', 'decoded_api_data.json')
-    try:
-        os.makedirs('output', exist_ok=True)
-        # 如果是dict，按key的Unicode码点升序排序
-        if isinstance(decoded_json, dict):
-            sorted_json = dict(sorted(decoded_json.items(), key=lambda x: ord(x[0]) if isinstance(x[0], str) and len(x[0]) == 1 else float('inf')))
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(sorted_json, f, ensure_ascii=False, indent=2)
-        else:
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(decoded_json, f, ensure_ascii=False, indent=2)
-        print(f"解码后的API数据已保存到 {output_filename}")
-    except Exception as e:
-        print(f"保存文件失败: {e}")
+    with tracker.stage('write'):
+        for kind in args.sink or ['json']:
+            try:
+                with tracing.span(f'write.{kind}', 'write'):
+                    write_output(kind, decoded_json)
+            except Exception as e:
+                print(f"保存文件失败({kind}): {e}")
+        if args.history:
+            with HistoryStore(args.history) as history:
+                # 主流程获取的是默认榜单（全部性别、全部分类、最热）
+                result = history.record_crawl(make_list_key(), list(iter_book_records(decoded_json)))
+            print(f"榜单历史已更新: 写入 {result['written']} 条变化，{result['unchanged']} 条未变化，"
+                  f"{result['dropped']} 本跌出榜单")
+
+    if args.covers:
+        print("\n--- 下载书籍封面 ---")
+        with tracker.stage('covers'):
+            stats = download_covers(iter_book_records(decoded_json), max_bandwidth=args.cover_bandwidth)
+        print(f"封面 {stats['unique']} 个：已存在 {stats['skipped']}，签名过期 {stats['expired']}，"
+              f"下载 {stats['downloaded']}，失败 {stats['failed']}")
+
+    print_critical_path(tracker)
 
     if args.review_html:
         # 如果指定了--review-html参数，则启动Flask服务器并打开OCR校验页面
         open_ocr_review_html(mapping_file_path, font_file_path)
     else:
         print("\n任务完成！")
+    return tracker
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步API客户端
+
+功能描述：
+  基于 asyncio + aiohttp 的客户端层：所有请求共用一个连接池，每个请求都有超时，
+  单个进程在一个事件循环上即可同时保持数百个榜单/字体请求，不需要每个请求一个线程。
+  同一时刻的相同榜单请求合并为一次（与同步客户端一致）。
+  aiohttp 为可选依赖，未安装时同步接口（mcp.api.client / mcp.decoder.decoder）不受影响。
+
+模块说明：
+  - AsyncFanqieClient: 持有连接池的异步客户端（async with 使用）
+  - get_book_list_async / download_font_async / fetch_html_async: 三个入口的异步版本
+  - get_book_lists: 同步包装，一次并发获取多个榜单页
+
+示例:
+  async with AsyncFanqieClient(limit=200) as client:
+      pages = await client.get_book_lists([{'gender': 1, 'page_index': i} for i in range(50)])
+"""
+
+import copy
+import time
+import asyncio
+import hashlib
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from mcp.api.client import BOOK_LIST_URL, QUERY_DEFAULTS, HEADERS
+from mcp.decoder.decoder import DEFAULT_HTML_HEADERS
+
+DEFAULT_TIMEOUT = 30
+# 连接池大小（同时打开的连接数上限）
+DEFAULT_LIMIT = 100
+# 视为请求失败（返回None）的异常
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError) if aiohttp is not None else ()
+
+
+class AsyncFanqieClient:
+    """
+    异步客户端：limit 为连接池大小，timeout 为单个请求的总超时（秒）
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT, timeout=DEFAULT_TIMEOUT, api_url=None):
+        if aiohttp is None:
+            raise ImportError("异步客户端需要安装 aiohttp: pip install aiohttp")
+        self.limit = limit
+        self.timeout = timeout
+        self.api_url = api_url or BOOK_LIST_URL
+        self.session = None
+        self._inflight = {}
+        self.stats = {'issued': 0, 'coalesced': 0, 'failed': 0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _options(self, timeout, **options):
+        # 未指定时使用会话的超时（显式传 timeout=None 会关闭超时）
+        if timeout is not None:
+            options['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        return options
+
+    # ---------- 榜单 ----------
+
+    async def _request_book_list(self, params, timeout):
+        options = self._options(timeout, params=params, headers=HEADERS)
+        async with self.session.get(self.api_url, **options) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get_book_list(self, timeout=None, **params):
+        """
+        获取一页榜单，参数同 mcp.api.client.get_book_list（不保存原始数据），失败返回None
+        """
+        unknown = set(params) - set(QUERY_DEFAULTS)
+        if unknown:
+            raise TypeError(f"未知的查询参数: {', '.join(sorted(unknown))}")
+        params = {name: str(value) for name, value in dict(QUERY_DEFAULTS, **params).items()}
+        key = tuple(sorted(params.items()))
+        # [请求任务, 合并到该请求的调用方数]
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.stats['issued'] += 1
+            flight = self._inflight[key] = [asyncio.ensure_future(self._request_book_list(params, timeout)), 0]
+
+            def finished(task):
+                self._inflight.pop(key, None)
+                # 失败按请求计一次，与等待该请求的调用方数量无关
+                if not task.cancelled() and isinstance(task.exception(), REQUEST_ERRORS):
+                    self.stats['failed'] += 1
+                    print(f"请求错误(page_index={params['page_index']}): {task.exception()!r}")
+
+            flight[0].add_done_callback(finished)
+        else:
+            self.stats['coalesced'] += 1
+            flight[1] += 1
+        try:
+            # shield: 某个等待者被取消时不影响其他等待同一请求的调用方
+            result = await asyncio.shield(flight[0])
+        except REQUEST_ERRORS:
+            return None
+        # 请求被合并时各调用方各自持有一份，互不影响（与同步客户端一致）；
+        # 发起方也取副本，因为它可能先于其他调用方恢复执行并修改结果
+        return copy.deepcopy(result) if flight[1] else result
+
+    async def get_book_lists(self, queries, concurrency=None):
+        """
+        并发获取多个榜单页，返回与 queries 顺序一致的结果列表；concurrency 限制同时进行的请求数（默认不超过连接池大小）
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.limit)
+
+        async def fetch(query):
+            async with semaphore:
+                return await self.get_book_list(**query)
+
+        return await asyncio.gather(*(fetch(query) for query in queries))
+
+    # ---------- 字体与页面 ----------
+
+    async def download_font(self, font_url, timeout=None):
+        """
+        下载字体文件，返回二进制内容，失败返回None
+        """
+        if not font_url:
+            return None
+        start_time = time.time()
+        try:
+            async with self.session.get(font_url, **self._options(timeout)) as response:
+                response.raise_for_status()
+                content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats['failed'] += 1
+            print(f"字体下载失败: {e!r}")
+            return None
+        print(f"字体下载成功: {len(content) / 1024:.1f} KB, 耗时 {time.time() - start_time:.2f}秒, "
+              f"md5 {hashlib.md5(content).hexdigest()[:16]}")
+        return content
+
+    async def fetch_html(self, url, headers=None, timeout=None):
+        """
+        获取网页HTML内容，失败返回None
+        """
+        options = self._options(timeout, headers=headers or DEFAULT_HTML_HEADERS)
+        try:
+            async with self.session.get(url, **options) as response:
+                response.raise_for_status()
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats['failed'] += 1
+            print(f"页面获取失败: {e!r}")
+            return None
+
+
+async def _with_client(client, call):
+    if client is not None:
+        return await call(client)
+    async with AsyncFanqieClient() as temp_client:
+        return await call(temp_client)
+
+
+async def get_book_list_async(client=None, **params):
+    """
+    get_book_list 的异步版本；client 为None时临时创建（批量请求时应复用同一个 client）
+    """
+    return await _with_client(client, lambda c: c.get_book_list(**params))
+
+
+async def download_font_async(font_url, client=None, timeout=None):
+    """
+    FontDecoder.download_font 的异步版本
+    """
+    return await _with_client(client, lambda c: c.download_font(font_url, timeout=timeout))
+
+
+async def fetch_html_async(url, headers=None, client=None, timeout=None):
+    """
+    fetch_html 的异步版本
+    """
+    return await _with_client(client, lambda c: c.fetch_html(url, headers=headers, timeout=timeout))
+
+
+def get_book_lists(queries, limit=DEFAULT_LIMIT, timeout=DEFAULT_TIMEOUT, api_url=None):
+    """
+    同步包装：在新的事件循环中并发获取多个榜单页，返回与 queries 顺序一致的结果列表
+    """
+    async def run():
+        async with AsyncFanqieClient(limit=limit, timeout=timeout, api_url=api_url) as client:
+            return await client.get_book_lists(queries)
+    return asyncio.run(run())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量榜单查询
+
+功能描述：
+  MCP客户端一次调用即可获取多个榜单/多页数据：并发请求所有查询，用本地缓存的字体映射解码文本字段，
+  只返回调用方需要的字段（默认不返回简介和带签名的封面地址），大幅减少返回给大模型的数据量和调用次数。
+
+模块说明：
+  - expand_queries: 把查询列表和页码范围展开为完整的查询参数
+  - fetch_current_font_hash: 抓取榜单页面，下载站点当前使用的字体并计算字体哈希
+  - load_cached_decoder: 用 cache/mappings 中指定字体或最新的已校验映射表创建解码器
+  - decoder_font_hash: 解码器实际使用的字体哈希
+  - project_book: 字段投影并解码
+  - get_book_list_batch: 并发执行批量查询
+"""
+
+import os
+import sys
+import glob
+import hashlib
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from mcp.api.client import get_book_list, QUERY_DEFAULTS
+from mcp.decoder.decoder import FontDecoder, fetch_html
+
+# 默认返回的字段（abstract 较长、thumb_url 带签名且会过期，需显式请求）
+DEFAULT_FIELDS = ('book_id', 'book_name', 'author', 'read_count', 'word_count', 'creation_status',
+                  'last_chapter_time')
+# 可能含有加密字符、需要解码的字段
+ENCRYPTED_FIELDS = ('book_name', 'author', 'abstract', 'read_count', 'word_count')
+MAX_QUERIES = 100
+DEFAULT_WORKERS = 8
+DEFAULT_PAGE_URL = 'https://fanqienovel.com/library/all/page_1?sort=hottes'
+
+
+def expand_queries(queries=None, page_range=None, base=None):
+    """
+    展开查询：queries 中每项为 get_book_list 的部分参数，省略的参数取 base 或默认值；
+    page_range=[start, end) 时每个查询展开为多页
+    """
+    base = dict(QUERY_DEFAULTS, **{key: value for key, value in (base or {}).items() if key in QUERY_DEFAULTS})
+    specs = list(queries) if queries else [{}]
+    expanded = []
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError(f"查询必须是对象: {spec!r}")
+        unknown = set(spec) - set(QUERY_DEFAULTS)
+        if unknown:
+            raise ValueError(f"未知的查询参数: {', '.join(sorted(unknown))}")
+        query = dict(base, **spec)
+        if page_range:
+            start, end = int(page_range[0]), int(page_range[1])
+            expanded.extend(dict(query, page_index=index) for index in range(start, end))
+        else:
+            expanded.append(query)
+    if len(expanded) > MAX_QUERIES:
+        raise ValueError(f"单次最多 {MAX_QUERIES} 个查询，当前 {len(expanded)} 个")
+    return expanded
+
+
+def fetch_current_font_hash(page_url=DEFAULT_PAGE_URL, font_dir=os.path.join('cache', 'fonts'), session=None):
+    """
+    抓取榜单页面（不启动浏览器），下载页面引用的字体并返回其哈希（与主流程相同，MD5前16位）；
+    字体文件不在 font_dir 中时顺带保存。页面或字体获取失败时返回None
+    """
+    html_content = fetch_html(page_url, session=session)
+    if not html_content:
+        return None
+    probe = FontDecoder(cache_dir=font_dir, session=session)
+    font_data = probe.download_font(probe.extract_font_url(html_content))
+    if not font_data:
+        return None
+    font_hash = hashlib.md5(font_data).hexdigest()[:16]
+    font_path = os.path.join(font_dir, f"{font_hash}.otf")
+    if not os.path.exists(font_path):
+        with open(font_path, 'wb') as f:
+            f.write(font_data)
+    return font_hash
+
+
+def decoder_font_hash(decoder):
+    """
+    从本地字体文件加载映射的解码器，其 current_font_url 为 local://<hash>.otf，从中取出字体哈希；无法确定时返回None
+    """
+    font_url = getattr(decoder, 'current_font_url', None) or ''
+    if font_url.startswith('local://') and font_url.endswith('.otf'):
+        return font_url[len('local://'):-len('.otf')]
+    return None
+
+
+def load_cached_decoder(mapping_dir=os.path.join('cache', 'mappings'), font_dir=os.path.join('cache', 'fonts'),
+                        font_hash=None):
+    """
+    选取最近修改的、对应字体文件存在的映射表创建解码器，返回 (decoder, font_hash)，没有可用映射时返回 (None, None)
+    font_hash 指定时只使用该字体的映射表；未指定时选中的映射表不一定对应站点当前的字体
+    """
+    if font_hash:
+        mapping_files = [os.path.join(mapping_dir, f"{font_hash}_mapping.json")]
+    else:
+        mapping_files = sorted(glob.glob(os.path.join(mapping_dir, '*_mapping.json')), key=os.path.getmtime,
+                               reverse=True)
+    for mapping_path in mapping_files:
+        if not os.path.exists(mapping_path):
+            continue
+        font_hash = os.path.basename(mapping_path)[:-len('_mapping.json')]
+        font_path = os.path.join(font_dir, f"{font_hash}.otf")
+        if not os.path.exists(font_path):
+            continue
+        decoder = FontDecoder(cache_dir=font_dir, ocr_mapping_path=mapping_path)
+        if decoder.update_font_mapping(font_path=font_path):
+            return decoder, font_hash
+    return None, None
+
+
+def project_book(book, fields, decoder=None):
+    """
+    只保留 fields 中的字段，需要解码的字段用 decoder 解码
+    """
+    projected = {}
+    for field in fields:
+        if field not in book:
+            continue
+        value = book[field]
+        if decoder is not None and field in ENCRYPTED_FIELDS and isinstance(value, str):
+            value = decoder.decrypt_text(value)
+        projected[field] = value
+    return projected
+
+
+def get_book_list_batch(queries=None, page_range=None, base=None, fields=None, decode=True, decoder=None,
+                        max_workers=DEFAULT_WORKERS, api_url=None, page_url=DEFAULT_PAGE_URL, check_font=True):
+    """
+    并发执行批量查询
+
+    参数:
+        queries (list): 查询参数列表，如 [{'gender': 1, 'category_id': 262}, {'gender': 0, 'sort': 1}]
+        page_range (list): 可选，[起始页, 结束页)，每个查询展开为多页
+        base (dict): 所有查询共用的参数
+        fields (list): 返回的书籍字段，默认 DEFAULT_FIELDS
+        decode (bool): 是否用缓存的字体映射解码文本字段
+        decoder: 可选，指定解码器（默认从 cache/mappings 加载）
+        max_workers (int): 并发请求数
+        api_url (str): 接口地址
+        page_url (str): 提取站点当前字体的榜单页面地址
+        check_font (bool): 解码前是否抓取页面确认站点当前字体，优先使用该字体的映射表
+
+    返回:
+        dict: {'success', 'font_hash', 'font_current', 'decoded', 'results': [{'query', 'success', 'has_more', 'total_count', 'books'}]}
+        font_hash 为解码实际使用的字体；font_current 为该字体是否就是站点当前字体（未检查或检查失败时为None），
+        为False时解码结果可能有误
+    """
+    expanded = expand_queries(queries, page_range, base)
+    fields = list(fields or DEFAULT_FIELDS)
+    if not decode:
+        decoder = None
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        current_hash = None
+        if decode and check_font:
+            with contextlib.redirect_stdout(sys.stderr):
+                current_hash = fetch_current_font_hash(page_url, session=session)
+            if current_hash is None:
+                print("无法确认站点当前字体，解码结果可能已过期", file=sys.stderr)
+        if decode and decoder is None:
+            if current_hash:
+                decoder, _ = load_cached_decoder(font_hash=current_hash)
+            if decoder is None:
+                decoder, _ = load_cached_decoder()
+        font_hash = decoder_font_hash(decoder) if decoder is not None else None
+        font_current = None if current_hash is None or decoder is None else font_hash == current_hash
+        if font_current is False:
+            print(f"站点当前字体 {current_hash} 没有映射表，使用的是 {font_hash} 的映射，解码结果可能有误",
+                  file=sys.stderr)
+
+        def fetch(query):
+            data, _ = get_book_list(api_url=api_url, session=session, save_raw=False, **query)
+            return data
+
+        # get_book_list 的进度输出会污染MCP的标准输出，转到标准错误
+        with contextlib.redirect_stdout(sys.stderr):
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(expanded)))) as executor:
+                pages = list(executor.map(fetch, expanded))
+
+    results = []
+    for query, data in zip(expanded, pages):
+        page = data.get('data') if isinstance(data, dict) else None
+        if not isinstance(page, dict):
+            results.append({'query': query, 'success': False, 'books': []})
+            continue
+        results.append({
+            'query': query,
+            'success': True,
+            'has_more': page.get('has_more'),
+            'total_count': page.get('total_count'),
+            'books': [project_book(book, fields, decoder) for book in page.get('book_list') or []],
+        })
+    return {
+        'success': any(result['success'] for result in results),
+        'font_hash': font_hash,
+        'font_current': font_current,
+        'decoded': decoder is not None,
+        'results': results,
+    }
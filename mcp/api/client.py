@@ -8,9 +8,10 @@
   包含请求参数封装、HTTP请求发送、响应解析等核心逻辑
 
 模块说明：
-  - get_book_list: 主接口函数，获取书籍列表数据
+  - get_book_list: 主接口函数，获取书籍列表数据（并发的相同请求合并为一次上游请求）
+  - book_list_request_stats: 实际发出与被合并的榜单请求数
   - main: 命令行入口函数，执行数据获取并保存
-  - mcp_handler: MCP客户端处理函数，支持MCP调用
+  - mcp_handler: MCP客户端处理函数，支持MCP调用（get_book_list / get_book_list_batch / search_category）
 
 作者：[请替换为实际作者]
 创建日期：[请替换为实际创建日期]
@@ -20,11 +21,63 @@ import requests
 import json
 import os
 import sys
+import copy
 from urllib.parse import urlencode
 import re
 
+from mcp.api.singleflight import SingleFlight
+from mcp.tracing import span
+from mcp.jsonio import dump_json, loads
+
+# 书籍列表接口地址，可通过 api_url 参数替换（如指向离线替身服务器）
+BOOK_LIST_URL = "https://fanqienovel.com/api/author/library/book_list/v0/"
+# 榜单查询参数及默认值
+QUERY_DEFAULTS = {
+    'page_count': 20,
+    'page_index': 0,
+    'gender': -1,
+    'category_id': -1,
+    'creation_status': -1,
+    'word_count': -1,
+    'book_type': -1,
+    'sort': 0,
+}
+# 同一时刻的相同榜单请求只向上游发送一次
+_book_list_flight = SingleFlight()
+
+# 请求头
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive'
+}
+
+def book_list_request_stats():
+    """
+    返回 {'issued': 实际发出的请求数, 'coalesced': 合并到进行中请求的调用数}
+    """
+    return _book_list_flight.stats()
+
+def _request_book_list(url, params, session):
+    """
+    发送榜单请求并解析JSON，失败时抛出异常
+    """
+    # 发送GET请求前，打印完整URL
+    full_url = url + '?' + urlencode(params)
+    print(f"请求URL: {full_url}")
+    with span('api.request', 'api', page_index=params.get('page_index')):
+        response = (session or requests).get(url, params=params, headers=HEADERS, timeout=30)
+    response.raise_for_status()  # 检查HTTP错误
+    try:
+        return loads(response.content)
+    except json.JSONDecodeError:
+        print(f"响应内容: {response.text[:500]}...")  # 显示前500个字符
+        raise
+
 def get_book_list(page_count=20, page_index=0, gender=-1, category_id=-1, 
-                 creation_status=-1, word_count=-1, book_type=-1, sort=0):
+                 creation_status=-1, word_count=-1, book_type=-1, sort=0, api_url=None, session=None, save_raw=True):
     """
     获取番茄小说书籍列表
     
@@ -37,11 +90,14 @@ def get_book_list(page_count=20, page_index=0, gender=-1, category_id=-1,
         word_count (int): 书籍总字数，-1表示字数不限
         book_type (int): 书籍类型，-1表示全部
         sort (int): 排序方式，0表示最热，1表示最新，2表示字数最多
+        api_url (str): 接口地址，默认为 BOOK_LIST_URL
+        session (requests.Session): 可选，复用连接的会话，默认每次新建连接
+        save_raw (bool): 是否把原始数据保存到 debug/raw_api_data.json，为False时返回的文件路径为None
         
     返回:
         tuple: (数据字典, 保存的文件路径)，如果失败则返回 (None, None)
     """
-    url = "https://fanqienovel.com/api/author/library/book_list/v0/"
+    url = api_url or BOOK_LIST_URL
     
     # 请求参数
     params = {
@@ -55,24 +111,17 @@ def get_book_list(page_count=20, page_index=0, gender=-1, category_id=-1,
         'sort': sort   # 排序方式，0表示最热，1表示最新，2表示字数最多
     }
     
-    # 设置请求头
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive'
-    }
-    
+    # 相同的url和参数视为同一请求（参数值统一为字符串，1 与 '1' 相同）
+    key = (url, tuple(sorted((name, str(value)) for name, value in params.items())))
     try:
-        # 发送GET请求前，打印完整URL
-        full_url = url + '?' + urlencode(params)
-        print(f"请求URL: {full_url}")
-        response = requests.get(url, params=params, headers=headers, timeout=30)
-        response.raise_for_status()  # 检查HTTP错误
+        data, shared = _book_list_flight.do(key, lambda: _request_book_list(url, params, session))
+        if shared:
+            # 各调用方各自持有一份，互不影响
+            data = copy.deepcopy(data)
+            print(f"已合并到进行中的相同请求: page_index={page_index}")
         
-        # 获取JSON数据
-        data = response.json()
+        if not save_raw:
+            return data, None
         
         # 确保debug目录存在
         os.makedirs('debug', exist_ok=True)
@@ -80,8 +129,7 @@ def get_book_list(page_count=20, page_index=0, gender=-1, category_id=-1,
         # 保存原始数据
         output_file = os.path.join('debug', 'raw_api_data.json')
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            dump_json(data, output_file)
             print(f"原始API数据已保存到: {output_file}")
         except Exception as e:
             print(f"保存API数据失败: {e}")
@@ -94,7 +142,6 @@ def get_book_list(page_count=20, page_index=0, gender=-1, category_id=-1,
         return None, None
     except json.JSONDecodeError as e:
         print(f"JSON解析错误: {e}")
-        print(f"响应内容: {response.text[:500]}...")  # 显示前500个字符
         return None, None
     except Exception as e:
         print(f"未知错误: {e}")
@@ -149,18 +196,21 @@ def mcp_handler():
             keyword = input_data.get('keyword', '')
             result = search_category(gender, keyword)
             json.dump({'success': True, 'result': result}, sys.stdout, ensure_ascii=False)
+        elif tool == 'get_book_list_batch':
+            from mcp.api.batch import get_book_list_batch, DEFAULT_WORKERS
+            result = get_book_list_batch(
+                queries=input_data.get('queries'),
+                page_range=input_data.get('page_range'),
+                base=input_data.get('base'),
+                fields=input_data.get('fields'),
+                decode=input_data.get('decode', True),
+                check_font=input_data.get('check_font', True),
+                max_workers=input_data.get('max_workers', DEFAULT_WORKERS),
+            )
+            json.dump(result, sys.stdout, ensure_ascii=False, separators=(',', ':'))
         else:
             # 提取参数，使用默认值
-            params = {
-                'page_count': input_data.get('page_count', 20),
-                'page_index': input_data.get('page_index', 0),
-                'gender': input_data.get('gender', -1),
-                'category_id': input_data.get('category_id', -1),
-                'creation_status': input_data.get('creation_status', -1),
-                'word_count': input_data.get('word_count', -1),
-                'book_type': input_data.get('book_type', -1),
-                'sort': input_data.get('sort', 0)
-            }
+            params = {key: input_data.get(key, default) for key, default in QUERY_DEFAULTS.items()}
             
             # 调用API函数
             data, _ = get_book_list(**params)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）
+
+功能描述：
+  多个MCP客户端或调度任务同时请求同一个榜单时，只向上游发送一次请求：
+  第一个调用方发起请求，同一时刻到达的相同请求等待其完成并共享结果（或异常）。
+  请求完成后立即移除，之后的调用会重新请求，不做结果缓存。
+
+模块说明：
+  - SingleFlight.do: 按key合并并发调用，返回 (结果, 是否复用了其他调用方的请求)
+  - SingleFlight.stats: 实际发出的请求数与被合并的请求数
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    按key合并并发调用，线程安全
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        key 相同的调用正在进行时等待其结果，否则执行 fn()
+        返回 (结果, shared)，shared 为True表示结果来自其他调用方发起的请求；fn 抛出的异常会传给所有等待者
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.issued += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {'issued': self.issued, 'coalesced': self.coalesced}
+
+    def reset_stats(self):
+        with self._lock:
+            self.issued = 0
+            self.coalesced = 0
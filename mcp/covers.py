@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+封面图片批量下载
+
+功能描述：
+  书籍记录中的 thumb_url 带有签名和过期时间（x-expires），过期后无法访问，榜单页面需要把封面保存到本地。
+  一次批量任务完成整次爬取的封面镜像：
+  - 按 thumb_uri 去重（同一本书出现在多个榜单/多页时只下载一次），签名已过期的地址直接跳过
+  - 按内容的 SHA-256 存储（<目录>/<前两位>/<sha256>.<扩展名>），内容相同的封面只存一份
+  - 索引（SQLite）记录 thumb_uri 对应的文件，已下载且文件存在的封面不再请求
+  - 共享连接池并发下载，可限制总带宽
+
+模块说明：
+  - collect_covers: 从书籍记录中收集去重后的 {thumb_uri: thumb_url}
+  - iter_input_records: 读取解码结果JSON、守护进程输出、NDJSON分片中的书籍记录
+  - BandwidthLimiter: 多线程共享的带宽限制
+  - CoverStore: 内容寻址的封面存储及索引
+  - download_covers: 并发下载封面
+
+使用示例:
+  python -m mcp.covers output/decoded_api_data.json output/rankings --workers 16 --max-bandwidth 2M
+"""
+
+import os
+import re
+import glob
+import time
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from mcp.api.client import HEADERS
+from mcp.jsonio import load_json, loads, file_mode_for
+from mcp.sinks import iter_book_records, as_dict
+
+DEFAULT_COVER_DIR = os.path.join('output', 'covers')
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+# 索引每写入这么多条提交一次，中途退出时已下载的封面不会全部丢失索引
+COMMIT_EVERY = 200
+COVER_HEADERS = dict(HEADERS, Accept='image/avif,image/webp,image/apng,image/*,*/*;q=0.8')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    thumb_uri TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# 按文件头识别图片格式
+_MAGIC = [
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+]
+_CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+    'image/heic': '.heic',
+}
+
+
+# 带宽：数字 + 可选单位（K/M/G，可写作 KB、KiB 等，均按1024进制）+ 可选的 /s，不区分大小写
+RATE_PATTERN = re.compile(r'^(\d+(?:\.\d*)?|\.\d+)\s*(?:([KMG])(?:I?B)?|B)?(?:/S)?$')
+RATE_UNITS = {None: 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_rate(text):
+    """
+    解析带宽（字节/秒），如 '500K'、'500KB/s'、'2MiB'、'1048576'；K/KB/KiB 都按1024计
+    空值或0返回None（不限速），无法解析时抛出 ValueError（可直接作为 argparse 的 type）
+    """
+    if text is None or not str(text).strip():
+        return None
+    match = RATE_PATTERN.match(str(text).strip().upper())
+    if match is None:
+        raise ValueError(f"无法解析的带宽: {text!r}（示例: 500K、2M、2MiB/s、1048576）")
+    rate = int(float(match.group(1)) * RATE_UNITS[match.group(2)])
+    return rate or None
+
+
+def url_expires(thumb_url):
+    """
+    签名地址的过期时间（x-expires，Unix时间戳），没有时返回None
+    """
+    values = parse_qs(urlparse(thumb_url).query).get('x-expires')
+    try:
+        return int(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def collect_covers(records):
+    """
+    收集去重后的 {thumb_uri: thumb_url}（按首次出现顺序）；同一 thumb_uri 有多个地址时保留过期时间最晚的
+    没有 thumb_uri 的记录用去掉查询参数的地址作为键
+    """
+    covers = {}
+    for record in records:
+        record = as_dict(record)
+        url = record.get('thumb_url')
+        if not url:
+            continue
+        uri = record.get('thumb_uri') or url.split('?', 1)[0]
+        current = covers.get(uri)
+        if current is None or (url_expires(url) or 0) > (url_expires(current) or 0):
+            covers[uri] = url
+    return covers
+
+
+def iter_input_records(paths):
+    """
+    逐条读取输入文件中的书籍记录：
+      .json   解码结果 {'data': {'book_list': [...]}}，或守护进程输出 {'captured_at', 'data': ...}
+      .ndjson 每行一条记录（分片文件、NDJSON输出）
+      目录    其中所有 .json / .ndjson 文件
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, '*.json')) + glob.glob(os.path.join(path, '*.ndjson')))
+            yield from iter_input_records(files)
+        elif path.endswith('.ndjson'):
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        yield loads(line)
+                    except ValueError:
+                        continue
+        else:
+            data = load_json(path)
+            if isinstance(data, dict) and 'captured_at' in data:
+                data = data.get('data')
+            yield from iter_book_records(data)
+
+
+def guess_extension(content, content_type=None):
+    """
+    按文件头识别图片格式，无法识别时参考 Content-Type
+    """
+    for magic, extension in _MAGIC:
+        if content.startswith(magic):
+            return extension
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return '.webp'
+    mime = (content_type or '').split(';', 1)[0].strip().lower()
+    return _CONTENT_TYPES.get(mime, '.img')
+
+
+class BandwidthLimiter:
+    """
+    多线程共享的带宽限制：每读取一块数据预约相应的传输时间，超出速率时等待
+    """
+
+    def __init__(self, bytes_per_second):
+        self.rate = float(bytes_per_second)
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + amount / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+class CoverStore:
+    """
+    内容寻址的封面存储；index.sqlite 记录 thumb_uri -> 文件，可多线程使用
+    """
+
+    def __init__(self, cover_dir=DEFAULT_COVER_DIR):
+        self.cover_dir = cover_dir
+        os.makedirs(cover_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cover_dir, 'index.sqlite'), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+
+    def lookup(self, thumb_uri):
+        """
+        已下载且文件存在时返回文件的绝对路径，否则返回None
+        """
+        with self._lock:
+            row = self.conn.execute('SELECT path FROM covers WHERE thumb_uri = ?', (thumb_uri,)).fetchone()
+        if row is None:
+            return None
+        path = os.path.join(self.cover_dir, row[0])
+        return path if os.path.exists(path) else None
+
+    def known(self):
+        """
+        返回 {thumb_uri: 相对路径}，用于批量判断是否已下载
+        """
+        with self._lock:
+            return dict(self.conn.execute('SELECT thumb_uri, path FROM covers'))
+
+    def put(self, thumb_uri, content, content_type=None):
+        """
+        保存封面，返回 (文件绝对路径, 是否新写入了文件)；相同内容的文件已存在时只更新索引
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        relative = os.path.join(digest[:2], digest + guess_extension(content, content_type))
+        path = os.path.join(self.cover_dir, relative)
+        created = False
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.cover.', suffix='.tmp', dir=directory)
+            try:
+                # mkstemp 创建的文件为 0o600，改为普通新建文件的权限，便于静态服务器等其他进程读取
+                os.chmod(tmp_path, file_mode_for(path))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                # 多个线程同时下载到相同内容时只有一个写入
+                with self._lock:
+                    created = not os.path.exists(path)
+                    if created:
+                        os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO covers (thumb_uri, sha256, path, size, fetched_at) '
+                              'VALUES (?, ?, ?, ?, ?)', (thumb_uri, digest, relative, len(content), time.time()))
+            self._uncommitted += 1
+            if self._uncommitted >= COMMIT_EVERY:
+                self.conn.commit()
+                self._uncommitted = 0
+        return path, created
+
+    def close(self):
+        if self.conn is not None:
+            with self._lock:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _fetch(session, url, timeout, limiter):
+    with session.get(url, headers=COVER_HEADERS, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        chunks = []
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if limiter is not None:
+                limiter.consume(len(chunk))
+            chunks.append(chunk)
+        return b''.join(chunks), response.headers.get('Content-Type')
+
+
+def download_covers(records, cover_dir=DEFAULT_COVER_DIR, max_workers=DEFAULT_WORKERS, max_bandwidth=None,
+                    timeout=DEFAULT_TIMEOUT, session=None):
+    """
+    批量下载书籍记录中的封面
+
+    参数:
+        records: 书籍记录（dict 或 BookRecord）
+        cover_dir (str): 封面存储目录
+        max_workers (int): 并发下载数（同时也是连接池大小）
+        max_bandwidth (int): 总带宽上限（字节/秒），None 不限速
+        timeout (float): 单个请求超时（秒）
+        session (requests.Session): 可选，复用的会话
+
+    返回:
+        dict: {'unique', 'skipped', 'expired', 'downloaded', 'stored', 'failed', 'bytes', 'seconds'}
+              stored 为新写入的文件数（内容重复的封面只写一次）
+    """
+    start_time = time.time()
+    covers = collect_covers(records)
+    stats = {'unique': len(covers), 'skipped': 0, 'expired': 0, 'downloaded': 0, 'stored': 0, 'failed': 0,
+             'bytes': 0}
+    limiter = BandwidthLimiter(max_bandwidth) if max_bandwidth else None
+    lock = threading.Lock()
+
+    with CoverStore(cover_dir) as store:
+        known = store.known()
+        pending = []
+        now = time.time()
+        for uri, url in covers.items():
+            if uri in known and os.path.exists(os.path.join(cover_dir, known[uri])):
+                stats['skipped'] += 1
+            elif (url_expires(url) or now + 1) <= now:
+                stats['expired'] += 1
+            else:
+                pending.append((uri, url))
+
+        own_session = session is None
+        if own_session:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+        def fetch(item):
+            uri, url = item
+            try:
+                content, content_type = _fetch(session, url, timeout, limiter)
+                _, created = store.put(uri, content, content_type)
+            except (requests.exceptions.RequestException, OSError) as e:
+                print(f"封面下载失败 {uri}: {e}")
+                with lock:
+                    stats['failed'] += 1
+                return
+            with lock:
+                stats['downloaded'] += 1
+                stats['stored'] += int(created)
+                stats['bytes'] += len(content)
+
+        try:
+            if pending:
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+                    list(executor.map(fetch, pending))
+        finally:
+            if own_session:
+                session.close()
+
+    stats['seconds'] = round(time.time() - start_time, 3)
+    return stats
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='批量下载书籍封面')
+    parser.add_argument('inputs', nargs='*', default=[os.path.join('output', 'decoded_api_data.json')],
+                        help='输入：解码结果JSON、守护进程输出目录、NDJSON分片文件或目录（默认 output/decoded_api_data.json）')
+    parser.add_argument('--cover-dir', default=DEFAULT_COVER_DIR, help='封面存储目录')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并发下载数')
+    parser.add_argument('--max-bandwidth', type=parse_rate, default=None,
+                        help='总带宽上限，如 500K、2M、2MiB/s（字节/秒，按1024进制），默认不限')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='单个请求超时（秒）')
+    args = parser.parse_args()
+
+    stats = download_covers(iter_input_records(args.inputs), args.cover_dir, args.workers,
+                            args.max_bandwidth, args.timeout)
+    print(f"封面 {stats['unique']} 个：已存在 {stats['skipped']}，签名过期 {stats['expired']}，"
+          f"下载 {stats['downloaded']}（新文件 {stats['stored']}，{stats['bytes'] / 1024:.1f} KB），"
+          f"失败 {stats['failed']}，耗时 {stats['seconds']:.2f}秒")
+
+
+if __name__ == "__main__":
+    main()
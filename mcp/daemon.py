@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+榜单守护进程
+
+功能描述：
+  常驻运行，保持HTTP会话、浏览器、解码器和映射表常热，按榜单分别调度刷新：
+  上次变化大的榜单缩短刷新间隔，变化小的拉长间隔；字体轮换按单独的较低频率检查，
+  只有字体哈希变化时才生成新映射表（OCR/模板匹配）。
+
+模块说明：
+  - parse_list_specs: 解析 "gender:category_id:sort" 形式的榜单列表
+  - ranking_change_ratio: 计算两次榜单之间的排名变化比例
+  - AdaptiveInterval: 按变化比例调整刷新间隔
+  - RankingDaemon: 调度主循环
+"""
+
+import os
+import time
+import heapq
+import hashlib
+import threading
+import requests
+
+from mcp.api.client import get_book_list
+from mcp.decoder.decoder import FontDecoder, fetch_html
+from mcp.decoder.mapping_store import MappingStore
+from mcp.decode_cache import DecodeCache
+from mcp.history import HistoryStore, make_list_key
+from mcp.sinks import iter_book_records
+from mcp.jsonio import dump_json
+
+DEFAULT_PAGE_URL = 'https://fanqienovel.com/library/all/page_1?sort=hottes'
+# 变化比例高于该值时缩短间隔，低于 LOW_CHANGE 时拉长间隔
+HIGH_CHANGE = 0.2
+LOW_CHANGE = 0.05
+# 调度队列中字体检查任务的键
+FONT_TASK = 'font'
+
+
+def parse_list_specs(specs):
+    """
+    解析 "gender:category_id:sort" 列表（逗号分隔），返回 [(gender, category_id, sort), ...]
+    """
+    keys = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        parts = spec.split(':')
+        if len(parts) != 3:
+            raise ValueError(f"榜单格式应为 gender:category_id:sort，实际为: {spec}")
+        keys.append(tuple(int(part) for part in parts))
+    return keys
+
+
+def list_name(key):
+    return make_list_key(*key)
+
+
+def book_ids(data):
+    books = (data or {}).get('data', {}).get('book_list', [])
+    return [book.get('book_id') for book in books]
+
+
+def ranking_change_ratio(previous, current):
+    """
+    排名变化比例：同一名次上的书籍发生变化的比例（0~1）
+    """
+    size = max(len(previous), len(current))
+    if not size:
+        return 0.0
+    changed = sum(1 for i in range(size)
+                  if i >= len(previous) or i >= len(current) or previous[i] != current[i])
+    return changed / size
+
+
+class AdaptiveInterval:
+    """
+    自适应刷新间隔：变化大时减半，变化小时放大1.5倍，限制在[min_interval, max_interval]内
+    """
+
+    def __init__(self, min_interval, max_interval, initial=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.current = initial if initial is not None else min_interval
+
+    def update(self, change_ratio):
+        if change_ratio > HIGH_CHANGE:
+            self.current = max(self.min_interval, self.current / 2)
+        elif change_ratio < LOW_CHANGE:
+            self.current = min(self.max_interval, self.current * 1.5)
+        return self.current
+
+
+class RankingDaemon:
+    """
+    榜单刷新守护进程
+    ensure_mapping(font_path, mapping_path): 映射表不存在时生成
+    decode(data, decoder): 解码一页API数据
+    history_path: 可选，榜单历史数据库路径，每次刷新后写入变化的记录
+    decode_cache_path: 可选，解码结果缓存路径，未变化的书籍不再重复解码
+    """
+
+    def __init__(self, lists, ensure_mapping, decode, min_interval=60, max_interval=1800, font_interval=900,
+                 output_dir=os.path.join('output', 'rankings'), mapping_dir=os.path.join('cache', 'mappings'),
+                 font_dir=os.path.join('cache', 'fonts'), page_url=DEFAULT_PAGE_URL, api_url=None,
+                 page_count=20, use_browser=True, history_path=None, decode_cache_path=None):
+        self.lists = list(lists)
+        self.ensure_mapping = ensure_mapping
+        self.decode = decode
+        self.font_interval = font_interval
+        self.output_dir = output_dir
+        self.mapping_dir = mapping_dir
+        self.font_dir = font_dir
+        self.page_url = page_url
+        self.api_url = api_url
+        self.page_count = page_count
+        self.use_browser = use_browser
+        self.intervals = {key: AdaptiveInterval(min_interval, max_interval) for key in self.lists}
+        self.last_ids = {}
+        self.session = requests.Session()
+        self.driver = None
+        self.decoder = None
+        self.mapping_store = None
+        self.font_url = None
+        self.font_hash = None
+        self.history = HistoryStore(history_path) if history_path else None
+        self.decode_cache = DecodeCache(decode_cache_path) if decode_cache_path else None
+        self.stop_event = threading.Event()
+        self.stats = {'refreshes': 0, 'refresh_failures': 0, 'font_checks': 0, 'font_changes': 0}
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.font_dir, exist_ok=True)
+        os.makedirs(self.mapping_dir, exist_ok=True)
+
+    # ---------- 字体 ----------
+
+    def fetch_page(self):
+        if not self.use_browser:
+            return fetch_html(self.page_url, session=self.session)
+        from mcp.scraper.scraper import create_chrome_driver, get_dynamic_page
+        if self.driver is None:
+            self.driver = create_chrome_driver()
+        return get_dynamic_page(self.page_url, wait_selector='.book-list', wait_time=10, driver=self.driver)
+
+    def check_font(self):
+        """
+        检查字体是否轮换：字体URL和字体哈希都未变化时直接返回；
+        变化时保存字体、按需生成映射表并切换解码器。返回字体是否发生变化
+        """
+        self.stats['font_checks'] += 1
+        if self.mapping_store is not None:
+            # 顺带同步校验页面对映射表的修改
+            self.mapping_store.refresh()
+        html_content = self.fetch_page()
+        if not html_content:
+            print("获取页面失败，沿用当前字体")
+            return False
+        probe = FontDecoder(cache_dir=self.font_dir, session=self.session) if self.decoder is None else self.decoder
+        font_url = probe.extract_font_url(html_content)
+        if not font_url or font_url == self.font_url:
+            return False
+        font_data = probe.download_font(font_url)
+        if not font_data:
+            return False
+        font_hash = hashlib.md5(font_data).hexdigest()[:16]
+        if font_hash == self.font_hash:
+            # URL变化但字体内容相同，无需重新生成映射
+            self.font_url = font_url
+            return False
+
+        font_path = os.path.join(self.font_dir, f"{font_hash}.otf")
+        if not os.path.exists(font_path):
+            with open(font_path, 'wb') as f:
+                f.write(font_data)
+        mapping_path = os.path.join(self.mapping_dir, f"{font_hash}_mapping.json")
+        self.ensure_mapping(font_path, mapping_path)
+
+        decoder = FontDecoder(cache_dir=self.font_dir, ocr_mapping_path=mapping_path, session=self.session)
+        if not decoder.update_font_mapping(font_path=font_path):
+            print("字体映射更新失败，沿用当前解码器")
+            return False
+        store = MappingStore(mapping_path)
+        decoder.watch_mapping_store(store)
+        print(f"字体已切换: {self.font_hash} -> {font_hash}")
+        self.decoder, self.mapping_store = decoder, store
+        self.font_url, self.font_hash = font_url, font_hash
+        self.stats['font_changes'] += 1
+        return True
+
+    # ---------- 榜单 ----------
+
+    def refresh_list(self, key):
+        """
+        刷新一个榜单并写出解码结果，返回新的刷新间隔
+        """
+        gender, category_id, sort = key
+        interval = self.intervals[key]
+        if self.decoder is None and not self.check_font():
+            print(f"尚无可用的字体映射，跳过榜单 {list_name(key)}")
+            self.stats['refresh_failures'] += 1
+            return interval.current
+        data, _ = get_book_list(page_count=self.page_count, gender=gender, category_id=category_id, sort=sort,
+                                api_url=self.api_url, session=self.session, save_raw=False)
+        if data is None:
+            self.stats['refresh_failures'] += 1
+            return interval.current
+        self.stats['refreshes'] += 1
+        if self.decode_cache is not None:
+            decoded = self.decode_cache.decode_page(data, self.decoder, self.font_hash)
+        else:
+            decoded = self.decode(data, self.decoder)
+        ids = book_ids(data)
+        if key in self.last_ids:
+            ratio = ranking_change_ratio(self.last_ids[key], ids)
+            interval.update(ratio)
+            print(f"榜单 {list_name(key)} 变化比例 {ratio:.0%}，下次刷新间隔 {interval.current:.0f}秒")
+        self.last_ids[key] = ids
+        if self.history is not None:
+            self.history.record_crawl(list_name(key), list(iter_book_records(decoded)))
+        output_path = os.path.join(self.output_dir, f"{list_name(key)}.json")
+        dump_json({'captured_at': time.time(), 'font_hash': self.font_hash, 'data': decoded}, output_path)
+        return interval.current
+
+    # ---------- 调度 ----------
+
+    def run(self, max_cycles=None):
+        """
+        调度主循环；max_cycles 限制执行的任务数（用于测试），stop() 可从其他线程结束循环
+        """
+        now = time.monotonic()
+        # (到期时间, 序号, 任务)，序号保证同一时间到期时字体检查先执行
+        queue = [(now, 0, FONT_TASK)] + [(now, i + 1, key) for i, key in enumerate(self.lists)]
+        heapq.heapify(queue)
+        seq = len(queue)
+        cycles = 0
+        try:
+            while not self.stop_event.is_set() and (max_cycles is None or cycles < max_cycles):
+                due, _, task = heapq.heappop(queue)
+                wait = due - time.monotonic()
+                if wait > 0 and self.stop_event.wait(wait):
+                    break
+                cycles += 1
+                try:
+                    if task == FONT_TASK:
+                        self.check_font()
+                        next_interval = self.font_interval
+                    else:
+                        next_interval = self.refresh_list(task)
+                except Exception as e:
+                    print(f"任务 {task} 执行出错: {e}")
+                    next_interval = self.font_interval if task == FONT_TASK else self.intervals[task].current
+                heapq.heappush(queue, (time.monotonic() + next_interval, seq, task))
+                seq += 1
+        finally:
+            self.close()
+        return cycles
+
+    def stop(self):
+        self.stop_event.set()
+
+    def close(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        if self.decode_cache is not None:
+            self.decode_cache.close()
+            self.decode_cache = None
+        self.session.close()
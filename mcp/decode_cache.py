@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解码结果缓存
+
+功能描述：
+  同一本书会出现在多个页、多个分类和连续多次爬取中，每次都重新解码是浪费。
+  按 (book_id, 字体哈希, 原始记录摘要) 缓存解码后的记录，存储在SQLite中，总大小超过上限时按最近使用时间淘汰。
+  每个字体记录一份当前映射表的摘要，校验页面修改了该字体的映射后，该字体的缓存自动失效。
+
+模块说明：
+  - record_digest: 原始记录的摘要（不含签名图片地址等易变字段）
+  - mapping_digest: 解码映射表的摘要
+  - DecodeCache.decode_records: 批量解码书籍记录，只解码缓存中没有的
+  - DecodeCache.decode_page: 解码整页API数据（外层结构直接解码，book_list 走缓存）
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+
+from mcp.history import VOLATILE_FIELDS
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 淘汰时清理到上限的该比例，避免每次写入都触发淘汰
+EVICT_TARGET = 0.9
+# SQLite 单条语句的参数个数上限较小，批量查询分块进行
+QUERY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    book_id TEXT NOT NULL,
+    font_hash TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    decoded TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (book_id, font_hash, digest)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_used ON entries (used_at);
+CREATE TABLE IF NOT EXISTS fonts (
+    font_hash TEXT PRIMARY KEY,
+    mapping_digest TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def record_digest(record):
+    """
+    原始记录（去掉易变字段）的摘要
+    """
+    stable = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha1(_dumps(stable).encode('utf-8')).hexdigest()
+
+
+def mapping_digest(mapping):
+    """
+    映射表摘要，任一字符的映射变化都会改变摘要
+    """
+    return hashlib.sha1(_dumps(mapping or {}).encode('utf-8')).hexdigest()
+
+
+def decode_value(value, decoder):
+    """
+    递归解码所有字符串（与 main.recursive_decode 一致）
+    """
+    if isinstance(value, dict):
+        return {key: decode_value(item, decoder) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_value(item, decoder) for item in value]
+    if isinstance(value, str):
+        return decoder.decrypt_text(value)
+    return value
+
+
+class DecodeCache:
+    """
+    解码结果缓存，max_bytes 为已解码记录的总大小上限
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0, 'invalidated': 0}
+
+    def bind_mapping(self, font_hash, mapping):
+        """
+        记录字体当前的映射表摘要；与上次不同时删除该字体的全部缓存，返回删除的条数
+        """
+        digest = mapping_digest(mapping)
+        row = self.conn.execute('SELECT mapping_digest FROM fonts WHERE font_hash = ?', (font_hash,)).fetchone()
+        if row and row[0] == digest:
+            return 0
+        with self.conn:
+            removed = self.conn.execute('DELETE FROM entries WHERE font_hash = ?', (font_hash,)).rowcount
+            self.conn.execute('INSERT OR REPLACE INTO fonts (font_hash, mapping_digest) VALUES (?, ?)',
+                              (font_hash, digest))
+        self.stats['invalidated'] += removed
+        return removed
+
+    def _lookup(self, font_hash, keys):
+        """
+        按 book_id 批量查询（走主键前缀），再按摘要筛选
+        """
+        wanted = set(keys)
+        book_ids = sorted({book_id for book_id, _ in wanted})
+        found = {}
+        for start in range(0, len(book_ids), QUERY_CHUNK):
+            chunk = book_ids[start:start + QUERY_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = self.conn.execute(
+                f'SELECT book_id, digest, decoded FROM entries WHERE book_id IN ({placeholders}) AND font_hash = ?',
+                chunk + [font_hash])
+            for book_id, digest, decoded in rows:
+                if (book_id, digest) in wanted:
+                    found[(book_id, digest)] = decoded
+        return found
+
+    def decode_records(self, records, decoder, font_hash):
+        """
+        批量解码书籍记录，顺序与输入一致；只有缓存未命中的记录会调用解码器
+        没有 book_id 的记录直接解码，不缓存
+        """
+        self.bind_mapping(font_hash, decoder.font_mapping)
+        records = list(records)
+        keys = [None if record.get('book_id') is None else (str(record['book_id']), record_digest(record))
+                for record in records]
+        found = self._lookup(font_hash, [key for key in keys if key is not None])
+        now = time.time()
+        results, new_rows, hit_keys = [], {}, set()
+        for record, key in zip(records, keys):
+            cached = found.get(key) if key is not None else None
+            if cached is not None:
+                cached = json.loads(cached)
+                # 易变字段不参与摘要，取本次的原始值（不含加密字符，无需解码）；键顺序与原始记录一致
+                decoded = {name: record[name] if name in VOLATILE_FIELDS else cached[name] for name in record}
+                hit_keys.add(key)
+                self.stats['hits'] += 1
+            else:
+                decoded = decode_value(record, decoder)
+                self.stats['misses'] += 1
+                if key is not None:
+                    text = _dumps({k: v for k, v in decoded.items() if k not in VOLATILE_FIELDS})
+                    new_rows[key] = (key[0], font_hash, key[1], text, len(text.encode('utf-8')), now)
+            results.append(decoded)
+        with self.conn:
+            if hit_keys:
+                self.conn.executemany('UPDATE entries SET used_at = ? WHERE book_id = ? AND font_hash = ? AND digest = ?',
+                                      [(now, book_id, font_hash, digest) for book_id, digest in hit_keys])
+            if new_rows:
+                self.conn.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)', new_rows.values())
+        if new_rows:
+            self.evict()
+        return results
+
+    def decode_page(self, api_json, decoder, font_hash):
+        """
+        解码整页API数据：外层结构直接解码，data.book_list 中的记录走缓存
+        """
+        if not isinstance(api_json, dict) or not isinstance(api_json.get('data'), dict):
+            return decode_value(api_json, decoder)
+        books = api_json['data'].get('book_list')
+        if not isinstance(books, list) or not all(isinstance(book, dict) for book in books):
+            return decode_value(api_json, decoder)
+        decoded = {}
+        for key, value in api_json.items():
+            if key != 'data':
+                decoded[key] = decode_value(value, decoder)
+                continue
+            decoded['data'] = {
+                name: self.decode_records(item, decoder, font_hash) if name == 'book_list' else decode_value(item, decoder)
+                for name, item in value.items()
+            }
+        return decoded
+
+    def total_bytes(self):
+        return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def evict(self):
+        """
+        总大小超过上限时，按最近使用时间从旧到新删除，直到降到上限的 EVICT_TARGET
+        """
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        target = total - int(self.max_bytes * EVICT_TARGET)
+        removed, freed = [], 0
+        for rowid, size in self.conn.execute('SELECT rowid, size FROM entries ORDER BY used_at'):
+            if freed >= target:
+                break
+            removed.append((rowid,))
+            freed += size
+        with self.conn:
+            self.conn.executemany('DELETE FROM entries WHERE rowid = ?', removed)
+        self.stats['evicted'] += len(removed)
+        return len(removed)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -18,7 +18,6 @@
 
 import os
 import re
-import json
 import logging
 import requests
 from fontTools.ttLib import TTFont
@@ -26,6 +25,8 @@ from io import BytesIO
 from bs4 import BeautifulSoup
 import argparse
 import time
+from mcp.tracing import traced
+from mcp.jsonio import load_json, dump_json
 
 # 设置日志
 logging.basicConfig(
@@ -38,9 +39,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger('FontDecoder')
 
+# 请求超时（秒）
+REQUEST_TIMEOUT = 30
+# 请求页面的默认请求头
+DEFAULT_HTML_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0",
+    "Referer": "https://fanqienovel.com/"
+}
+
 class FontDecoder:
-    def __init__(self, cache_dir='cache/fonts', ocr_mapping_path=None):
+    def __init__(self, cache_dir='cache/fonts', ocr_mapping_path=None, session=None):
         self.cache_dir = cache_dir
+        # 可选的requests.Session，用于复用字体下载的连接
+        self.session = session
         self.font_mapping = {}
         self.current_font_url = None
         self.ocr_mapping = None
@@ -55,8 +66,7 @@ class FontDecoder:
         cache_file = os.path.join(self.cache_dir, 'font_mapping_cache.json')
         if os.path.exists(cache_file):
             try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
+                cache = load_json(cache_file)
                 self.font_mapping = cache.get('mapping', {})
                 self.current_font_url = cache.get('last_used_font', '')
                 logger.info(f"从缓存加载了字体映射，包含 {len(self.font_mapping)} 个字符映射")
@@ -69,12 +79,11 @@ class FontDecoder:
         """保存字体映射到缓存"""
         cache_file = os.path.join(self.cache_dir, 'font_mapping_cache.json')
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'last_used_font': self.current_font_url,
-                    'mapping': self.font_mapping,
-                    'timestamp': time.time()
-                }, f, ensure_ascii=False, indent=2)
+            dump_json({
+                'last_used_font': self.current_font_url,
+                'mapping': self.font_mapping,
+                'timestamp': time.time()
+            }, cache_file)
             logger.info(f"字体映射已保存到缓存: {cache_file}")
         except Exception as e:
             logger.error(f"保存缓存失败: {e}")
@@ -111,8 +120,9 @@ class FontDecoder:
         logger.error("无法提取字体URL")
         return None
     
-    def download_font(self, font_url):
-        """下载字体文件并返回二进制内容"""
+    @traced('font.download', 'font')
+    def download_font(self, font_url, timeout=REQUEST_TIMEOUT):
+        """下载字体文件并返回二进制内容，timeout 为请求超时（秒）"""
         if not font_url:
             logger.error("没有提供字体URL")
             return None
@@ -120,7 +130,7 @@ class FontDecoder:
         try:
             logger.info(f"正在下载字体文件: {font_url}")
             start_time = time.time()
-            response = requests.get(font_url)
+            response = (self.session or requests).get(font_url, timeout=timeout)
             response.raise_for_status()
             
             download_time = time.time() - start_time
@@ -133,11 +143,36 @@ class FontDecoder:
             return None
     
     def load_ocr_mapping(self, mapping_path):
-        with open(mapping_path, 'r', encoding='utf-8') as f:
-            mapping = json.load(f)
+        # 通过MappingStore加载，审核服务器尚未合并的编辑日志也会生效
+        from mcp.decoder.mapping_store import MappingStore
+        _, mapping = MappingStore(mapping_path).snapshot()
         logger.info(f"已加载OCR映射表: {mapping_path}，共{len(mapping)}项")
         return mapping
     
+    def apply_mapping_updates(self, changes):
+        """
+        增量应用OCR映射的修改，只更新变化的字符，不重新解析字体
+        :param changes: {加密字符: 真实字符或None(删除)}
+        """
+        if self.ocr_mapping is None:
+            self.ocr_mapping = {}
+        for char, value in changes.items():
+            if value is None:
+                self.ocr_mapping.pop(char, None)
+                self.font_mapping.pop(char, None)
+            else:
+                self.ocr_mapping[char] = value
+                self.font_mapping[char] = value
+        logger.info(f"增量更新映射: {len(changes)} 个字符")
+    
+    def watch_mapping_store(self, store):
+        """
+        订阅映射表的变更通知，返回取消订阅的函数
+        同进程内的修改会立即生效；其他进程的修改在调用 store.refresh() 后生效
+        """
+        return store.subscribe(self.apply_mapping_updates)
+    
+    @traced('font.parse', 'font')
     def parse_font_mapping(self, font_data, ocr_mapping=None):
         """解析字体文件，提取字符映射关系，支持OCR辅助映射"""
         logger.info("开始解析字体映射")
@@ -284,19 +319,16 @@ class FontDecoder:
             logger.error(f"元素提取失败: {e}")
             return None
 
-def fetch_html(url, headers=None):
-    """获取网页HTML内容"""
+def fetch_html(url, headers=None, session=None, timeout=REQUEST_TIMEOUT):
+    """获取网页HTML内容，session 可选，用于复用连接；timeout 为请求超时（秒）"""
     logger.info(f"正在请求页面: {url}")
     
     # 设置默认请求头
     if not headers:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0",
-            "Referer": "https://fanqienovel.com/"
-        }
+        headers = DEFAULT_HTML_HEADERS
     
     try:
-        response = requests.get(url, headers=headers)
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
         response.raise_for_status()
         logger.info(f"页面获取成功, 长度: {len(response.text)/1024:.1f} KB")
         return response.text
@@ -359,4 +391,4 @@ if __name__ == "__main__":
         print(f"严重错误: {e}")
 
 # 示例运行:
-# python font_decoder.py https://fanqienovel.com/library/all/page_1?sort=hottes ".book-item-title" --output book_title.txt
\ No newline at end of file
+# python -m mcp.decoder.decoder https://fanqienovel.com/library/all/page_1?sort=hottes ".book-item-title" --output book_title.txt
\ No newline at end of file
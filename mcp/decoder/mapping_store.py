@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR映射表存储
+
+功能描述：
+  映射表文件 <hash>_mapping.json 旁边维护一个追加写入的日志 <hash>_mapping.json.journal，
+  每行一条JSON编辑记录 {"char": 加密字符, "value": 真实字符, "ts": 时间戳}，value 为 null 表示删除。
+  单字修改只追加日志，不重写整个映射文件；日志累积到阈值后原子地合并进映射文件。
+
+模块说明：
+  - MappingStore: 加载（映射文件 + 日志回放）、按字修改、原子合并、变更通知
+  - 同进程内通过 subscribe 注册回调接收变更；其他进程调用 refresh() 读取日志新增部分
+  - 多个进程（校验服务器、主流程、守护进程）可同时修改同一映射表：写入前持有 <映射文件>.lock 上的文件锁，
+    并先同步其他进程已写入的日志，合并时不会丢掉别人的编辑
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，只保证同进程内的线程安全
+    fcntl = None
+
+from mcp.jsonio import load_json, dump_json, file_mode_for
+
+logger = logging.getLogger('MappingStore')
+
+JOURNAL_SUFFIX = '.journal'
+LOCK_SUFFIX = '.lock'
+# 日志累积到该条数后自动合并进映射文件
+DEFAULT_COMPACT_THRESHOLD = 256
+# 加载期间日志被其他进程合并时的最多重试次数
+LOAD_RETRIES = 5
+
+
+def normalize_key(key):
+    """
+    接受加密字符本身或 U+编码形式（如 UE3E8），统一返回加密字符
+    """
+    if isinstance(key, str) and len(key) > 1 and key[0] in 'uU':
+        try:
+            return chr(int(key[1:], 16))
+        except ValueError:
+            pass
+    if not isinstance(key, str) or len(key) != 1:
+        raise ValueError(f"无效的字符键: {key!r}")
+    return key
+
+
+class MappingStore:
+    """
+    带编辑日志的映射表，线程安全
+    """
+
+    def __init__(self, mapping_path, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.mapping_path = mapping_path
+        self.journal_path = mapping_path + JOURNAL_SUFFIX
+        self.lock_path = mapping_path + LOCK_SUFFIX
+        self.compact_threshold = compact_threshold
+        self.mapping = {}
+        # 每次变更递增，可用作ETag
+        self.version = 0
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._journal_inode = None
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._load()
+
+    # ---------- 加载与回放 ----------
+
+    def _journal_identity(self):
+        try:
+            return os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _read_base(self):
+        if not os.path.exists(self.mapping_path):
+            return {}
+        return load_json(self.mapping_path)
+
+    def _read_journal(self, offset):
+        """
+        从offset开始读取日志中完整的行，返回 (编辑列表, 新offset, inode)
+        末尾未写完的行留到下次读取
+        """
+        if not os.path.exists(self.journal_path):
+            return [], 0, None
+        edits = []
+        with open(self.journal_path, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                    edits.append((entry['char'], entry.get('value')))
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"跳过损坏的日志行: {e}")
+        return edits, offset, inode
+
+    @staticmethod
+    def _apply_edits(mapping, edits):
+        for char, value in edits:
+            if value is None:
+                mapping.pop(char, None)
+            else:
+                mapping[char] = value
+
+    def _load(self):
+        """
+        读取映射文件并回放日志
+        合并时先替换映射文件再替换日志：若在读映射文件之后日志被替换（inode变化），
+        读到的是旧映射文件 + 新的空日志，合并进去的编辑会丢失，此时重新读取
+        """
+        with self._lock:
+            for attempt in range(LOAD_RETRIES):
+                inode_before = self._journal_identity()
+                mapping = self._read_base()
+                edits, offset, inode = self._read_journal(0)
+                if inode == inode_before:
+                    break
+                logger.info(f"映射表 {self.mapping_path} 加载期间日志被合并，重新读取（第 {attempt + 1} 次）")
+            self._apply_edits(mapping, edits)
+            self.mapping = mapping
+            self._journal_entries = len(edits)
+            self._journal_offset = offset
+            self._journal_inode = inode
+            self.version += 1
+            if edits:
+                logger.info(f"映射表 {self.mapping_path} 回放了 {len(edits)} 条编辑日志")
+
+    def snapshot(self):
+        """
+        返回 (version, 映射表副本)
+        """
+        with self._lock:
+            return self.version, dict(self.mapping)
+
+    # ---------- 变更通知 ----------
+
+    def subscribe(self, callback):
+        """
+        注册变更回调 callback(changes)，changes 为 {加密字符: 新值或None}
+        返回取消订阅的函数
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _publish(self, changes):
+        if not changes:
+            return
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"映射变更回调出错: {e}")
+
+    # ---------- 修改 ----------
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """
+        持有线程锁和跨进程文件锁，并先同步其他进程写入的日志；产出同步得到的外部变更
+        """
+        with self._lock:
+            if fcntl is None:
+                yield self._sync()
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield self._sync()
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def apply(self, edits):
+        """
+        按字修改映射表，edits 为 {加密字符或U+编码: 真实字符或None}
+        只有值真正改变的条目才写入日志，返回实际变更 {加密字符: 新值}
+        """
+        normalized = {}
+        for key, value in edits.items():
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"无效的映射值: {value!r}")
+            normalized[normalize_key(key)] = value
+
+        with self._exclusive() as external:
+            changes = {char: value for char, value in normalized.items() if self.mapping.get(char) != value}
+            if not changes:
+                self._publish(external)
+                return {}
+            now = time.time()
+            lines = ''.join(
+                json.dumps({'char': char, 'value': value, 'ts': now}, ensure_ascii=False) + '\n'
+                for char, value in changes.items()
+            ).encode('utf-8')
+            with open(self.journal_path, 'ab') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                self._journal_inode = os.fstat(f.fileno()).st_ino
+            self._journal_offset += len(lines)
+            self._journal_entries += len(changes)
+            self._apply_edits(self.mapping, changes.items())
+            self.version += 1
+            logger.info(f"映射表追加 {len(changes)} 条编辑")
+            if self._journal_entries >= self.compact_threshold:
+                self._compact_locked()
+        self._publish(dict(external, **changes))
+        return changes
+
+    def replace_all(self, mapping):
+        """
+        整体替换映射表（原子写入并清空日志），返回与原映射的差异
+        """
+        with self._exclusive() as external:
+            changes = {char: value for char, value in mapping.items() if self.mapping.get(char) != value}
+            changes.update({char: None for char in self.mapping if char not in mapping})
+            self.mapping = dict(mapping)
+            self._write_base_and_reset_journal()
+            self.version += 1
+        # 订阅者看到的是外部变更之后再整体替换的结果
+        self._publish(dict(external, **changes))
+        return changes
+
+    def compact(self):
+        """
+        把日志合并进映射文件：先原子替换映射文件，再原子替换为空日志
+        两步之间读到的旧日志重放到新映射上结果不变；合并前先同步其他进程追加的日志
+        """
+        with self._exclusive() as external:
+            compacted = self._compact_locked()
+        self._publish(external)
+        return compacted
+
+    def _compact_locked(self):
+        if not self._journal_entries:
+            return False
+        start = time.time()
+        merged = self._journal_entries
+        self._write_base_and_reset_journal()
+        logger.info(f"映射日志已合并: {merged} 条，用时 {time.time() - start:.3f}秒")
+        return True
+
+    def _write_base_and_reset_journal(self):
+        dump_json(self.mapping, self.mapping_path)
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.journal.', suffix='.tmp', dir=directory)
+        os.close(fd)
+        os.chmod(tmp_path, file_mode_for(self.journal_path))
+        os.replace(tmp_path, self.journal_path)
+        self._journal_inode = os.stat(self.journal_path).st_ino
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    # ---------- 跨进程同步 ----------
+
+    def refresh(self):
+        """
+        读取其他进程写入的新日志；日志被合并（inode变化或变短）时重新加载映射文件
+        返回变更并通知订阅者
+        """
+        with self._lock:
+            changes = self._sync()
+        self._publish(changes)
+        return changes
+
+    def _sync(self):
+        """
+        refresh 的主体，调用方持有 self._lock；返回变更，不通知订阅者
+        """
+        try:
+            st = os.stat(self.journal_path)
+            rotated = st.st_ino != self._journal_inode or st.st_size < self._journal_offset
+        except FileNotFoundError:
+            st = None
+            rotated = self._journal_inode is not None
+        if st is not None and not rotated and st.st_size == self._journal_offset:
+            return {}
+        if rotated:
+            old = self.mapping
+            self._load()
+            changes = {char: value for char, value in self.mapping.items() if old.get(char) != value}
+            changes.update({char: None for char in old if char not in self.mapping})
+        else:
+            edits, offset, _ = self._read_journal(self._journal_offset)
+            changes = {}
+            for char, value in edits:
+                if self.mapping.get(char) != value:
+                    changes[char] = value
+            self._apply_edits(self.mapping, edits)
+            self._journal_offset = offset
+            self._journal_entries += len(edits)
+            if changes:
+                self.version += 1
+        return changes
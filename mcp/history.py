@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+榜单历史存储
+
+功能描述：
+  用SQLite按时间序列保存每次爬取的名次、阅读数、字数、最近更新时间。
+  每条记录计算内容哈希，与该书在该榜单上最近一次的哈希相同则不写入，
+  存储量随变化量增长而不是随爬取次数增长。
+
+模块说明：
+  - HistoryStore.record_crawl: 写入一次榜单爬取结果（只写变化的记录，跌出榜单的书记一条名次为空的记录）
+  - HistoryStore.trajectory: 查询某本书的名次轨迹，走 (book_id, list_key, captured_at) 索引
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+
+from mcp.units import parse_count, parse_int
+from mcp.sinks import as_dict
+
+# 每次请求都会变化、不代表内容变化的字段（签名图片地址带过期时间）
+VOLATILE_FIELDS = {'thumb_url'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    book_id TEXT NOT NULL,
+    list_key TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    rank INTEGER,
+    read_count INTEGER,
+    word_count INTEGER,
+    last_chapter_time INTEGER,
+    content_hash TEXT,
+    record TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_book ON snapshots (book_id, list_key, captured_at);
+CREATE TABLE IF NOT EXISTS latest (
+    book_id TEXT NOT NULL,
+    list_key TEXT NOT NULL,
+    content_hash TEXT,
+    rank INTEGER,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (book_id, list_key)
+);
+"""
+
+
+def make_list_key(gender=-1, category_id=-1, sort=0):
+    """
+    榜单标识，如 g-1_c-1_s0
+    """
+    return f"g{gender}_c{category_id}_s{sort}"
+
+
+def content_hash(record, rank):
+    """
+    名次 + 记录内容（去掉易变字段）的哈希
+    """
+    stable = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    payload = json.dumps([rank, stable], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class HistoryStore:
+    """
+    榜单时间序列存储
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def record_crawl(self, list_key, books, captured_at=None):
+        """
+        写入一次榜单爬取结果，books 为按名次排列的书籍记录（已解码）
+        返回 {'written': 变化写入数, 'unchanged': 未变化数, 'dropped': 跌出榜单数}
+        """
+        captured_at = time.time() if captured_at is None else captured_at
+        latest = {
+            book_id: (digest, rank)
+            for book_id, digest, rank in self.conn.execute(
+                'SELECT book_id, content_hash, rank FROM latest WHERE list_key = ?', (list_key,))
+        }
+        snapshots = []
+        seen = []
+        unchanged = 0
+        present = set()
+        for rank, record in enumerate(books, start=1):
+            record = as_dict(record)
+            book_id = record.get('book_id')
+            if book_id is None or str(book_id) in present:
+                continue
+            book_id = str(book_id)
+            present.add(book_id)
+            digest = content_hash(record, rank)
+            seen.append((book_id, list_key, digest, rank, captured_at))
+            if latest.get(book_id, (None, None))[0] == digest:
+                unchanged += 1
+                continue
+            snapshots.append((
+                book_id, list_key, captured_at, rank,
+                parse_count(record.get('read_count')),
+                parse_count(record.get('word_count')),
+                parse_int(record.get('last_chapter_time')),
+                digest,
+                json.dumps(record, ensure_ascii=False),
+            ))
+        # 上次在榜、本次不在榜的书记一条名次为空的记录
+        dropped = [book_id for book_id, (_, rank) in latest.items() if rank is not None and book_id not in present]
+        for book_id in dropped:
+            snapshots.append((book_id, list_key, captured_at, None, None, None, None, None, None))
+            seen.append((book_id, list_key, None, None, captured_at))
+
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO snapshots (book_id, list_key, captured_at, rank, read_count, word_count, '
+                'last_chapter_time, content_hash, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', snapshots)
+            self.conn.executemany(
+                'INSERT INTO latest (book_id, list_key, content_hash, rank, last_seen) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(book_id, list_key) DO UPDATE SET content_hash = excluded.content_hash, '
+                'rank = excluded.rank, last_seen = excluded.last_seen', seen)
+        return {'written': len(snapshots) - len(dropped), 'unchanged': unchanged, 'dropped': len(dropped)}
+
+    def trajectory(self, book_id, list_key=None, since=None, until=None):
+        """
+        查询一本书的名次轨迹，返回按时间排序的 [{'list_key', 'captured_at', 'rank', 'read_count', ...}]
+        只包含发生变化的时间点，两次变化之间数据保持不变
+        """
+        sql = ('SELECT list_key, captured_at, rank, read_count, word_count, last_chapter_time '
+               'FROM snapshots WHERE book_id = ?')
+        params = [str(book_id)]
+        if list_key is not None:
+            sql += ' AND list_key = ?'
+            params.append(list_key)
+        if since is not None:
+            sql += ' AND captured_at >= ?'
+            params.append(since)
+        if until is not None:
+            sql += ' AND captured_at <= ?'
+            params.append(until)
+        sql += ' ORDER BY captured_at'
+        columns = ['list_key', 'captured_at', 'rank', 'read_count', 'word_count', 'last_chapter_time']
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, params)]
+
+    def snapshot_count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON读写
+
+功能描述：
+  项目中所有JSON文件（原始API数据、解码结果、字体映射缓存、OCR映射表等）统一经过本模块读写：
+  - 安装了 orjson 时用它序列化/解析（比标准库快数倍），未安装时退回标准库 json，输出内容一致
+  - 默认输出紧凑格式（无缩进），文件约为缩进格式的几分之一；需要人工阅读时可开启缩进
+  - 写文件先整体序列化为字节，通过大缓冲区一次写入同目录的临时文件，再 os.replace 原子替换，
+    读者要么看到旧文件要么看到完整的新文件；临时文件按目标文件的权限（新文件按进程当前的 umask）设置，替换后权限与直接写入一致
+
+模块说明：
+  - dumps / loads: 序列化为UTF-8字节 / 从字节或字符串解析
+  - load_json / dump_json: 读写文件（dump_json 原子写入）
+  - file_mode_for: 原子替换文件时新文件应有的权限（其他模块用临时文件替换时共用）
+  - set_pretty: 设置默认是否缩进（也可用环境变量 FANQIE_JSON_PRETTY=1 开启）
+"""
+
+import os
+import json
+import stat
+import uuid
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+# 写文件时的缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+_pretty = os.environ.get('FANQIE_JSON_PRETTY', '').lower() in ('1', 'true', 'yes')
+
+# Linux 上读取进程 umask 的位置
+PROC_STATUS = '/proc/self/status'
+# 无法确定新文件权限时使用的权限
+FALLBACK_FILE_MODE = 0o644
+
+
+def set_pretty(enabled):
+    """
+    设置 dumps / dump_json 默认是否输出缩进格式，返回之前的设置
+    """
+    global _pretty
+    previous, _pretty = _pretty, bool(enabled)
+    return previous
+
+
+def dumps(obj, pretty=None, sort_keys=False, default=None):
+    """
+    序列化为UTF-8编码的字节；pretty 为None时使用默认设置，为True时缩进2格
+    default 为不可序列化的值的转换函数（同 json.dumps），为None时这类值抛出 TypeError
+    """
+    pretty = _pretty if pretty is None else pretty
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # orjson 不支持的值（如超过64位的整数）交给标准库处理
+            pass
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys, default=default)
+    return text.encode('utf-8')
+
+
+def loads(data):
+    """
+    从字节或字符串解析JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def load_json(path):
+    """
+    读取JSON文件
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def _read_umask():
+    """
+    从 /proc/self/status 读取进程当前的 umask，不可用（非Linux）时返回None
+    os.umask 只能设置新值再恢复，期间其他线程新建的文件会得到错误的权限，因此不用它读取
+    """
+    try:
+        with open(PROC_STATUS, 'rb') as f:
+            for line in f:
+                if line.startswith(b'Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _probe_new_file_mode(directory):
+    """
+    在 directory 中按 0o666 新建一个探测文件，返回它实际得到的权限（已去掉 umask），随后删除
+    """
+    probe = os.path.join(directory, f".mode-probe-{uuid.uuid4().hex}")
+    try:
+        fd = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except OSError:
+        return FALLBACK_FILE_MODE
+    try:
+        return stat.S_IMODE(os.fstat(fd).st_mode)
+    finally:
+        os.close(fd)
+        os.remove(probe)
+
+
+def file_mode_for(path):
+    """
+    原子替换 path 时新文件应有的权限：目标已存在时沿用其权限，否则与 open() 新建文件相同（0o666 去掉 umask）
+    mkstemp 创建的临时文件固定为 0o600，替换前需按此设置，否则其他用户/进程无法读取
+    umask 每次按需读取（不在导入时修改进程的 umask）；无法读取时在目标目录中新建探测文件得到实际权限
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        pass
+    umask = _read_umask()
+    if umask is not None:
+        return 0o666 & ~umask
+    return _probe_new_file_mode(os.path.dirname(os.path.abspath(path)))
+
+
+def dump_json(obj, path, pretty=None, sort_keys=False, fsync=True, default=None):
+    """
+    原子写入JSON文件：序列化后写入同目录下的临时文件，刷盘后 os.replace 覆盖目标文件
+    返回写入的字节数
+    """
+    data = dumps(obj, pretty=pretty, sort_keys=sort_keys, default=default)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        os.chmod(tmp_path, file_mode_for(path))
+        with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(data)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流程编排
+
+功能描述：
+  把互不依赖的流程分支（如API获取、页面抓取→字体→映射）并行执行，在汇合点等待全部完成，
+  任一分支失败时立即返回并通知其余分支取消；记录每个阶段的起止时间并给出关键路径报告。
+
+模块说明：
+  - StageTracker: 线程安全的阶段计时，stage() 上下文管理器记录一个阶段
+  - run_branches: 并行运行多个分支，返回各分支结果；首个失败即短路
+  - critical_path_report: 关键路径与并行节省时间汇总
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from mcp.tracing import span
+
+# 汇合后的阶段所属分支名
+JOIN_BRANCH = 'join'
+
+
+class StageTracker:
+    """
+    记录各阶段的起止时间（相对创建时刻，秒）；启用追踪时每个阶段同时记录为一个span（类别为分支名）
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, branch=JOIN_BRANCH):
+        start = time.perf_counter() - self.origin
+        try:
+            with span(name, branch):
+                yield
+        finally:
+            end = time.perf_counter() - self.origin
+            with self._lock:
+                self.spans.append({'stage': name, 'branch': branch, 'start': start, 'end': end})
+
+    def branch_spans(self):
+        """
+        返回 {分支: [阶段...]}，阶段按开始时间排序
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span['start'])
+        branches = {}
+        for span in spans:
+            branches.setdefault(span['branch'], []).append(span)
+        return branches
+
+
+def run_branches(branches, max_workers=None, failed=None, cancel=None):
+    """
+    并行运行 {分支名: 无参函数}，全部完成后返回 {分支名: 返回值}
+    任一分支抛出异常、或 failed(分支名, 返回值) 为真时，立即设置 cancel（threading.Event）并抛出该异常/返回，
+    不等待其余分支：此时尚未结束的分支不在返回结果中，它们应在阶段之间检查 cancel 后自行退出
+    """
+    cancel = cancel if cancel is not None else threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(branches), thread_name_prefix='branch')
+    try:
+        futures = {executor.submit(func): name for name, func in branches.items()}
+        results = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                results[name] = future.result()
+                if failed is not None and failed(name, results[name]):
+                    cancel.set()
+                    return results
+        return results
+    except BaseException:
+        cancel.set()
+        raise
+    finally:
+        # 不阻塞等待仍在运行的分支，未开始的分支直接取消
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def critical_path_report(tracker):
+    """
+    汇总关键路径：并行分支中结束最晚的分支 + 汇合后的阶段
+    返回 {'wall', 'sequential', 'saved', 'branches', 'critical_path'}
+    """
+    branches = tracker.branch_spans()
+    parallel = {name: spans for name, spans in branches.items() if name != JOIN_BRANCH}
+    joined = branches.get(JOIN_BRANCH, [])
+    summary = {
+        name: {
+            'duration': sum(span['end'] - span['start'] for span in spans),
+            'end': max(span['end'] for span in spans),
+            'stages': [(span['stage'], span['end'] - span['start']) for span in spans],
+        }
+        for name, spans in parallel.items()
+    }
+    critical = max(summary, key=lambda name: summary[name]['end']) if summary else None
+    path = list(summary[critical]['stages']) if critical else []
+    path += [(span['stage'], span['end'] - span['start']) for span in joined]
+    all_spans = [span for spans in branches.values() for span in spans]
+    wall = max((span['end'] for span in all_spans), default=0.0) - min((span['start'] for span in all_spans), default=0.0)
+    sequential = sum(span['end'] - span['start'] for span in all_spans)
+    return {
+        'wall': wall,
+        'sequential': sequential,
+        'saved': max(0.0, sequential - wall),
+        'branches': summary,
+        'critical_branch': critical,
+        'critical_path': path,
+    }
+
+
+def print_critical_path(tracker):
+    """
+    打印关键路径报告
+    """
+    report = critical_path_report(tracker)
+    print("\n--- 阶段耗时与关键路径 ---")
+    for name, item in report['branches'].items():
+        stages = ' → '.join(f"{stage} {seconds:.2f}s" for stage, seconds in item['stages'])
+        marker = '*' if name == report['critical_branch'] else ' '
+        print(f"{marker} 分支 {name:<8} {item['duration']:.2f}秒: {stages}")
+    path = ' → '.join(f"{stage} {seconds:.2f}s" for stage, seconds in report['critical_path'])
+    print(f"关键路径: {path}")
+    print(f"总耗时 {report['wall']:.2f}秒，顺序执行约 {report['sequential']:.2f}秒，并行节省 {report['saved']:.2f}秒")
+    return report
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑书籍记录
+
+功能描述：
+  API返回的每本书是一个包含十几个字符串键的dict，完整爬取时内存开销很大。
+  BookRecord 使用 __slots__ 存储已知字段，重复出现的字符串（作者、同一本书的文本、封面域名、签名参数模板）做驻留，
+  封面签名地址拆成 域名前缀 + thumb_uri + 参数模板 + 签名 四段，只有签名是每本书独有的。
+  与API JSON之间可以无损互转（包括键的顺序），未知字段原样保存在 extra 中；
+  键顺序保存为元组，相同顺序的记录共享同一个元组。
+
+模块说明：
+  - BookRecord.from_api / to_api: 与单条API记录互转
+  - BookRecord.decoded: 用字体解码器解码所有文本字段，返回新记录
+  - records_from_page / page_from_records: 与整页API数据互转
+"""
+
+import sys
+
+# API记录中的已知字段
+FIELDS = (
+    'abstract', 'author', 'book_id', 'book_name', 'creation_status', 'last_chapter_time',
+    'read_count', 'status', 'thumb_uri', 'word_count',
+)
+# 驻留的文本字段：作者重复度高；同一本书会出现在多个分类/排序/页中，驻留后整次爬取只保留一份文本
+INTERNED_FIELDS = ('abstract', 'author', 'book_id', 'book_name', 'last_chapter_time', 'read_count', 'thumb_uri',
+                   'word_count')
+SIGNATURE_KEY = 'x-signature='
+_MISSING = object()
+# 键顺序元组的驻留表；API返回的记录键顺序只有少数几种，超过上限后不再驻留
+_KEY_ORDERS = {}
+MAX_KEY_ORDERS = 256
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_keys(keys):
+    keys = tuple(keys)
+    shared = _KEY_ORDERS.get(keys)
+    if shared is not None:
+        return shared
+    if len(_KEY_ORDERS) < MAX_KEY_ORDERS:
+        _KEY_ORDERS[keys] = keys
+    return keys
+
+
+def split_thumb_url(thumb_url, thumb_uri):
+    """
+    把 http://host/<thumb_uri>~tplv...&x-signature=SIG 拆成 (前缀, 参数模板, 签名)
+    无法按此结构拆分时返回None
+    """
+    if not isinstance(thumb_url, str) or not isinstance(thumb_uri, str) or not thumb_uri:
+        return None
+    pos = thumb_url.find(thumb_uri)
+    if pos < 0:
+        return None
+    prefix, rest = thumb_url[:pos], thumb_url[pos + len(thumb_uri):]
+    sig_pos = rest.rfind(SIGNATURE_KEY)
+    if sig_pos < 0:
+        return sys.intern(prefix), _intern(rest), ''
+    sig_pos += len(SIGNATURE_KEY)
+    return sys.intern(prefix), sys.intern(rest[:sig_pos]), rest[sig_pos:]
+
+
+class BookRecord:
+    """
+    使用 __slots__ 的书籍记录，字段缺失时为 _MISSING（to_api 时不输出）
+    _thumb: 拆分后的 (前缀, 参数模板, 签名) 元组，无法拆分时为原始 thumb_url 值（可能是None等非字符串）
+    _keys: 原始记录的键顺序（共享的元组）
+    """
+    __slots__ = FIELDS + ('_thumb', 'extra', '_keys')
+
+    def __init__(self, **fields):
+        self._keys = _intern_keys(fields)
+        for name in FIELDS:
+            setattr(self, name, fields.pop(name, _MISSING))
+        thumb_url = fields.pop('thumb_url', _MISSING)
+        parts = None if thumb_url is _MISSING else split_thumb_url(thumb_url, self.thumb_uri)
+        self._thumb = thumb_url if parts is None else parts
+        self.extra = fields or None
+
+    @classmethod
+    def from_api(cls, record):
+        """
+        从单条API记录创建
+        """
+        fields = dict(record)
+        for name in INTERNED_FIELDS:
+            if name in fields:
+                fields[name] = _intern(fields[name])
+        return cls(**fields)
+
+    @property
+    def thumb_url(self):
+        thumb = self._thumb
+        if not isinstance(thumb, tuple):
+            return None if thumb is _MISSING else thumb
+        prefix, template, signature = thumb
+        return prefix + self.thumb_uri + template + signature
+
+    def get(self, name, default=None):
+        if name == 'thumb_url':
+            return default if self._thumb is _MISSING else self.thumb_url
+        if name in FIELDS:
+            value = getattr(self, name)
+            return default if value is _MISSING else value
+        return (self.extra or {}).get(name, default)
+
+    def to_api(self):
+        """
+        还原为API记录dict，与 from_api 的输入相等，键顺序也相同
+        """
+        record = {}
+        extra = self.extra or {}
+        for name in self._keys:
+            if name == 'thumb_url':
+                record[name] = self.thumb_url
+            elif name in extra:
+                record[name] = extra[name]
+            else:
+                record[name] = getattr(self, name)
+        return record
+
+    def decoded(self, decoder):
+        """
+        用字体解码器解码所有文本字段，返回新的记录（与 recursive_decode 结果一致）
+        """
+        def decode(value):
+            if isinstance(value, str):
+                return decoder.decrypt_text(value)
+            if isinstance(value, list):
+                return [decode(item) for item in value]
+            if isinstance(value, dict):
+                return {key: decode(item) for key, item in value.items()}
+            return value
+        return BookRecord.from_api(decode(self.to_api()))
+
+    def __eq__(self, other):
+        return isinstance(other, BookRecord) and self.to_api() == other.to_api()
+
+    def __repr__(self):
+        return f"BookRecord(book_id={self.get('book_id')!r}, book_name={self.get('book_name')!r})"
+
+
+def records_from_page(api_json):
+    """
+    把整页API数据拆成 (记录列表, 去掉 book_list 后的外层结构)
+    """
+    envelope = dict(api_json)
+    data = dict(envelope.get('data') or {})
+    records = [BookRecord.from_api(record) for record in data.pop('book_list', None) or []]
+    envelope['data'] = data
+    return records, envelope
+
+
+def page_from_records(records, envelope):
+    """
+    records_from_page 的逆操作，还原整页API数据
+    """
+    api_json = dict(envelope)
+    data = dict(api_json.get('data') or {})
+    data['book_list'] = [record.to_api() for record in records]
+    api_json['data'] = data
+    return api_json
@@ -24,13 +24,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-def get_dynamic_page(url, wait_selector=None, wait_time=10):
+def create_chrome_driver():
     """
-    抓取动态渲染页面源码
-    :param url: 目标URL
-    :param wait_selector: 等待的CSS选择器（如'.book-list'），为None则只等待固定时间
-    :param wait_time: 最长等待秒数
-    :return: 页面HTML源码字符串
+    创建无界面Chrome浏览器，可在多次抓取之间复用（调用方负责 driver.quit()）
     """
     chrome_options = Options()
     chrome_options.add_argument('--headless')  # 无界面模式
@@ -38,27 +34,43 @@ def get_dynamic_page(url, wait_selector=None, wait_time=10):
     chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0')
 
     print("正在初始化浏览器...")
-    driver = webdriver.Chrome(options=chrome_options)
-    print(f"正在访问页面: {url}")
-    driver.get(url)
+    return webdriver.Chrome(options=chrome_options)
+
+def get_dynamic_page(url, wait_selector=None, wait_time=10, driver=None):
+    """
+    抓取动态渲染页面源码
+    :param url: 目标URL
+    :param wait_selector: 等待的CSS选择器（如'.book-list'），为None则只等待固定时间
+    :param wait_time: 最长等待秒数
+    :param driver: 可选，已打开的浏览器；传入时复用且不关闭，否则新建并在结束后关闭
+    :return: 页面HTML源码字符串
+    """
+    own_driver = driver is None
+    if own_driver:
+        driver = create_chrome_driver()
+    try:
+        print(f"正在访问页面: {url}")
+        driver.get(url)
 
-    if wait_selector:
-        print(f"等待页面元素 {wait_selector} 最多 {wait_time} 秒...")
-        try:
-            WebDriverWait(driver, wait_time).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
-            )
-            print("页面主要内容已加载")
-        except Exception as e:
-            print(f"等待页面元素超时，可能页面结构有变或加载过慢：{e}")
-    else:
-        print(f"固定等待 {wait_time} 秒...")
-        time.sleep(wait_time)
+        if wait_selector:
+            print(f"等待页面元素 {wait_selector} 最多 {wait_time} 秒...")
+            try:
+                WebDriverWait(driver, wait_time).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
+                )
+                print("页面主要内容已加载")
+            except Exception as e:
+                print(f"等待页面元素超时，可能页面结构有变或加载过慢：{e}")
+        else:
+            print(f"固定等待 {wait_time} 秒...")
+            time.sleep(wait_time)
 
-    html_content = driver.page_source
-    print(f"页面获取成功, 长度: {len(html_content)/1024:.1f} KB")
-    driver.quit()
-    return html_content
+        html_content = driver.page_source
+        print(f"页面获取成功, 长度: {len(html_content)/1024:.1f} KB")
+        return html_content
+    finally:
+        if own_driver:
+            driver.quit()
 
 if __name__ == "__main__":
     url = 'https://fanqienovel.com/library/all/page_1?sort=hottes'
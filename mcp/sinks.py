@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解码结果输出插件
+
+功能描述：
+  把解码后的 book_list 记录逐条增量写出，下游任务无需解析整个缩进JSON文件。
+  支持 NDJSON（每行一条JSON）、CSV、SQLite（批量插入，每批一个事务）。
+
+模块说明：
+  - iter_book_records: 从API返回结构中取出书籍记录
+  - NDJSONSink / CSVSink / SQLiteSink: 输出插件，均支持 with 语句
+  - open_sink: 按名称创建输出插件
+"""
+
+import os
+import csv
+import json
+import time
+import sqlite3
+
+from mcp.jsonio import dumps
+
+# 书籍记录的已知字段，CSV列和SQLite列按此顺序
+BOOK_FIELDS = [
+    'book_id', 'book_name', 'author', 'abstract', 'creation_status', 'status',
+    'read_count', 'word_count', 'last_chapter_time', 'thumb_uri', 'thumb_url',
+]
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_book_records(api_json):
+    """
+    从API返回结构 {'data': {'book_list': [...]}} 中逐条产出书籍记录
+    """
+    if not isinstance(api_json, dict):
+        return
+    data = api_json.get('data')
+    if isinstance(data, dict):
+        for record in data.get('book_list') or []:
+            if isinstance(record, dict):
+                yield record
+
+
+def as_dict(record):
+    """
+    BookRecord 等紧凑记录转换为API格式的dict，dict原样返回
+    """
+    return record.to_api() if hasattr(record, 'to_api') else record
+
+
+def _ensure_parent(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+class RecordSink:
+    """
+    输出插件基类：write(records) 可多次调用，close() 结束写出
+    """
+    extension = ''
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        _ensure_parent(path)
+
+    def write(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class NDJSONSink(RecordSink):
+    """
+    每行一条JSON记录，append=True 时追加到已有文件
+    """
+    extension = '.ndjson'
+
+    def __init__(self, path, append=False):
+        super().__init__(path)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, records):
+        for record in records:
+            self._file.write(dumps(as_dict(record), pretty=False).decode('utf-8'))
+            self._file.write('\n')
+            self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class CSVSink(RecordSink):
+    """
+    CSV输出，列为 BOOK_FIELDS，未知字段忽略，嵌套值按JSON编码
+    """
+    extension = '.csv'
+
+    def __init__(self, path, fields=None):
+        super().__init__(path)
+        self.fields = list(fields or BOOK_FIELDS)
+        # utf-8-sig 便于Excel直接打开中文
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, records):
+        for record in records:
+            row = {key: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+                   for key, value in as_dict(record).items()}
+            self._writer.writerow(row)
+            self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class SQLiteSink(RecordSink):
+    """
+    SQLite输出：已知字段各占一列，完整记录存入 record 列（JSON）
+    captured_at 列取记录自带的抓取时间（如分片记录），没有时为打开输出的时间
+    记录先缓存，每 batch_size 条在一个事务中 executemany 插入
+    """
+    extension = '.sqlite'
+
+    def __init__(self, path, table='books', batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(path)
+        if not table.isidentifier():
+            raise ValueError(f"无效的表名: {table}")
+        self.table = table
+        self.batch_size = batch_size
+        self.captured_at = time.time()
+        self._pending = []
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        columns = ', '.join(f'{field} TEXT' for field in BOOK_FIELDS)
+        with self._conn:
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ('
+                               f'id INTEGER PRIMARY KEY, captured_at REAL, {columns}, record TEXT)')
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_book_id ON {table} (book_id)')
+        placeholders = ', '.join('?' for _ in range(len(BOOK_FIELDS) + 2))
+        self._insert_sql = f'INSERT INTO {table} (captured_at, {", ".join(BOOK_FIELDS)}, record) VALUES ({placeholders})'
+
+    def write(self, records):
+        for record in records:
+            record = as_dict(record)
+            values = [None if record.get(field) is None else str(record.get(field)) for field in BOOK_FIELDS]
+            self._pending.append([record.get('captured_at') or self.captured_at] + values + [json.dumps(record, ensure_ascii=False)])
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(self._insert_sql, self._pending)
+        self.count += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+
+SINKS = {
+    'ndjson': NDJSONSink,
+    'csv': CSVSink,
+    'sqlite': SQLiteSink,
+}
+
+
+def open_sink(kind, path=None, output_dir='output', basename='decoded_books'):
+    """
+    按名称创建输出插件，未指定路径时写到 output/decoded_books.<扩展名>
+    """
+    if kind not in SINKS:
+        raise ValueError(f"未知的输出类型: {kind}，可选: {', '.join(SINKS)}")
+    sink_cls = SINKS[kind]
+    return sink_cls(path or os.path.join(output_dir, basename + sink_cls.extension))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式书籍表
+
+功能描述：
+  把解码后的书籍记录转换为按列存储的numpy数组：
+  read_count / word_count 等解析为整数列（支持 万/亿 单位），作者、性别、分类等取值有限的字段
+  按字典编码为整数code。过滤、跨分类合并、top-k 都是向量化操作。
+  本模块是独立的分析工具库，爬取/解码主流程不依赖它。
+
+模块说明：
+  - BookTable.from_records: 从记录列表构建，可附加整张表共用的标签（如 gender=1, category_id=262）
+  - BookTable.concat: 合并多个表（如多个分类的榜单），可按 book_id 去重
+  - BookTable.eq / isin / between: 生成布尔掩码，可用 & | 组合
+  - BookTable.top_k: 按任意数值列取前k条，使用 argpartition
+
+示例:
+  table = BookTable.concat([BookTable.from_records(books, gender=1, category_id=c) for c, books in ...])
+  mask = table.eq('creation_status', 0) & table.eq('gender', 1)
+  top = table.top_k('read_count', 50, mask=mask).to_records()
+"""
+
+import numpy as np
+
+from mcp.units import parse_count, parse_int
+
+# 缺失或无法解析的数值
+MISSING = -1
+NUMERIC_COLUMNS = {
+    'read_count': parse_count,
+    'word_count': parse_count,
+    'last_chapter_time': parse_int,
+    'creation_status': parse_int,
+    'status': parse_int,
+}
+CATEGORICAL_COLUMNS = ('author',)
+TEXT_COLUMNS = ('book_id', 'book_name')
+
+
+class Categorical:
+    """
+    字典编码列：codes[i] 为 categories 中的下标，缺失为 -1
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = list(categories)
+        self._index = {value: i for i, value in enumerate(self.categories)}
+
+    @classmethod
+    def encode(cls, values):
+        index = {}
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = MISSING
+            else:
+                codes[i] = index.setdefault(value, len(index))
+        return cls(codes, index)
+
+    def code_of(self, value):
+        return self._index.get(value, -2)  # -2 不会与任何code相等
+
+    def decode(self, codes=None):
+        codes = self.codes if codes is None else codes
+        lookup = np.array(self.categories + [None], dtype=object)
+        return lookup[codes]  # -1 对应末尾的None
+
+    def take(self, indices):
+        return Categorical(self.codes[indices], self.categories)
+
+    @staticmethod
+    def concat(columns, lengths):
+        """
+        合并多个列，统一字典后重映射code；columns 中为None表示该表没有此列
+        """
+        categories = {}
+        for column in columns:
+            if column is not None:
+                for value in column.categories:
+                    categories.setdefault(value, len(categories))
+        parts = []
+        for column, length in zip(columns, lengths):
+            if column is None:
+                parts.append(np.full(length, MISSING, dtype=np.int32))
+                continue
+            remap = np.array([categories[value] for value in column.categories] + [MISSING], dtype=np.int32)
+            parts.append(remap[column.codes])
+        codes = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+        return Categorical(codes, categories)
+
+
+class BookTable:
+    """
+    列式书籍表
+    """
+
+    def __init__(self, numeric, categorical, text, length):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.text = text
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records, **labels):
+        """
+        从书籍记录构建；labels 为整张表共用的分类标签，作为字典编码列加入
+        """
+        records = list(records)
+        numeric = {}
+        for name, parse in NUMERIC_COLUMNS.items():
+            values = [parse(record.get(name)) for record in records]
+            numeric[name] = np.array([MISSING if value is None else value for value in values], dtype=np.int64)
+        categorical = {name: Categorical.encode([record.get(name) for record in records])
+                       for name in CATEGORICAL_COLUMNS}
+        for name, value in labels.items():
+            categorical[name] = Categorical(np.zeros(len(records), dtype=np.int32), [value])
+        text = {name: np.array([record.get(name) for record in records], dtype=object) for name in TEXT_COLUMNS}
+        return cls(numeric, categorical, text, len(records))
+
+    @classmethod
+    def concat(cls, tables, dedupe_by='book_id'):
+        """
+        合并多个表；dedupe_by 不为None时同一本书只保留第一次出现的行
+        该列缺失（None或空字符串）的行无法判断是否重复，全部保留
+        """
+        tables = list(tables)
+        lengths = [table.length for table in tables]
+        numeric_names = {name for table in tables for name in table.numeric}
+        categorical_names = {name for table in tables for name in table.categorical}
+        text_names = {name for table in tables for name in table.text}
+        numeric = {
+            name: np.concatenate([table.numeric.get(name, np.full(table.length, MISSING, dtype=np.int64))
+                                  for table in tables]) if tables else np.empty(0, dtype=np.int64)
+            for name in numeric_names
+        }
+        categorical = {
+            name: Categorical.concat([table.categorical.get(name) for table in tables], lengths)
+            for name in categorical_names
+        }
+        text = {
+            name: np.concatenate([table.text.get(name, np.full(table.length, None, dtype=object))
+                                  for table in tables]) if tables else np.empty(0, dtype=object)
+            for name in text_names
+        }
+        merged = cls(numeric, categorical, text, sum(lengths))
+        if dedupe_by is not None and merged.length:
+            keys = merged.text[dedupe_by]
+            present = np.array([key is not None and key != '' for key in keys], dtype=bool)
+            rows = np.flatnonzero(present)
+            _, first = np.unique(keys[rows].astype(str), return_index=True)
+            merged = merged.take(np.sort(np.concatenate([rows[first], np.flatnonzero(~present)])))
+        return merged
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def columns(self):
+        return list(self.text) + list(self.numeric) + list(self.categorical)
+
+    def column(self, name):
+        """
+        返回列的值数组（字典编码列解码为原值）
+        """
+        if name in self.numeric:
+            return self.numeric[name]
+        if name in self.categorical:
+            return self.categorical[name].decode()
+        return self.text[name]
+
+    # ---------- 掩码 ----------
+
+    def eq(self, name, value):
+        if name in self.categorical:
+            column = self.categorical[name]
+            return column.codes == column.code_of(value)
+        return self.column(name) == value
+
+    def isin(self, name, values):
+        if name in self.categorical:
+            column = self.categorical[name]
+            return np.isin(column.codes, [column.code_of(value) for value in values])
+        return np.isin(self.column(name), list(values))
+
+    def between(self, name, low=None, high=None):
+        values = self.numeric[name]
+        mask = values != MISSING
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+    # ---------- 选取 ----------
+
+    def take(self, indices):
+        return BookTable(
+            {name: values[indices] for name, values in self.numeric.items()},
+            {name: column.take(indices) for name, column in self.categorical.items()},
+            {name: values[indices] for name, values in self.text.items()},
+            len(indices),
+        )
+
+    def where(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def top_k(self, metric, k, mask=None, largest=True):
+        """
+        按数值列取前k行（结果已排序）；先 argpartition 选出k个，再只对这k个排序，复杂度 O(n + k log k)
+        缺失值不参与排名
+        """
+        values = self.numeric[metric]
+        valid = values != MISSING
+        if mask is not None:
+            valid &= mask
+        candidates = np.flatnonzero(valid)
+        if not len(candidates):
+            return self.take(candidates)
+        keys = values[candidates]
+        if largest:
+            keys = -keys
+        k = min(k, len(candidates))
+        if k < len(candidates):
+            part = np.argpartition(keys, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        order = part[np.argsort(keys[part], kind='stable')]
+        return self.take(candidates[order])
+
+    def to_records(self):
+        """
+        转换回记录列表（数值列为解析后的整数）
+        """
+        columns = {name: self.column(name) for name in self.columns}
+        records = []
+        for i in range(self.length):
+            record = {}
+            for name, values in columns.items():
+                value = values[i]
+                record[name] = value.item() if isinstance(value, np.generic) else value
+            records.append(record)
+        return records
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段追踪与性能分析
+
+功能描述：
+  span(name) 记录一个命名阶段的起止时间、所在线程和附加参数，可导出为 Chrome trace 格式
+  （chrome://tracing 或 https://ui.perfetto.dev 打开），也可汇总为各阶段的总耗时。
+  未启用追踪时 span() 几乎没有开销，各模块可以直接在关键阶段埋点。
+
+  profile_run 在性能分析器下运行一个函数：
+  - 输出文件以 .prof 结尾时使用 cProfile（可用 snakeviz / flameprof / gprof2dot 查看）
+  - 否则使用采样分析器，定时采集所有线程的调用栈，输出折叠栈格式（每行 "帧;帧;帧 次数"），
+    可直接交给 flamegraph.pl、speedscope、inferno 生成火焰图
+
+模块说明：
+  - Tracer: 记录span，write_chrome_trace 导出
+  - enable / disable / span / traced: 全局追踪开关与埋点
+  - SamplingProfiler: 基于 sys._current_frames 的采样分析器
+  - profile_run: 在 cProfile 或采样分析器下运行函数
+"""
+
+import os
+import sys
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+from mcp.jsonio import dump_json
+
+# 采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class Tracer:
+    """
+    span 记录器，线程安全；时间为相对创建时刻的微秒数
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, name, category, start, end, args=None):
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': category,
+            'ts': (start - self.origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'tid': thread.ident,
+            'thread': thread.name,
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    def chrome_trace(self):
+        """
+        返回 Chrome trace 格式的dict（完整事件 ph=X，另附线程名元数据）
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace = []
+        for tid, name in sorted({(event['tid'], event['thread']) for event in events}, key=lambda item: item[0]):
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+        for event in sorted(events, key=lambda event: event['ts']):
+            item = {'name': event['name'], 'cat': event['cat'], 'ph': 'X', 'pid': pid, 'tid': event['tid'],
+                    'ts': round(event['ts'], 3), 'dur': round(event['dur'], 3)}
+            if 'args' in event:
+                item['args'] = event['args']
+            trace.append(item)
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        dump_json(self.chrome_trace(), path, default=str)
+        return path
+
+    def summary(self):
+        """
+        按span名称汇总：{名称: {'count', 'total', 'max'}}，时间单位为秒
+        """
+        result = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            item = result.setdefault(event['name'], {'count': 0, 'total': 0.0, 'max': 0.0})
+            seconds = event['dur'] / 1e6
+            item['count'] += 1
+            item['total'] += seconds
+            item['max'] = max(item['max'], seconds)
+        return result
+
+
+_tracer = None
+
+
+def enable(tracer=None):
+    """
+    启用全局追踪，返回使用的 Tracer
+    """
+    global _tracer
+    _tracer = tracer or Tracer()
+    return _tracer
+
+
+def disable():
+    """
+    关闭全局追踪，返回之前的 Tracer
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def current_tracer():
+    return _tracer
+
+
+@contextmanager
+def span(name, category='stage', **args):
+    """
+    记录一个阶段；未启用追踪时直接执行
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record(name, category, start, time.perf_counter(), args)
+
+
+def traced(name, category='stage'):
+    """
+    装饰器：把整个函数调用记录为一个span
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def print_summary(tracer):
+    """
+    按总耗时降序打印各span的次数、总耗时和最长一次
+    """
+    summary = tracer.summary()
+    print("\n--- 阶段追踪汇总 ---")
+    for name, item in sorted(summary.items(), key=lambda pair: pair[1]['total'], reverse=True):
+        print(f"{name:<24} {item['count']:>5}次  总计 {item['total']:.3f}秒  最长 {item['max']:.3f}秒")
+    return summary
+
+
+class SamplingProfiler:
+    """
+    采样分析器：后台线程每 interval 秒采集一次所有线程（除自身）的调用栈，按折叠栈计数
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            stack = ';'.join(reversed(labels))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write_folded(self, path):
+        """
+        写出折叠栈（flamegraph.pl / speedscope 可直接读取）
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def profile_run(func, output_path, interval=DEFAULT_SAMPLE_INTERVAL):
+    """
+    在性能分析器下运行 func()，返回其返回值；分析结果写到 output_path
+    .prof 使用 cProfile（只分析调用线程），其他扩展名使用采样分析器（覆盖所有线程）
+    """
+    if output_path.endswith('.prof'):
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            directory = os.path.dirname(output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(output_path)
+            print(f"cProfile 结果已保存到 {output_path}")
+    profiler = SamplingProfiler(interval).start()
+    try:
+        return func()
+    finally:
+        profiler.stop()
+        profiler.write_folded(output_path)
+        print(f"采样 {profiler.samples} 次，折叠栈已保存到 {output_path}")
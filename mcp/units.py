@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数值字段解析
+
+功能描述：
+  解码后的 read_count / word_count 是 "370.9万人在读"、"291.3万字"、"1.2亿" 这样的文本，
+  这里统一转换为整数，便于存储和排序。
+"""
+
+import re
+
+UNITS = {'': 1, '万': 10_000, '亿': 100_000_000}
+COUNT_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([万亿]?)')
+
+
+def parse_count(value):
+    """
+    把带 万/亿 单位的计数文本转换为整数，无法解析时返回None
+    "370.9万人在读" -> 3709000，"1.2亿" -> 120000000，"12,345" -> 12345
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = COUNT_RE.search(str(value))
+    if not match:
+        return None
+    number, unit = match.groups()
+    return int(round(float(number.replace(',', '')) * UNITS[unit]))
+
+
+def parse_int(value):
+    """
+    解析整数字段（如时间戳 "1751799617"），无法解析时返回None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式爬取任务队列
+
+功能描述：
+  把大规模爬取拆成 (榜单, 页码) 任务，多个进程或多台机器上的 worker 以租约方式领取：
+  领取时设置租约到期时间，完成后标记完成；worker 崩溃时租约到期，任务自动回到队列被其他 worker 领取，
+  只损失该 worker 正在处理的页。失败的任务重试，超过最大尝试次数后标记失败。
+  每次爬取有一个爬取编号 crawl_id（写入任务参数），每个 worker 把结果写到自己的 NDJSON 分片文件，
+  每条记录带 crawl_id 和抓取时间 captured_at；
+  最后只合并当前爬取的记录（按 榜单+名次 去重，保留抓取时间最新的一条；之前爬取留在分片目录中的记录，
+  包括本次没有爬到的更深名次，都不会混入结果）。
+
+  队列默认存储在一个SQLite文件中（同一台机器的多个进程，或放在共享存储上）。
+  其他存储（如数据库服务）只需实现与 WorkQueue 相同的 enqueue / claim / complete / fail / counts 方法。
+
+模块说明：
+  - WorkQueue: SQLite任务队列
+  - run_worker: worker主循环
+  - merge_shards: 合并各 worker 的分片文件并写出到输出插件
+
+使用示例:
+  python -m mcp.workqueue --db output/crawl.sqlite enqueue --lists=-1:-1:0,1:262:0 --pages 10
+  python -m mcp.workqueue --db output/crawl.sqlite worker --worker-id host1-0
+  python -m mcp.workqueue --db output/crawl.sqlite merge --shard-dir output/shards --sink ndjson --sink sqlite
+"""
+
+import os
+import glob
+import json
+import time
+import socket
+import sqlite3
+import secrets
+
+import requests
+
+from mcp.api.client import get_book_list
+from mcp.history import make_list_key
+from mcp.sinks import NDJSONSink, open_sink, iter_book_records
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_SHARD_DIR = os.path.join('output', 'shards')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    params TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, lease_expires);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def new_crawl_id():
+    """
+    生成爬取编号：开始时间 + 随机后缀
+    """
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def crawl_jobs(lists, pages, page_count=20):
+    """
+    为每个榜单 (gender, category_id, sort) 生成 pages 页的任务参数
+    """
+    return [{'gender': gender, 'category_id': category_id, 'sort': sort, 'page_index': page_index,
+             'page_count': page_count}
+            for gender, category_id, sort in lists for page_index in range(pages)]
+
+
+class WorkQueue:
+    """
+    基于SQLite的租约任务队列；任务状态 pending -> leased -> done，失败重试，超过 max_attempts 次为 failed
+    """
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 手动管理事务，领取任务时用 BEGIN IMMEDIATE 保证多个进程不会领到同一任务
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def current_crawl(self):
+        """
+        当前爬取编号，尚未添加过任务时返回None
+        """
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'crawl_id'").fetchone()
+        return row[0] if row else None
+
+    def enqueue(self, jobs, new_crawl=False):
+        """
+        添加任务（参数dict）到当前爬取，已存在的相同任务忽略，返回新增数量
+        队列中还没有爬取编号或 new_crawl 为True时开始新的爬取；任务参数中写入 crawl_id
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            crawl_id = None if new_crawl else self.current_crawl()
+            if crawl_id is None:
+                crawl_id = new_crawl_id()
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('crawl_id', ?)", (crawl_id,))
+            rows = [(json.dumps(dict(job, crawl_id=crawl_id), sort_keys=True), now) for job in jobs]
+            before = self.conn.total_changes
+            self.conn.executemany('INSERT OR IGNORE INTO jobs (params, updated_at) VALUES (?, ?)', rows)
+            added = self.conn.total_changes - before
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, worker_id, limit=1):
+        """
+        领取最多 limit 个任务（待处理的，或租约已过期的），返回 [(job_id, params), ...]
+        租约过期且已达到最大尝试次数的任务标记为失败
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.execute("UPDATE jobs SET state = 'failed', error = '租约过期且超过最大尝试次数', updated_at = ? "
+                              "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                              (now, now, self.max_attempts))
+            rows = self.conn.execute(
+                "SELECT id, params FROM jobs WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT ?", (now, limit)).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                [(worker_id, now + self.lease_seconds, now, job_id) for job_id, _ in rows])
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return [(job_id, json.loads(params)) for job_id, params in rows]
+
+    def _finish(self, job_id, worker_id, sql, params):
+        # 只有仍持有租约的 worker 能更新任务（租约过期后任务可能已被其他 worker 领取）
+        cursor = self.conn.execute(f"{sql} WHERE id = ? AND owner = ? AND state = 'leased'",
+                                   params + (job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id):
+        """
+        标记任务完成，返回是否仍持有该任务的租约
+        """
+        return self._finish(job_id, worker_id, "UPDATE jobs SET state = 'done', updated_at = ?", (time.time(),))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        任务失败：未达到最大尝试次数时放回队列，否则标记为失败
+        """
+        return self._finish(
+            job_id, worker_id,
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner = NULL, lease_expires = NULL, error = ?, updated_at = ?",
+            (self.max_attempts, str(error), time.time()))
+
+    def extend(self, job_id, worker_id):
+        """
+        续约（处理时间可能超过租约时长时调用）
+        """
+        return self._finish(job_id, worker_id, 'UPDATE jobs SET lease_expires = ?',
+                            (time.time() + self.lease_seconds,))
+
+    def counts(self):
+        """
+        各状态的任务数
+        """
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for state, count in self.conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'):
+            counts[state] = count
+        return counts
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(queue, worker_id=None, shard_dir=DEFAULT_SHARD_DIR, decoder=None, api_url=None, poll_interval=1.0,
+               max_jobs=None):
+    """
+    worker主循环：领取任务 -> 请求榜单 -> 写入本 worker 的分片文件 -> 标记完成
+    队列中没有待处理和租约中的任务时退出；decoder 不为None时写入解码后的记录
+    返回 {'done', 'failed', 'lost'}（lost 为完成时租约已被其他 worker 接手的任务数）
+    """
+    worker_id = worker_id or default_worker_id()
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_path = os.path.join(shard_dir, f"{worker_id}.ndjson")
+    stats = {'done': 0, 'failed': 0, 'lost': 0}
+    with requests.Session() as session, NDJSONSink(shard_path, append=True) as shard:
+        while max_jobs is None or sum(stats.values()) < max_jobs:
+            jobs = queue.claim(worker_id)
+            if not jobs:
+                counts = queue.counts()
+                if not counts['pending'] and not counts['leased']:
+                    break
+                # 其他 worker 的租约尚未到期，等待其完成或过期
+                time.sleep(poll_interval)
+                continue
+            job_id, params = jobs[0]
+            params = dict(params)
+            crawl_id = params.pop('crawl_id', None)
+            data, _ = get_book_list(api_url=api_url, session=session, save_raw=False, **params)
+            if data is None:
+                queue.fail(job_id, worker_id, '请求失败')
+                stats['failed'] += 1
+                continue
+            captured_at = time.time()
+            list_key = make_list_key(params.get('gender', -1), params.get('category_id', -1), params.get('sort', 0))
+            records = []
+            offset = params.get('page_index', 0) * params.get('page_count', 20)
+            for rank, book in enumerate(iter_book_records(data), start=offset + 1):
+                book = dict(book, list_key=list_key, page_index=params.get('page_index', 0), rank=rank,
+                            crawl_id=crawl_id, captured_at=captured_at)
+                if decoder is not None:
+                    book = {key: decoder.decrypt_text(value) if isinstance(value, str) else value
+                            for key, value in book.items()}
+                records.append(book)
+            shard.write(records)
+            # 先写出结果再标记完成：崩溃时任务会被重新执行，重复的记录在合并时去重
+            shard.flush()
+            if queue.complete(job_id, worker_id):
+                stats['done'] += 1
+            else:
+                stats['lost'] += 1
+    return stats
+
+
+def iter_shard_records(shard_dir=DEFAULT_SHARD_DIR):
+    """
+    逐条读取所有分片文件中的记录（忽略崩溃时写了一半的行）
+    """
+    for path in sorted(glob.glob(os.path.join(shard_dir, '*.ndjson'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def merge_shards(shard_dir=DEFAULT_SHARD_DIR, kinds=('ndjson',), output_dir='output', basename='crawl_books',
+                 crawl_id=None):
+    """
+    合并分片：crawl_id 不为None时只取该次爬取的记录，否则合并全部记录；
+    按 (榜单, 名次) 去重，保留 captured_at 最新的一条（相同时保留后读到的，
+    没有 captured_at 的旧记录视为最早），按榜单和名次排序后写到各输出插件
+    返回 {输出类型: 输出路径}，以及合并后的记录数
+    """
+    merged = {}
+    for record in iter_shard_records(shard_dir):
+        if crawl_id is not None and record.get('crawl_id') != crawl_id:
+            continue
+        key = (record.get('list_key'), record.get('rank'))
+        previous = merged.get(key)
+        if previous is None or (record.get('captured_at') or 0) >= (previous.get('captured_at') or 0):
+            merged[key] = record
+    records = [merged[key] for key in sorted(merged, key=lambda key: (str(key[0]), key[1] or 0))]
+    outputs = {}
+    for kind in kinds:
+        with open_sink(kind, output_dir=output_dir, basename=basename) as sink:
+            sink.write(records)
+        outputs[kind] = sink.path
+    return outputs, len(records)
+
+
+def main():
+    import argparse
+    from mcp.daemon import parse_list_specs
+    parser = argparse.ArgumentParser(description='分布式爬取任务队列')
+    parser.add_argument('--db', default=os.path.join('output', 'crawl_queue.sqlite'), help='任务队列数据库路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help='添加爬取任务')
+    enqueue_parser.add_argument('--lists', default='-1:-1:0', help='榜单，格式 gender:category_id:sort，多个用逗号分隔')
+    enqueue_parser.add_argument('--pages', type=int, default=1, help='每个榜单的页数')
+    enqueue_parser.add_argument('--page-count', type=int, default=20, help='每页数量')
+    enqueue_parser.add_argument('--new-crawl', action='store_true',
+                                help='开始新的爬取（默认加入队列中的当前爬取，队列为空时自动开始新的爬取）')
+
+    worker_parser = subparsers.add_parser('worker', help='运行worker领取并执行任务')
+    worker_parser.add_argument('--worker-id', default=None, help='worker标识，默认 主机名-进程号')
+    worker_parser.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR, help='分片文件目录')
+    worker_parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS, help='租约时长（秒）')
+    worker_parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS, help='单个任务最大尝试次数')
+    worker_parser.add_argument('--api-url', default=None, help='接口地址（默认番茄小说接口）')
+    worker_parser.add_argument('--decode', action='store_true', help='用站点当前字体的映射表（没有时用最新的映射表）解码后写入')
+    worker_parser.add_argument('--page-url', default=None, help='提取站点当前字体的榜单页面地址')
+
+    merge_parser = subparsers.add_parser('merge', help='合并各worker的分片文件')
+    merge_parser.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR, help='分片文件目录')
+    merge_parser.add_argument('--sink', action='append', choices=['ndjson', 'csv', 'sqlite'], help='输出格式，可重复指定')
+    merge_parser.add_argument('--crawl-id', default=None, help='只合并该次爬取的记录（默认为 --db 队列中的当前爬取）')
+    merge_parser.add_argument('--all-crawls', action='store_true', help='合并分片目录中所有爬取的记录')
+
+    subparsers.add_parser('status', help='查看各状态的任务数')
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        crawl_id = args.crawl_id
+        if crawl_id is None and not args.all_crawls and os.path.exists(args.db):
+            with WorkQueue(args.db) as queue:
+                crawl_id = queue.current_crawl()
+        if crawl_id is None and not args.all_crawls:
+            print(f"警告: 队列 {args.db} 中没有爬取编号，合并分片目录中所有爬取的记录")
+        else:
+            print(f"合并爬取 {crawl_id or '全部'} 的记录")
+        outputs, count = merge_shards(args.shard_dir, args.sink or ['ndjson'], crawl_id=crawl_id)
+        for kind, path in outputs.items():
+            print(f"已合并 {count} 条记录到 {path}")
+        return
+
+    queue = WorkQueue(args.db, **({'lease_seconds': args.lease_seconds, 'max_attempts': args.max_attempts}
+                                  if args.command == 'worker' else {}))
+    with queue:
+        if args.command == 'enqueue':
+            added = queue.enqueue(crawl_jobs(parse_list_specs(args.lists), args.pages, args.page_count),
+                                  new_crawl=args.new_crawl)
+            print(f"爬取 {queue.current_crawl()}: 新增 {added} 个任务，当前队列: {queue.counts()}")
+        elif args.command == 'worker':
+            decoder = None
+            if args.decode:
+                from mcp.api.batch import load_cached_decoder, fetch_current_font_hash, DEFAULT_PAGE_URL
+                current_hash = fetch_current_font_hash(args.page_url or DEFAULT_PAGE_URL)
+                decoder, font_hash = load_cached_decoder(font_hash=current_hash) if current_hash else (None, None)
+                if decoder is None:
+                    decoder, font_hash = load_cached_decoder()
+                if decoder is None:
+                    print("没有可用的映射表，写入未解码的记录")
+                elif font_hash != current_hash:
+                    print(f"警告: 站点当前字体 {current_hash or '未知'} 没有映射表，使用 {font_hash} 的映射，解码结果可能有误")
+            stats = run_worker(queue, args.worker_id, args.shard_dir, decoder=decoder, api_url=args.api_url)
+            print(f"worker结束: {stats}，当前队列: {queue.counts()}")
+        else:
+            print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
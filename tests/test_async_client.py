@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.fanqie_standin import StandinConfig, start_standin_server
+
+pytest.importorskip('aiohttp')
+from mcp.api.async_client import AsyncFanqieClient, get_book_lists  # noqa: E402
+
+
+def test_many_requests_in_flight_on_one_loop():
+    """
+    一个事件循环同时保持全部请求：60个各延迟300ms的请求总耗时远小于串行；相同请求合并，字体与页面并发获取
+    """
+    server = start_standin_server(StandinConfig(latency_ms=300, pages=30))
+    try:
+        async def run():
+            async with AsyncFanqieClient(limit=100, api_url=server.book_list_url) as client:
+                queries = [{'gender': gender, 'page_index': i} for gender in (0, 1) for i in range(30)]
+                start = time.perf_counter()
+                pages, html, duplicate = await asyncio.gather(
+                    client.get_book_lists(queries),
+                    client.fetch_html(server.library_url),
+                    client.get_book_list(gender=0, page_index=0),
+                )
+                elapsed = time.perf_counter() - start
+                font_url = html.split(server.base_url + '/font/', 1)[1].split('"')[0].split(')')[0]
+                font = await client.download_font(server.base_url + '/font/' + font_url)
+                return pages, duplicate, font, elapsed, dict(client.stats)
+
+        pages, duplicate, font, elapsed, stats = asyncio.run(run())
+        assert len(pages) == 60 and all(page['data']['book_list'] for page in pages)
+        assert duplicate == pages[0]
+        assert stats == {'issued': 60, 'coalesced': 1, 'failed': 0}
+        assert font and font[:4] == b'OTTO'
+        assert elapsed < 3
+    finally:
+        server.shutdown()
+
+
+def test_sync_wrapper_and_timeouts():
+    """
+    同步包装返回与查询顺序一致的结果；超时的请求返回None而不是一直阻塞
+    """
+    server = start_standin_server(StandinConfig(latency_ms=500, pages=2))
+    try:
+        pages = get_book_lists([{'page_index': 1}, {'page_index': 0}], api_url=server.book_list_url)
+        assert [page['data']['has_more'] for page in pages] == [False, True]
+        assert get_book_lists([{'page_index': 0}], timeout=0.1, api_url=server.book_list_url) == [None]
+    finally:
+        server.shutdown()
+
+
+def test_coalesced_callers_get_independent_copies():
+    """
+    合并的请求每个调用方拿到独立的一份，修改互不影响；请求失败时只计一次失败
+    """
+    server = start_standin_server(StandinConfig(latency_ms=200, pages=1))
+    try:
+        async def mutate(client, **query):
+            page = await client.get_book_list(**query)
+            if page is not None:
+                page['data']['book_list'].clear()
+            return page
+
+        async def run():
+            async with AsyncFanqieClient(api_url=server.book_list_url) as client:
+                pages = await asyncio.gather(client.get_book_list(page_index=0), mutate(client, page_index=0),
+                                             client.get_book_list(page_index=0))
+                failed = await asyncio.gather(*(client.get_book_list(page_index=0, timeout=0.05) for _ in range(3)))
+                return pages, failed, dict(client.stats)
+
+        pages, failed, stats = asyncio.run(run())
+        assert pages[0]['data']['book_list'] and pages[2]['data']['book_list']
+        assert pages[0] == pages[2] and pages[0] is not pages[2]
+        assert pages[1]['data']['book_list'] == []
+        assert failed == [None, None, None]
+        assert stats == {'issued': 2, 'coalesced': 4, 'failed': 1}
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_many_requests_in_flight_on_one_loop()
+    test_sync_wrapper_and_timeouts()
+    test_coalesced_callers_get_independent_copies()
+    print("测试通过")
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.api.batch import expand_queries, get_book_list_batch, load_cached_decoder
+from tools.fanqie_standin import StandinConfig, start_standin_server
+
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'cache'))
+
+
+def test_expand_queries():
+    """
+    查询参数补全默认值，页码范围展开为多页，未知参数报错
+    """
+    queries = expand_queries([{'gender': 1, 'category_id': 262}, {'gender': 0}], page_range=[0, 2],
+                             base={'sort': 1})
+    assert [(q['gender'], q['page_index'], q['sort'], q['page_count']) for q in queries] == \
+        [(1, 0, 1, 20), (1, 1, 1, 20), (0, 0, 1, 20), (0, 1, 1, 20)]
+    assert expand_queries()[0]['category_id'] == -1
+    try:
+        expand_queries([{'gendre': 1}])
+        assert False, '应当拒绝未知参数'
+    except ValueError:
+        pass
+
+
+def test_batch_decodes_and_projects_fields():
+    """
+    对替身服务器并发查询多页，只返回请求的字段，文本字段用缓存映射解码
+    """
+    server = start_standin_server(StandinConfig(pages=3))
+    old_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # 解码器会在字体目录写缓存，复制到临时目录使用
+            shutil.copytree(CACHE_DIR, os.path.join(tmp, 'cache'))
+            os.chdir(tmp)
+            decoder, font_hash = load_cached_decoder()
+            assert decoder is not None and font_hash
+            result = get_book_list_batch(queries=[{'gender': 1}, {'gender': 0}], page_range=[0, 3],
+                                         fields=['book_id', 'book_name', 'read_count'], decoder=decoder,
+                                         api_url=server.book_list_url, page_url=server.library_url)
+            assert not os.path.exists('debug')
+            os.chdir(old_cwd)
+        # 6 页数据 + 检查当前字体的页面和字体各一次
+        assert server.requests == 8
+        assert result['decoded'] and result['success']
+        assert result['font_hash'] == font_hash and result['font_current'] is True
+        assert [r['query']['page_index'] for r in result['results']] == [0, 1, 2, 0, 1, 2]
+        assert [r['has_more'] for r in result['results'][:3]] == [True, True, False]
+        book = result['results'][0]['books'][0]
+        assert set(book) == {'book_id', 'book_name', 'read_count'}
+        assert book['read_count'].endswith('人在读')
+        assert not any('\ue000' <= char <= '\uf8ff' for char in json.dumps(result, ensure_ascii=False))
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+
+
+def test_batch_reports_font_when_current_font_unknown():
+    """
+    无法获取站点当前字体时仍报告实际使用的字体哈希，font_current 为None
+    """
+    server = start_standin_server(StandinConfig(pages=1))
+    old_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copytree(CACHE_DIR, os.path.join(tmp, 'cache'))
+            os.chdir(tmp)
+            _, expected_hash = load_cached_decoder()
+            result = get_book_list_batch(queries=[{'gender': 1}], fields=['book_name'], api_url=server.book_list_url,
+                                         page_url=server.base_url + '/missing')
+            os.chdir(old_cwd)
+        assert result['decoded'] and result['font_hash'] == expected_hash
+        assert result['font_current'] is None
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_expand_queries()
+    test_batch_decodes_and_projects_fields()
+    test_batch_reports_font_when_current_font_unknown()
+    print("测试通过")
@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import stat
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.covers import (download_covers, collect_covers, iter_input_records, guess_extension, parse_rate,
+                        BandwidthLimiter, CoverStore)
+from mcp.jsonio import dump_json, file_mode_for
+
+JPEG = b'\xff\xd8\xff\xe0' + b'cover-a' * 100
+PNG = b'\x89PNG\r\n\x1a\n' + b'cover-b' * 100
+IMAGES = {'/a.image': JPEG, '/a-copy.image': JPEG, '/b.image': PNG}
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.paths.append(self.path.split('?', 1)[0])
+        body = IMAGES.get(self.path.split('?', 1)[0])
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _start_image_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ImageHandler)
+    server.daemon_threads = True
+    server.paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _records(base_url):
+    future = int(time.time()) + 3600
+    signed = f"?x-expires={future}&x-signature=abc"
+    return [
+        {'book_id': '1', 'thumb_uri': 'novel-pic/a', 'thumb_url': f"{base_url}/a.image{signed}"},
+        # 同一本书出现在另一个榜单，只下载一次
+        {'book_id': '1', 'thumb_uri': 'novel-pic/a', 'thumb_url': f"{base_url}/a.image{signed}"},
+        # 不同 thumb_uri 但内容相同，只存一份文件
+        {'book_id': '2', 'thumb_uri': 'novel-pic/a-copy', 'thumb_url': f"{base_url}/a-copy.image{signed}"},
+        {'book_id': '3', 'thumb_uri': 'novel-pic/b', 'thumb_url': f"{base_url}/b.image{signed}"},
+        {'book_id': '4', 'thumb_uri': 'novel-pic/expired', 'thumb_url': f"{base_url}/b.image?x-expires=1000"},
+        {'book_id': '5', 'thumb_uri': 'novel-pic/missing', 'thumb_url': f"{base_url}/missing.image{signed}"},
+        {'book_id': '6'},
+    ]
+
+
+def test_collect_covers_prefers_latest_signature():
+    covers = collect_covers([
+        {'thumb_uri': 'x', 'thumb_url': 'http://h/x?x-expires=100'},
+        {'thumb_uri': 'x', 'thumb_url': 'http://h/x?x-expires=200'},
+        {'thumb_uri': 'x', 'thumb_url': 'http://h/x?x-expires=150'},
+        {'thumb_url': 'http://h/y?x-expires=1'},
+    ])
+    assert covers == {'x': 'http://h/x?x-expires=200', 'http://h/y': 'http://h/y?x-expires=1'}
+
+
+def test_download_dedupes_and_skips_existing():
+    """
+    按 thumb_uri 去重、按内容存储；过期地址不请求；第二次运行不再发出任何请求
+    """
+    server = _start_image_server()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cover_dir = os.path.join(temp_dir, 'covers')
+            records = _records(f"http://127.0.0.1:{server.server_address[1]}")
+            stats = download_covers(records, cover_dir, max_workers=4)
+            assert stats['unique'] == 5
+            assert (stats['downloaded'], stats['stored'], stats['expired'], stats['failed']) == (3, 2, 1, 1)
+            assert sorted(server.paths) == ['/a-copy.image', '/a.image', '/b.image', '/missing.image']
+
+            with CoverStore(cover_dir) as store:
+                path_a = store.lookup('novel-pic/a')
+                assert path_a == store.lookup('novel-pic/a-copy')
+                assert path_a.endswith('.jpg') and store.lookup('novel-pic/b').endswith('.png')
+                assert store.lookup('novel-pic/missing') is None
+                with open(path_a, 'rb') as f:
+                    assert f.read() == JPEG
+                if os.name != 'nt':
+                    assert stat.S_IMODE(os.stat(path_a).st_mode) == file_mode_for(path_a + '.new')
+
+            server.paths.clear()
+            stats = download_covers(records, cover_dir)
+            assert stats['skipped'] == 3 and stats['downloaded'] == 0
+            assert server.paths == ['/missing.image']
+
+            # 文件被删除后重新下载
+            os.remove(path_a)
+            server.paths.clear()
+            stats = download_covers(records[:1], cover_dir)
+            assert stats['downloaded'] == 1 and server.paths == ['/a.image']
+    finally:
+        server.shutdown()
+
+
+def test_iter_input_records_reads_json_daemon_and_ndjson():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page = {'data': {'book_list': [{'book_id': '1'}, {'book_id': '2'}]}}
+        dump_json(page, os.path.join(temp_dir, 'decoded.json'))
+        dump_json({'captured_at': 1, 'font_hash': 'f', 'data': page}, os.path.join(temp_dir, 'ranking.json'))
+        with open(os.path.join(temp_dir, 'shard.ndjson'), 'w', encoding='utf-8') as f:
+            f.write('{"book_id": "3"}\n{"book_id": "4"}\n{"book_')
+        ids = [record['book_id'] for record in iter_input_records([temp_dir])]
+        assert ids == ['1', '2', '1', '2', '3', '4']
+
+
+def test_bandwidth_limiter_and_helpers():
+    limiter = BandwidthLimiter(200 * 1024)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.consume(40 * 1024)
+    assert time.monotonic() - start >= 0.35
+    assert parse_rate('2M') == 2 * 1024 * 1024 and parse_rate('500KB/s') == 500 * 1024 and parse_rate(None) is None
+    assert parse_rate('2MiB') == parse_rate('2mib/s') == parse_rate('2 MB') == 2 * 1024 * 1024
+    assert parse_rate('1.5k') == 1536 and parse_rate('1048576') == parse_rate('1048576B') == 1024 * 1024
+    assert parse_rate('0') is None and parse_rate('') is None
+    for text in ('2X', 'fast', '-1M', '2MM', 'K', '1e3'):
+        try:
+            parse_rate(text)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'{text!r} 应当无法解析')
+    assert guess_extension(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == '.webp'
+    assert guess_extension(b'????', 'image/avif') == '.avif'
+
+
+if __name__ == "__main__":
+    test_collect_covers_prefers_latest_signature()
+    test_download_dedupes_and_skips_existing()
+    test_iter_input_records_reads_json_daemon_and_ndjson()
+    test_bandwidth_limiter_and_helpers()
+    print("测试通过")
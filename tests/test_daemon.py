@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.daemon import RankingDaemon, AdaptiveInterval, parse_list_specs, ranking_change_ratio
+from tools.fanqie_standin import StandinConfig, start_standin_server
+
+MAPPING_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'cache', 'mappings'))
+
+
+def test_adaptive_interval():
+    """
+    变化大时缩短间隔，变化小时拉长间隔，且不超出上下限
+    """
+    assert parse_list_specs('-1:-1:0, 1:262:1') == [(-1, -1, 0), (1, 262, 1)]
+    assert ranking_change_ratio(['a', 'b', 'c', 'd'], ['a', 'c', 'b', 'd']) == 0.5
+    assert ranking_change_ratio([], []) == 0.0
+    interval = AdaptiveInterval(10, 40, initial=20)
+    assert interval.update(0.5) == 10
+    assert interval.update(0.5) == 10
+    assert interval.update(0.0) == 15
+    for _ in range(5):
+        interval.update(0.0)
+    assert interval.current == 40
+
+
+def test_daemon_checks_font_once_and_refreshes_lists():
+    """
+    对替身服务器运行守护进程：字体只下载并建立映射一次，之后的刷新复用常热的解码器
+    """
+    server = start_standin_server(StandinConfig(pages=1))
+    old_cwd = os.getcwd()
+    ensured = []
+
+    def ensure_mapping(font_path, mapping_path):
+        ensured.append(mapping_path)
+
+    def decode(data, decoder):
+        return decoder.decrypt_text(data['data']['book_list'][0]['book_name'])
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            daemon = RankingDaemon([(-1, -1, 0), (1, -1, 0)], ensure_mapping, decode,
+                                   min_interval=0, max_interval=0, font_interval=0,
+                                   output_dir=os.path.join(tmp, 'rankings'), mapping_dir=MAPPING_DIR,
+                                   font_dir=os.path.join(tmp, 'fonts'), page_url=server.library_url,
+                                   api_url=server.book_list_url, use_browser=False)
+            cycles = daemon.run(max_cycles=6)
+            outputs = sorted(os.listdir(os.path.join(tmp, 'rankings')))
+            os.chdir(old_cwd)
+        assert cycles == 6
+        assert len(ensured) == 1
+        assert daemon.stats['font_changes'] == 1
+        assert daemon.stats['font_checks'] == 2
+        assert daemon.stats['refreshes'] == 4
+        assert outputs == ['g-1_c-1_s0.json', 'g1_c-1_s0.json']
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+        server.server_close()
+
+
+def test_run_daemon_passes_urls():
+    """
+    main.run_daemon 把 --api-url / --page-url 传给守护进程
+    """
+    import main
+    import mcp.daemon
+    args = main.build_parser().parse_args(['--daemon', '--no-browser', '--no-decode-cache',
+                                           '--api-url', 'http://127.0.0.1:1/api',
+                                           '--page-url', 'http://127.0.0.1:1/page'])
+    seen = []
+    original = mcp.daemon.RankingDaemon.run
+    mcp.daemon.RankingDaemon.run = lambda self: seen.append((self.api_url, self.page_url))
+    try:
+        main.run_daemon(args)
+    finally:
+        mcp.daemon.RankingDaemon.run = original
+    assert seen == [('http://127.0.0.1:1/api', 'http://127.0.0.1:1/page')]
+
+
+if __name__ == "__main__":
+    test_adaptive_interval()
+    test_daemon_checks_font_once_and_refreshes_lists()
+    test_run_daemon_passes_urls()
+    print("测试通过")
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.decode_cache import DecodeCache, decode_value
+
+
+class CountingDecoder:
+    def __init__(self, mapping):
+        self.font_mapping = dict(mapping)
+        self.calls = 0
+
+    def decrypt_text(self, text):
+        self.calls += 1
+        return ''.join(self.font_mapping.get(char, char) for char in text)
+
+
+def _page(names, expires=1):
+    return {'code': 0, 'data': {'book_list': [
+        {'book_id': str(i), 'book_name': name, 'author': '\ue519九音域',
+         'thumb_url': f'http://img/{i}~tplv?x-expires={expires}'} for i, name in enumerate(names)
+    ], 'has_more': True}, 'message': 'success'}
+
+
+def test_only_new_records_are_decoded():
+    """
+    第二次爬取只有变化的记录调用解码器，签名地址取本次的值，结果与全量解码一致
+    """
+    decoder = CountingDecoder({'\ue3e8': '赤', '\ue519': '三', '\ue456': '戏'})
+    with tempfile.TemporaryDirectory() as tmp:
+        with DecodeCache(os.path.join(tmp, 'decoded.sqlite')) as cache:
+            first = _page(['我不是\ue456神', '\ue3e8心巡天'])
+            assert cache.decode_page(first, decoder, 'font1') == decode_value(first, decoder)
+
+            second = _page(['我不是\ue456神', '\ue3e8心巡天（新版）'], expires=2)
+            decoder.calls = 0
+            decoded = cache.decode_page(second, decoder, 'font1')
+            assert decoded == decode_value(second, CountingDecoder(decoder.font_mapping))
+            assert decoded['data']['book_list'][0]['thumb_url'].endswith('x-expires=2')
+            assert list(decoded['data']['book_list'][0]) == list(second['data']['book_list'][0])
+            # 外层 message 1次，第二本书 book_id/book_name/author/thumb_url 4次
+            assert decoder.calls == 5
+            assert cache.stats['hits'] == 1
+
+            # 校验页面修改映射后，该字体的缓存失效
+            decoder.font_mapping['\ue456'] = '魔'
+            decoded = cache.decode_page(second, decoder, 'font1')
+            assert decoded['data']['book_list'][0]['book_name'] == '我不是魔神'
+            assert cache.stats['invalidated'] == 3
+
+
+def test_size_based_eviction():
+    """
+    总大小超过上限时淘汰最久未使用的记录
+    """
+    decoder = CountingDecoder({})
+    with tempfile.TemporaryDirectory() as tmp:
+        with DecodeCache(os.path.join(tmp, 'decoded.sqlite'), max_bytes=600) as cache:
+            for batch in range(5):
+                books = [{'book_id': f'{batch}-{i}', 'book_name': '书' * 20} for i in range(3)]
+                cache.decode_records(books, decoder, 'font1')
+            assert cache.total_bytes() <= 600
+            assert cache.stats['evicted'] > 0
+            remaining = {row[0] for row in cache.conn.execute('SELECT book_id FROM entries')}
+            assert '4-2' in remaining and '0-0' not in remaining
+
+
+if __name__ == "__main__":
+    test_only_new_records_are_decoded()
+    test_size_based_eviction()
+    print("测试通过")
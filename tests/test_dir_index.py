@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.ocr_review.dir_index import DirectoryIndex, scan_images, latest_mapping_file
+
+
+def _touch(path, mtime=None):
+    with open(path, 'wb') as f:
+        f.write(b'x')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_index_rebuilds_only_when_directory_changes():
+    """
+    目录未变化时复用缓存和版本号，新增文件后重新扫描
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        _touch(os.path.join(tmp, 'UE3E8.png'))
+        _touch(os.path.join(tmp, 'notes.txt'))
+        builds = []
+
+        def build(path):
+            builds.append(path)
+            return scan_images(path)
+
+        index = DirectoryIndex(tmp, build)
+        version, images = index.get()
+        assert [item['unicode'] for item in images] == ['E3E8']
+        assert index.get() == (version, images)
+        assert len(builds) == 1
+
+        _touch(os.path.join(tmp, 'UE3E9.png'))
+        # 文件系统时间精度可能较粗，显式推进目录修改时间
+        os.utime(tmp, ns=(time.time_ns(), os.stat(tmp).st_mtime_ns + 1_000_000))
+        new_version, images = index.get()
+        assert new_version != version
+        assert [item['filename'] for item in images] == ['UE3E8.png', 'UE3E9.png']
+        assert len(builds) == 2
+
+
+def test_index_rebuilds_when_file_overwritten_in_place():
+    """
+    原地覆盖同名文件（目录修改时间不变）也会重新扫描，返回新的大小和版本号
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'UE3E8.png')
+        _touch(path, mtime=1000)
+        index = DirectoryIndex(tmp, scan_images)
+        version, images = index.get()
+        assert images[0]['size'] == 1
+
+        dir_mtime = os.stat(tmp).st_mtime_ns
+        with open(path, 'wb') as f:
+            f.write(b'new glyph')
+        os.utime(path, (2000, 2000))
+        assert os.stat(tmp).st_mtime_ns == dir_mtime
+        new_version, images = index.get()
+        assert new_version != version
+        assert images[0]['size'] == 9
+
+
+def test_latest_mapping_file_follows_new_fonts():
+    """
+    映射目录中出现新字体的映射文件后，定位器切换到最新文件
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        assert latest_mapping_file(tmp) is None
+        _touch(os.path.join(tmp, 'aaaa_mapping.json'), mtime=1000)
+        index = DirectoryIndex(tmp, latest_mapping_file)
+        assert index.get()[1].endswith('aaaa_mapping.json')
+
+        _touch(os.path.join(tmp, 'bbbb_mapping.json'), mtime=2000)
+        index.invalidate()
+        assert index.get()[1].endswith('bbbb_mapping.json')
+
+
+if __name__ == "__main__":
+    test_index_rebuilds_only_when_directory_changes()
+    test_index_rebuilds_when_file_overwritten_in_place()
+    test_latest_mapping_file_follows_new_fonts()
+    print("测试通过")
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.api.client import get_book_list
+from tools.fanqie_standin import StandinConfig, start_standin_server
+
+
+def test_standin_replays_book_list_pages():
+    """
+    替身服务器按页回放录制数据，超出总页数后 has_more 为 False
+    """
+    server = start_standin_server(StandinConfig(pages=2))
+    old_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # get_book_list 会写 debug/raw_api_data.json，放到临时目录
+            os.chdir(tmp)
+            first, _ = get_book_list(page_count=5, page_index=0, api_url=server.book_list_url)
+            last, _ = get_book_list(page_count=5, page_index=1, api_url=server.book_list_url)
+            os.chdir(old_cwd)
+        assert len(first['data']['book_list']) == 5
+        assert first['data']['has_more'] is True
+        assert last['data']['has_more'] is False
+        assert server.requests == 2
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+        server.server_close()
+
+
+def test_standin_injects_errors():
+    """
+    错误率为1时榜单接口总是失败
+    """
+    server = start_standin_server(StandinConfig(error_rate=1.0, seed=0))
+    old_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            data, path = get_book_list(api_url=server.book_list_url)
+            os.chdir(old_cwd)
+        assert data is None and path is None
+        assert server.errors == 1
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_standin_replays_book_list_pages()
+    test_standin_injects_errors()
+    print("测试通过")
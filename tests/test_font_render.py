@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import numpy as np
+from PIL import Image, ImageDraw
+from fontTools.ttLib import TTFont
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.font_render_utils import (load_font, render_char_array, render_char_to_image, render_char_arrays,
+                                     render_chars_to_images, render_sprite_sheet, PARALLEL_THRESHOLD,
+                                     DEFAULT_IMG_SIZE, DEFAULT_FONT_SIZE)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FONT_PATH = os.path.join(ROOT, 'cache', 'fonts', '599ab49090584e23.otf')
+CHARS = [chr(char_code) for char_code in sorted(TTFont(FONT_PATH).getBestCmap())]
+
+
+def _legacy_render(font, char, img_size):
+    """
+    原实现：在5个偏移位置重复绘制加粗，再逐像素二值化
+    """
+    img = Image.new('L', (img_size, img_size), color=255)
+    draw = ImageDraw.Draw(img)
+    bbox = draw.textbbox((0, 0), char, font=font)
+    x = (img.width - (bbox[2] - bbox[0])) // 2 - bbox[0]
+    y = (img.height - (bbox[3] - bbox[1])) // 2 - bbox[1]
+    for dx, dy in [(0, 0), (1, 0), (0, 1), (-1, 0), (0, -1)]:
+        draw.text((x + dx, y + dy), char, font=font, fill=0)
+    return np.asarray(img.point(lambda p: 0 if p < 128 else 255, 'L'))
+
+
+def test_render_char_array_matches_image_and_legacy():
+    """
+    写出的图片与数组一致；与原来多次偏移绘制的结果相比，每个字最多只有极少数边缘像素不同
+    默认画布足够容纳字形，不会被裁切
+    """
+    font = load_font(FONT_PATH, DEFAULT_FONT_SIZE)
+    with tempfile.TemporaryDirectory() as tmp:
+        for char in CHARS[:20]:
+            arr = render_char_array(font, char)
+            assert arr.shape == (DEFAULT_IMG_SIZE, DEFAULT_IMG_SIZE) and arr.dtype == np.uint8
+            assert set(np.unique(arr)) <= {0, 255}
+            path = os.path.join(tmp, f"U{ord(char):04X}.png")
+            render_char_to_image(FONT_PATH, char, path)
+            with Image.open(path) as img:
+                assert img.mode == 'L' and (np.asarray(img) == arr).all()
+            assert (arr != _legacy_render(font, char, DEFAULT_IMG_SIZE)).mean() < 0.005
+            # 四周留白：字形没有碰到画布边缘
+            assert (arr[0] == 255).all() and (arr[-1] == 255).all()
+            assert (arr[:, 0] == 255).all() and (arr[:, -1] == 255).all()
+
+
+def test_render_char_arrays_process_pool_matches_serial():
+    """
+    超过阈值时走进程池，结果顺序与逐个渲染一致
+    """
+    chars = CHARS[:PARALLEL_THRESHOLD * 2]
+    font = load_font(FONT_PATH, DEFAULT_FONT_SIZE)
+    arrays = render_char_arrays(FONT_PATH, chars, workers=2)
+    assert len(arrays) == len(chars)
+    for char, arr in zip(chars, arrays):
+        assert (arr == render_char_array(font, char)).all()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        char_paths = [(char, os.path.join(tmp, f"U{ord(char):04X}.png")) for char in chars]
+        assert render_chars_to_images(FONT_PATH, char_paths, workers=2) == char_paths
+        assert len(os.listdir(tmp)) == len(chars)
+
+
+def test_render_sprite_sheet_index_positions():
+    """
+    精灵图按行排列，索引中的坐标处正好是该字符的渲染结果
+    """
+    chars = CHARS[:7]
+    img_size = 48
+    img, index = render_sprite_sheet(FONT_PATH, chars, img_size=img_size, font_size=40, cols=3)
+    assert img.size == (3 * img_size, 3 * img_size)
+    assert index[chars[0]] == (0, 0) and index[chars[4]] == (img_size, img_size)
+    assert index[chars[6]] == (0, 2 * img_size)
+    sheet = np.asarray(img)
+    font = load_font(FONT_PATH, 40)
+    for char, (x, y) in index.items():
+        assert (sheet[y:y + img_size, x:x + img_size] == render_char_array(font, char, img_size)).all()
+    # 最后一行未使用的格子保持空白
+    assert (sheet[2 * img_size:, img_size:] == 255).all()
+
+
+if __name__ == "__main__":
+    test_render_char_array_matches_image_and_legacy()
+    test_render_char_arrays_process_pool_matches_serial()
+    test_render_sprite_sheet_index_positions()
+    print("测试通过")
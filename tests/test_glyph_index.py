@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tools.glyph_index as glyph_index
+from mcp.decoder.mapping_store import MappingStore
+from tools.glyph_index import glyph_outline_hashes, load_known_outlines, plan_incremental, raster_fallback_for
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FONT_HASH = '599ab49090584e23'
+FONT_PATH = os.path.join(ROOT, 'cache', 'fonts', f'{FONT_HASH}.otf')
+MAPPING_PATH = os.path.join(ROOT, 'cache', 'mappings', f'{FONT_HASH}_mapping.json')
+
+
+def test_incremental_plan_reuses_previous_mapping():
+    """
+    同一字体换了文件名后，所有已识别字形都应直接复用，无需OCR
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        font_dir = os.path.join(tmp, 'fonts')
+        mapping_dir = os.path.join(tmp, 'mappings')
+        os.makedirs(font_dir)
+        os.makedirs(mapping_dir)
+        shutil.copy(FONT_PATH, font_dir)
+        shutil.copy(MAPPING_PATH, mapping_dir)
+        # 校验页面尚未合并的编辑也应被复用
+        with open(MAPPING_PATH, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        edited = sorted(mapping, key=ord)[0]
+        MappingStore(os.path.join(mapping_dir, os.path.basename(MAPPING_PATH))).apply({edited: '校'})
+        mapping[edited] = '校'
+
+        outlines = glyph_outline_hashes(FONT_PATH)
+        known = load_known_outlines(mapping_dir, font_dir, exclude_hash='new_font')
+        reused, representatives, duplicates = plan_incremental(outlines, known)
+
+        assert reused[edited] == '校'
+        assert reused == {char: value for char, value in mapping.items() if value}
+        assert len(reused) + len(representatives) + len(duplicates) == len(outlines)
+
+
+def test_incremental_plan_dedupes_within_font():
+    """
+    字体内轮廓相同的字符只保留一个代表字符
+    """
+    outlines = {'\ue3e8': 'o:a', '\ue3e9': 'o:a', '\ue3ea': 'o:b'}
+    reused, representatives, duplicates = plan_incremental(outlines, {'o:b': '的'})
+    assert reused == {'\ue3ea': '的'}
+    assert representatives == {'o:a': '\ue3e8'}
+    assert duplicates == {'\ue3e9': '\ue3e8'}
+
+
+def test_raster_fallback_when_outline_cannot_be_drawn():
+    """
+    轮廓无法绘制时退化为光栅哈希，字符不会被丢弃
+    """
+    class BrokenPen:
+        def __init__(self):
+            raise RuntimeError('broken outline')
+
+    original = glyph_index.RecordingPen
+    glyph_index.RecordingPen = BrokenPen
+    try:
+        assert glyph_outline_hashes(FONT_PATH) == {}
+        hashes = glyph_outline_hashes(FONT_PATH, raster_fallback_for(FONT_PATH))
+    finally:
+        glyph_index.RecordingPen = original
+    assert len(hashes) == len(glyph_outline_hashes(FONT_PATH))
+    assert all(digest.startswith('r:') for digest in hashes.values())
+
+
+if __name__ == "__main__":
+    test_incremental_plan_reuses_previous_mapping()
+    test_incremental_plan_dedupes_within_font()
+    test_raster_fallback_when_outline_cannot_be_drawn()
+    print("测试通过")
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.history import HistoryStore, make_list_key
+from mcp.units import parse_count
+
+
+def _books(order, reads=None):
+    reads = reads or {}
+    return [{'book_id': book_id, 'book_name': f'书{book_id}', 'read_count': reads.get(book_id, '12.3万人在读'),
+             'word_count': '291.3万字', 'last_chapter_time': '1751799617',
+             'thumb_url': f'http://img/{book_id}?x-expires={i}'} for i, book_id in enumerate(order)]
+
+
+def test_parse_count_units():
+    """
+    万/亿 单位和千分位逗号
+    """
+    assert parse_count('370.9万人在读') == 3709000
+    assert parse_count('291.3万字') == 2913000
+    assert parse_count('1.2亿') == 120000000
+    assert parse_count('12,345') == 12345
+    assert parse_count('') is None
+    assert parse_count(None) is None
+
+
+def test_only_deltas_are_written():
+    """
+    未变化的记录不写入（签名图片地址变化不算变化），名次变化、跌出榜单都会写入
+    """
+    key = make_list_key(1, 262, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with HistoryStore(os.path.join(tmp, 'history.sqlite')) as store:
+            assert store.record_crawl(key, _books(['a', 'b', 'c']), captured_at=1) == \
+                {'written': 3, 'unchanged': 0, 'dropped': 0}
+            # 只有签名地址变化
+            assert store.record_crawl(key, _books(['a', 'b', 'c']), captured_at=2)['written'] == 0
+            # b、c交换名次，a阅读数变化
+            result = store.record_crawl(key, _books(['a', 'c', 'b'], {'a': '13万人在读'}), captured_at=3)
+            assert result == {'written': 3, 'unchanged': 0, 'dropped': 0}
+            # c跌出榜单
+            assert store.record_crawl(key, _books(['a', 'b'], {'a': '13万人在读'}), captured_at=4) == \
+                {'written': 1, 'unchanged': 1, 'dropped': 1}
+            assert store.snapshot_count() == 8
+
+            points = store.trajectory('b', key)
+            assert [(p['captured_at'], p['rank']) for p in points] == [(1, 2), (3, 3), (4, 2)]
+            assert store.trajectory('a', since=2)[0]['read_count'] == 130000
+            assert [p['rank'] for p in store.trajectory('c')] == [3, 2, None]
+
+
+if __name__ == "__main__":
+    test_parse_count_units()
+    test_only_deltas_are_written()
+    print("测试通过")
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import stat
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp import jsonio
+from mcp.jsonio import dumps, loads, load_json, dump_json
+
+SAMPLE = {
+    'data': {
+        'book_list': [{'book_id': '7143038691944959011', 'book_name': '\ue3e8\ue4a1', 'read_count': 12345,
+                       'score': 8.5, 'tags': ['都市', '系统']}],
+        'has_more': True,
+        'total_count': None,
+    },
+    '\ue3e8': '的',
+}
+
+
+def _backends():
+    yield 'default'
+    original = jsonio.orjson
+    jsonio.orjson = None
+    try:
+        yield 'json'
+    finally:
+        jsonio.orjson = original
+
+
+def test_compact_and_pretty_roundtrip():
+    """
+    两种后端输出一致：默认紧凑、可选缩进，中文和私用区字符原样输出
+    """
+    outputs = {}
+    for backend in _backends():
+        compact = dumps(SAMPLE)
+        pretty = dumps(SAMPLE, pretty=True)
+        assert b'\n' not in compact and b'\n  ' in pretty
+        assert '\ue3e8'.encode('utf-8') in compact
+        assert loads(compact) == loads(pretty) == SAMPLE
+        assert loads(compact.decode('utf-8')) == SAMPLE
+        outputs[backend] = compact
+    assert outputs['default'] == outputs['json']
+    assert json.loads(outputs['default']) == SAMPLE
+
+
+def test_non_str_keys_and_big_ints():
+    """
+    非字符串键按标准库规则转为字符串；orjson 不支持的大整数交给标准库
+    """
+    assert loads(dumps({1: 'a', 'b': 2})) == {'1': 'a', 'b': 2}
+    assert loads(dumps({'n': 1 << 70})) == {'n': 1 << 70}
+
+
+def test_set_pretty_changes_default():
+    previous = jsonio.set_pretty(True)
+    try:
+        assert b'\n' in dumps({'a': 1})
+        assert b'\n' not in dumps({'a': 1}, pretty=False)
+    finally:
+        jsonio.set_pretty(previous)
+
+
+def test_dump_json_is_atomic():
+    """
+    写入成功后无残留临时文件；序列化失败时原文件保持不变
+    """
+    for _ in _backends():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'sub', 'data.json')
+            size = dump_json(SAMPLE, path)
+            assert size == os.path.getsize(path)
+            assert load_json(path) == SAMPLE
+            try:
+                dump_json({'bad': object()}, path)
+            except TypeError:
+                pass
+            else:
+                raise AssertionError('不可序列化的对象应抛出 TypeError')
+            assert load_json(path) == SAMPLE
+            assert os.listdir(os.path.dirname(path)) == ['data.json']
+
+
+def test_dump_json_file_mode():
+    """
+    新文件的权限与 open() 创建的一致（按 umask），覆盖已有文件时保留其权限
+    """
+    if os.name == 'nt':
+        return
+    with tempfile.TemporaryDirectory() as temp_dir:
+        reference = os.path.join(temp_dir, 'reference.json')
+        with open(reference, 'w'):
+            pass
+        path = os.path.join(temp_dir, 'data.json')
+        dump_json(SAMPLE, path)
+        assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(reference).st_mode)
+        os.chmod(path, 0o640)
+        dump_json(SAMPLE, path)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_file_mode_follows_current_umask():
+    """
+    新文件的权限按调用时的 umask 计算（不是导入时的）；读取 umask 不修改它，
+    无法从 /proc 读取时用探测文件得到同样的结果且不留下探测文件
+    """
+    if os.name == 'nt':
+        return
+    previous = os.umask(0o027)
+    read_umask = jsonio._read_umask
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'data.json')
+            assert jsonio.file_mode_for(path) == 0o640
+            assert os.umask(0o027) == 0o027
+            jsonio._read_umask = lambda: None
+            assert jsonio.file_mode_for(path) == 0o640
+            assert os.listdir(temp_dir) == []
+            dump_json(SAMPLE, path)
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    finally:
+        jsonio._read_umask = read_umask
+        os.umask(previous)
+
+
+def test_default_for_unserializable_values():
+    """
+    default 转换不可序列化的值，与 json.dumps 的 default 参数一致
+    """
+    data = dumps({'path': tempfile, 'n': 1}, default=str)
+    assert loads(data) == {'path': str(tempfile), 'n': 1}
+
+
+if __name__ == "__main__":
+    test_compact_and_pretty_roundtrip()
+    test_non_str_keys_and_big_ints()
+    test_set_pretty_changes_default()
+    test_dump_json_is_atomic()
+    test_dump_json_file_mode()
+    test_file_mode_follows_current_umask()
+    test_default_for_unserializable_values()
+    print("测试通过")
@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.ocr_review.logtail import tail_lines, follow
+
+
+def test_tail_lines_reads_from_end():
+    """
+    只返回最后N行，跨越多个读取块时行内容完整
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(5000):
+                f.write(f"第{i}行 日志内容\n")
+        lines = tail_lines(path, 3, block_size=64)
+        assert lines == ["第4997行 日志内容\n", "第4998行 日志内容\n", "第4999行 日志内容\n"]
+        assert len(tail_lines(path, 10000)) == 5000
+
+
+def test_follow_yields_new_lines_and_handles_rotation():
+    """
+    跟踪新增行，文件被轮转后从新文件开头继续读取
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("旧内容\n")
+        stream = follow(path, poll_interval=0.01)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("新增1\n")
+        assert next(stream) == "新增1\n"
+        os.replace(path, path + '.1')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("轮转后\n")
+        assert next(stream) == "轮转后\n"
+        stream.close()
+
+
+def test_follow_drains_old_file_on_rotation():
+    """
+    最后一次读到末尾之后、改名之前写入旧文件的行不会丢失
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("旧内容\n")
+        real_stat = os.stat
+        rotated = []
+
+        def rotating_stat(target, *args, **kwargs):
+            # 在 follow 读到末尾、检查轮转之前，写入最后一行并轮转
+            if target == path and not rotated:
+                rotated.append(True)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write("轮转前最后一行\n")
+                os.replace(path, path + '.1')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write("轮转后\n")
+            return real_stat(target, *args, **kwargs)
+
+        stream = follow(path, poll_interval=0.01)
+        os.stat = rotating_stat
+        try:
+            assert next(stream) == "轮转前最后一行\n"
+            assert next(stream) == "轮转后\n"
+        finally:
+            os.stat = real_stat
+            stream.close()
+
+
+def test_follow_resumes_from_position():
+    """
+    positions=True 时产出每行之后的位置；从该位置继续时只读后续的行，文件已轮转时先读完 .1 中剩余的行
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("旧内容\n")
+        stream = follow(path, poll_interval=0.01, positions=True)
+        marker, inode, offset = next(stream)
+        assert marker is None and offset == os.path.getsize(path)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("第1行\n第2行\n")
+        line, inode, offset = next(stream)
+        assert line == "第1行\n"
+        stream.close()
+
+        os.replace(path, path + '.1')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("新文件\n")
+        resumed = follow(path, poll_interval=0.01, start=(inode, offset), positions=True)
+        assert next(resumed)[0] is None
+        assert next(resumed)[0] == "第2行\n"
+        assert next(resumed)[0] == "新文件\n"
+        resumed.close()
+
+        # 位置无法匹配时从当前文件开头读取
+        fallback = follow(path, poll_interval=0.01, start=(0, 0))
+        assert next(fallback) == "新文件\n"
+        fallback.close()
+
+
+if __name__ == "__main__":
+    test_tail_lines_reads_from_end()
+    test_follow_yields_new_lines_and_handles_rotation()
+    test_follow_drains_old_file_on_rotation()
+    test_follow_resumes_from_position()
+    print("测试通过")
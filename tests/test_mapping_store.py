@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.decoder.mapping_store import MappingStore
+
+
+def _write_mapping(tmp, mapping):
+    path = os.path.join(tmp, 'abcd_mapping.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, ensure_ascii=False)
+    return path
+
+
+def test_apply_appends_journal_and_replays():
+    """
+    按字修改只追加日志，映射文件不变；重新加载时回放日志
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_mapping(tmp, {'\ue3e8': '的', '\ue3e9': ''})
+        store = MappingStore(path)
+        received = []
+        store.subscribe(received.append)
+
+        changes = store.apply({'UE3E9': '是', '\ue3e8': '的'})
+        assert changes == {'\ue3e9': '是'}
+        assert received == [{'\ue3e9': '是'}]
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f)['\ue3e9'] == ''
+        assert MappingStore(path).snapshot()[1] == {'\ue3e8': '的', '\ue3e9': '是'}
+
+
+def test_compact_and_refresh_across_instances():
+    """
+    日志达到阈值后原子合并；另一个实例通过 refresh 获得增量变更
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_mapping(tmp, {'\ue3e8': '的'})
+        writer = MappingStore(path, compact_threshold=2)
+        reader = MappingStore(path)
+
+        writer.apply({'\ue3ea': '一'})
+        assert reader.refresh() == {'\ue3ea': '一'}
+        assert reader.refresh() == {}
+
+        writer.apply({'\ue3e8': '了'})
+        assert os.path.getsize(writer.journal_path) == 0
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f) == {'\ue3e8': '了', '\ue3ea': '一'}
+        assert reader.refresh() == {'\ue3e8': '了'}
+        assert not [name for name in os.listdir(tmp) if name.endswith('.tmp')]
+
+
+def test_load_retries_when_compacted_between_base_and_journal():
+    """
+    读完映射文件后日志被另一进程合并时，重新读取而不是丢掉已合并的编辑
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_mapping(tmp, {'\ue3e8': '的'})
+        writer = MappingStore(path)
+        writer.apply({'\ue3e9': '是'})
+
+        class RacingStore(MappingStore):
+            raced = False
+
+            def _read_base(self):
+                base = super()._read_base()
+                if not RacingStore.raced:
+                    RacingStore.raced = True
+                    writer.compact()
+                return base
+
+        reader = RacingStore(path)
+        assert RacingStore.raced
+        assert reader.snapshot()[1] == {'\ue3e8': '的', '\ue3e9': '是'}
+
+
+def test_two_writers_do_not_lose_edits_on_compact():
+    """
+    两个实例（模拟两个进程）交替修改，其中一个合并日志时不会丢掉另一个的编辑
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_mapping(tmp, {'\ue3e8': '的'})
+        a = MappingStore(path)
+        b = MappingStore(path)
+        received = []
+        a.subscribe(received.append)
+
+        a.apply({'\ue3e9': '是'})
+        b.apply({'\ue3ea': '一'})
+        # a 的内存状态落后于 b 的编辑，合并前应先同步
+        assert a.compact()
+        expected = {'\ue3e8': '的', '\ue3e9': '是', '\ue3ea': '一'}
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f) == expected
+        assert a.snapshot()[1] == expected
+        assert received == [{'\ue3e9': '是'}, {'\ue3ea': '一'}]
+
+        # b 基于过期状态判断变更：a 已把 \ue3e8 改掉后，b 改回原值仍应写入
+        a.apply({'\ue3e8': '了'})
+        assert b.apply({'\ue3e8': '的'}) == {'\ue3e8': '的'}
+        assert MappingStore(path).snapshot()[1]['\ue3e8'] == '的'
+
+
+if __name__ == "__main__":
+    test_apply_appends_journal_and_replays()
+    test_compact_and_refresh_across_instances()
+    test_load_retries_when_compacted_between_base_and_journal()
+    test_two_writers_do_not_lose_edits_on_compact()
+    print("测试通过")
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.orchestrator import StageTracker, run_branches, critical_path_report
+
+
+def test_branches_overlap_and_critical_path():
+    """
+    两个分支并行执行，总耗时约等于较慢分支 + 汇合后的阶段
+    """
+    tracker = StageTracker()
+
+    def slow_branch():
+        with tracker.stage('page', 'font'):
+            time.sleep(0.2)
+        return 'font'
+
+    def fast_branch():
+        with tracker.stage('fetch', 'api'):
+            time.sleep(0.1)
+        return 'api'
+
+    results = run_branches({'api': fast_branch, 'font': slow_branch})
+    assert results == {'api': 'api', 'font': 'font'}
+    with tracker.stage('decode'):
+        time.sleep(0.01)
+
+    report = critical_path_report(tracker)
+    assert report['critical_branch'] == 'font'
+    assert [stage for stage, _ in report['critical_path']] == ['page', 'decode']
+    assert report['wall'] < report['sequential']
+    assert report['saved'] > 0.05
+
+
+def test_branch_error_is_raised_without_waiting():
+    """
+    一个分支抛出异常时立即重新抛出，不等待其余分支；其余分支可通过 cancel 得知并退出
+    """
+    cancel = threading.Event()
+    started = threading.Event()
+    finished = []
+
+    def failing():
+        started.wait(1.0)
+        raise RuntimeError('boom')
+
+    def slow():
+        started.set()
+        cancel.wait(1.0)
+        finished.append(cancel.is_set())
+
+    start = time.perf_counter()
+    try:
+        run_branches({'bad': failing, 'slow': slow}, cancel=cancel)
+    except RuntimeError as e:
+        assert str(e) == 'boom'
+    else:
+        raise AssertionError('应当抛出异常')
+    assert time.perf_counter() - start < 0.5
+    assert cancel.is_set()
+    deadline = time.perf_counter() + 1.0
+    while not finished and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert finished == [True]
+
+
+def test_failed_result_short_circuits():
+    """
+    failed(分支名, 返回值) 为真时立即返回已完成的结果，未结束的分支不在结果中
+    """
+    cancel = threading.Event()
+
+    def slow():
+        cancel.wait(1.0)
+        return 'font'
+
+    start = time.perf_counter()
+    results = run_branches({'api': lambda: None, 'font': slow},
+                           failed=lambda name, result: not result, cancel=cancel)
+    assert time.perf_counter() - start < 0.5
+    assert results == {'api': None}
+    assert cancel.is_set()
+
+
+def test_run_returns_early_when_api_branch_fails():
+    """
+    main.run：API分支失败时不等待页面/字体分支跑完就返回None，字体分支在下一个阶段前放弃
+    """
+    import main
+    args = main.build_parser().parse_args(['--no-browser'])
+    calls = []
+    page_started = threading.Event()
+
+    def fake_fetch_html(url):
+        page_started.set()
+        time.sleep(0.6)
+        return '<html></html>'
+
+    def fake_extract(self, html_content):
+        calls.append('extract')
+        return None
+
+    original = main.fetch_books_branch, main.fetch_html, main.FontDecoder.extract_font_url
+    main.fetch_books_branch = lambda args, tracker: page_started.wait(1.0) and None
+    main.fetch_html = fake_fetch_html
+    main.FontDecoder.extract_font_url = fake_extract
+    try:
+        start = time.perf_counter()
+        assert main.run(args) is None
+        assert time.perf_counter() - start < 0.5
+        time.sleep(0.7)
+    finally:
+        main.fetch_books_branch, main.fetch_html, main.FontDecoder.extract_font_url = original
+    assert calls == []
+
+
+if __name__ == "__main__":
+    test_branches_overlap_and_critical_path()
+    test_branch_error_is_raised_without_waiting()
+    test_failed_result_short_circuits()
+    test_run_returns_early_when_api_branch_fails()
+    print("测试通过")
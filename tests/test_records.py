@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.records import BookRecord, records_from_page, page_from_records
+
+THUMB_URI = 'novel-pic/p2o99ffbfd13492eb9953715959db26ed9b'
+RECORD = {
+    'abstract': '\ue3e8流星划过天际', 'author': '\ue519九音域', 'book_id': '7276384138653862966',
+    'book_name': '我不是\ue456神', 'creation_status': 1, 'last_chapter_time': '1751799617',
+    'read_count': '370.9万人在读', 'status': 0, 'thumb_uri': THUMB_URI,
+    'thumb_url': 'http://p3-reading-sign.fqnovelpic.com/' + THUMB_URI +
+                 '~tplv-resize:200:260.image?lk3s=68b6d46a&x-expires=1754473642&x-signature=%2BbpWD%3D',
+    'word_count': '291.3万字',
+}
+
+
+class FakeDecoder:
+    def decrypt_text(self, text):
+        return text.replace('\ue3e8', '赤').replace('\ue519', '三').replace('\ue456', '戏')
+
+
+def test_round_trip_is_lossless():
+    """
+    from_api/to_api 无损互转，未知字段保存在extra中，签名地址拆分后共享前缀和参数模板
+    """
+    record = dict(RECORD, tags=['玄幻'], category='都市')
+    book = BookRecord.from_api(json.loads(json.dumps(record, ensure_ascii=False)))
+    assert book.to_api() == record
+    assert book.extra == {'tags': ['玄幻'], 'category': '都市'}
+    assert book.get('thumb_url') == RECORD['thumb_url']
+    assert book.get('missing', 'x') == 'x'
+    assert not hasattr(book, '__dict__')
+
+    other = BookRecord.from_api(json.loads(json.dumps(RECORD, ensure_ascii=False)))
+    assert other._thumb[0] is book._thumb[0]
+    assert other._thumb[1] is book._thumb[1]
+    assert other.author is book.author
+
+    partial = BookRecord.from_api({'book_id': '1', 'thumb_url': 'http://other/cover.jpg'})
+    assert partial.to_api() == {'book_id': '1', 'thumb_url': 'http://other/cover.jpg'}
+
+    # 封面地址为None或空字符串时原样保存
+    for thumb_url in (None, ''):
+        record = {'book_id': '1', 'thumb_uri': THUMB_URI, 'thumb_url': thumb_url}
+        book = BookRecord.from_api(record)
+        assert book.thumb_url == thumb_url
+        assert book.get('thumb_url', 'default') == thumb_url
+        assert book.to_api() == record
+
+
+def test_round_trip_keeps_key_order():
+    """
+    to_api 按原始记录的键顺序输出，相同顺序的记录共享键顺序元组
+    """
+    record = {'thumb_url': RECORD['thumb_url'], 'tags': ['玄幻']}
+    record.update((key, RECORD[key]) for key in reversed(list(RECORD)) if key != 'thumb_url')
+    book = BookRecord.from_api(record)
+    assert list(book.to_api()) == list(record)
+    assert json.dumps(book.to_api(), ensure_ascii=False) == json.dumps(record, ensure_ascii=False)
+    assert BookRecord.from_api(dict(record))._keys is book._keys
+
+
+def test_page_round_trip_and_decode():
+    """
+    整页互转保持外层结构，decoded 与逐字段解码结果一致
+    """
+    page = {'code': 0, 'data': {'book_list': [RECORD], 'has_more': True, 'total_count': 1}, 'message': 'success'}
+    records, envelope = records_from_page(page)
+    assert envelope['data'] == {'has_more': True, 'total_count': 1}
+    assert page_from_records(records, envelope) == page
+
+    decoded = records[0].decoded(FakeDecoder())
+    assert decoded.book_name == '我不是戏神'
+    assert decoded.author == '三九音域'
+    assert decoded.get('thumb_url') == RECORD['thumb_url']
+
+
+if __name__ == "__main__":
+    test_round_trip_is_lossless()
+    test_round_trip_keeps_key_order()
+    test_page_round_trip_and_decode()
+    print("测试通过")
@@ -0,0 +1,59 @@
+import os
+import sys
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.ocr_review.metrics import Counter, Histogram, BoundedStats
+
+
+def test_counter_is_thread_safe():
+    """
+    多线程并发累加后计数不丢失
+    """
+    counter = Counter('requests_total', '请求数', ('route',))
+    threads = [
+        threading.Thread(target=lambda: [counter.inc('/a') for _ in range(1000)])
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.get('/a') == 8000
+    assert 'requests_total{route="/a"} 8000' in counter.prometheus()
+
+
+def test_histogram_quantiles_and_buckets():
+    """
+    分位数取自最近样本，Prometheus分桶为累计计数
+    """
+    histogram = Histogram('latency_seconds', '耗时', ('route',), buckets=(0.01, 0.1))
+    for i in range(100):
+        histogram.observe((i + 1) / 1000.0, '/a')
+    summary = histogram.summary()[('/a',)]
+    assert summary['count'] == 100
+    assert abs(summary['p50'] - 0.051) < 1e-9
+    assert abs(summary['p99'] - 0.1) < 1e-9
+    lines = histogram.prometheus()
+    assert 'latency_seconds_bucket{route="/a",le="0.01"} 10' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 100' in lines
+
+
+def test_bounded_stats_evicts_oldest():
+    """
+    超过上限时淘汰最久未访问的条目
+    """
+    stats = BoundedStats(max_entries=2)
+    stats.record('a.png', 'requests')
+    stats.record('b.png', 'requests')
+    stats.record('a.png', 'success')
+    stats.record('c.png', 'requests')
+    assert len(stats) == 2
+    assert stats.get('b.png') is None
+    assert stats.get('a.png')['success'] == 1
+
+
+if __name__ == "__main__":
+    test_counter_is_thread_safe()
+    test_histogram_quantiles_and_buckets()
+    test_bounded_stats_evicts_oldest()
+    print("测试通过")
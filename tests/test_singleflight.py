@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.api.client import get_book_list, book_list_request_stats
+from mcp.api.singleflight import SingleFlight
+from tools.fanqie_standin import StandinConfig, start_standin_server
+
+
+def _run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_errors_are_shared_and_not_cached():
+    """
+    异常传给所有等待者；请求结束后不保留结果，下一次调用重新执行
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError('上游错误')
+
+    def call(i):
+        if i == 0:
+            threading.Timer(0.2, release.set).start()
+        try:
+            flight.do('key', failing)
+        except RuntimeError as e:
+            return str(e)
+
+    assert _run_concurrently(4, call) == ['上游错误'] * 4
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+    assert flight.do('key', lambda: 42) == (42, False)
+    assert flight.stats() == {'issued': 2, 'coalesced': 3}
+
+
+def test_concurrent_identical_book_list_requests_are_coalesced():
+    """
+    并发的相同榜单请求只向上游发送一次，各调用方拿到独立的副本；不同页仍各自请求
+    """
+    server = start_standin_server(StandinConfig(latency_ms=300, pages=2))
+    old_cwd = os.getcwd()
+    before = book_list_request_stats()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            results = _run_concurrently(8, lambda i: get_book_list(page_index=i % 2, api_url=server.book_list_url,
+                                                                   save_raw=False)[0])
+            os.chdir(old_cwd)
+        after = book_list_request_stats()
+        assert server.requests == 2
+        assert after['issued'] - before['issued'] == 2
+        assert after['coalesced'] - before['coalesced'] == 6
+        assert all(result == results[i % 2] for i, result in enumerate(results))
+        assert len({id(result) for result in results}) == 8
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_errors_are_shared_and_not_cached()
+    test_concurrent_identical_book_list_requests_are_coalesced()
+    print("测试通过")
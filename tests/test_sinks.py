@@ -0,0 +1,68 @@
+import os
+import sys
+import csv
+import json
+import sqlite3
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.sinks import open_sink, iter_book_records, SQLiteSink
+
+API_JSON = {
+    'code': 0,
+    'data': {
+        'book_list': [
+            {'book_id': str(7000 + i), 'book_name': f'书{i}', 'author': '作者', 'read_count': '12.3万人在读',
+             'creation_status': 1, 'extra': {'tags': ['玄幻']}}
+            for i in range(7)
+        ],
+        'has_more': True,
+    },
+}
+
+
+def test_ndjson_and_csv_sinks():
+    """
+    NDJSON每行一条记录，CSV按固定列写出，嵌套字段忽略
+    """
+    records = list(iter_book_records(API_JSON))
+    assert len(records) == 7
+    with tempfile.TemporaryDirectory() as tmp:
+        with open_sink('ndjson', output_dir=tmp) as sink:
+            sink.write(records[:3])
+            sink.write(records[3:])
+        with open(sink.path, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert lines == records
+
+        with open_sink('csv', os.path.join(tmp, 'books.csv')) as sink:
+            sink.write(records)
+        with open(sink.path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 7
+        assert rows[0]['book_name'] == '书0' and rows[0]['creation_status'] == '1'
+        assert 'extra' not in rows[0]
+
+
+def test_sqlite_sink_batches_inserts():
+    """
+    SQLite按批次插入，关闭时写入剩余记录，完整记录保存在record列
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'books.sqlite')
+        sink = SQLiteSink(path, batch_size=3)
+        sink.write(iter_book_records(API_JSON))
+        assert sink.count == 6
+        sink.close()
+        assert sink.count == 7
+        conn = sqlite3.connect(path)
+        rows = conn.execute('SELECT book_id, read_count, record FROM books ORDER BY book_id').fetchall()
+        conn.close()
+        assert len(rows) == 7
+        assert rows[0][:2] == ('7000', '12.3万人在读')
+        assert json.loads(rows[0][2])['extra'] == {'tags': ['玄幻']}
+
+
+if __name__ == "__main__":
+    test_ndjson_and_csv_sinks()
+    test_sqlite_sink_batches_inserts()
+    print("测试通过")
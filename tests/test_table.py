@@ -0,0 +1,61 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.table import BookTable, MISSING
+
+
+def _book(book_id, reads, status=0, author='作者'):
+    return {'book_id': book_id, 'book_name': f'书{book_id}', 'author': author, 'read_count': reads,
+            'word_count': '291.3万字', 'creation_status': status, 'last_chapter_time': '1751799617'}
+
+
+def test_parse_and_dictionary_encode():
+    """
+    计数解析为整数，作者和附加标签按字典编码
+    """
+    table = BookTable.from_records([_book('1', '370.9万人在读'), _book('2', '1.2亿', author='乙'), _book('3', '')],
+                                   gender=1)
+    assert table.numeric['read_count'].tolist() == [3709000, 120000000, MISSING]
+    assert table.categorical['author'].categories == ['作者', '乙']
+    assert table.categorical['author'].codes.tolist() == [0, 1, 0]
+    assert table.eq('gender', 1).all()
+    assert not table.eq('gender', 0).any()
+
+
+def test_concat_and_top_k_across_categories():
+    """
+    多个分类合并后统一字典并按 book_id 去重，top_k 按阅读数降序并跳过缺失值
+    """
+    male_fantasy = BookTable.from_records([_book('1', '10万'), _book('2', '50万', status=1), _book('3', '')],
+                                          gender=1, category_id=7)
+    male_urban = BookTable.from_records([_book('4', '30万'), _book('1', '10万'), _book('5', '90万')],
+                                        gender=1, category_id=1)
+    female = BookTable.from_records([_book('6', '99万')], gender=0, category_id=7)
+    table = BookTable.concat([male_fantasy, male_urban, female])
+    assert len(table) == 6
+    assert table.column('category_id').tolist() == [7, 7, 7, 1, 1, 7]
+
+    mask = table.eq('creation_status', 0) & table.eq('gender', 1)
+    top = table.top_k('read_count', 2, mask=mask).to_records()
+    assert [(r['book_id'], r['read_count'], r['category_id']) for r in top] == [('5', 900000, 1), ('4', 300000, 1)]
+    assert len(table.top_k('read_count', 50, mask=mask)) == 3
+    assert table.top_k('read_count', 1, largest=False).to_records()[0]['book_id'] == '1'
+    assert table.between('read_count', low=300000).sum() == 4
+
+
+def test_concat_keeps_rows_without_book_id():
+    """
+    book_id 缺失的行不参与去重，不会被当作同一本书合并成一行
+    """
+    first = BookTable.from_records([_book(None, '10万'), _book('1', '20万'), _book('', '30万')])
+    second = BookTable.from_records([_book(None, '40万'), _book('1', '50万')])
+    table = BookTable.concat([first, second])
+    assert table.column('book_id').tolist() == [None, '1', '', None]
+    assert table.numeric['read_count'].tolist() == [100000, 200000, 300000, 400000]
+
+
+if __name__ == "__main__":
+    test_parse_and_dictionary_encode()
+    test_concat_and_top_k_across_categories()
+    test_concat_keeps_rows_without_book_id()
+    print("测试通过")
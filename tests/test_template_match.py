@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import tempfile
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tools.font_template_match as font_template_match
+from tools.font_template_match import (TemplateMatcher, font_vectors, default_candidates, find_reference_font,
+                                       gb2312_level1, reference_vectors)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FONT_PATH = os.path.join(ROOT, 'cache', 'fonts', '599ab49090584e23.otf')
+MAPPING_PATH = os.path.join(ROOT, 'cache', 'mappings', '599ab49090584e23_mapping.json')
+
+
+def _load_mapping():
+    with open(MAPPING_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_default_candidates_without_history():
+    """
+    没有历史映射表时，候选集仍包含常用汉字，并覆盖已校验映射表中几乎所有字符
+    """
+    level1 = gb2312_level1()
+    assert len(level1) == 3755 and level1[0] == '啊' and level1[-1] == '座'
+    with tempfile.TemporaryDirectory() as empty_dir:
+        candidates = set(default_candidates(empty_dir))
+    values = [value for value in _load_mapping().values() if value]
+    covered = sum(1 for value in values if value in candidates)
+    assert covered / len(values) >= 0.99
+
+
+def test_template_match_against_reference_font():
+    """
+    用参考字体渲染候选字符（不使用已校验映射表）匹配加密字形，与映射表比对准确率
+    """
+    reference_font = find_reference_font()
+    if reference_font is None:
+        pytest.skip('未找到中文参考字体')
+    mapping = _load_mapping()
+    with tempfile.TemporaryDirectory() as empty_dir:
+        matcher = TemplateMatcher.from_reference_font(reference_font, default_candidates(empty_dir),
+                                                      cache_dir=empty_dir)
+    chars = [char for char, value in mapping.items() if value]
+    results = matcher.match(font_vectors(FONT_PATH, chars))
+    matched = [(mapping[char], label) for char, (label, _, ambiguous) in zip(chars, results) if not ambiguous]
+    correct = sum(1 for expected, label in matched if expected == label)
+    assert len(matched) >= len(chars) // 2
+    assert correct / len(matched) >= 0.9
+
+
+def test_template_match_flags_ambiguous():
+    """
+    两个候选相同时，匹配结果应标记为歧义
+    """
+    vectors = font_vectors(FONT_PATH, ['\ue3e8'])
+    matcher = TemplateMatcher(['a', 'b'], [vectors[0], vectors[0]])
+    assert matcher.match(vectors)[0][2]
+
+
+def test_reference_vectors_are_cached():
+    """
+    候选向量按参考字体缓存：第二次不再渲染，新增候选只渲染新增的字符，参考字体中没有的字符也记入缓存
+    """
+    with open(MAPPING_PATH, 'r', encoding='utf-8') as f:
+        chars = sorted(json.load(f), key=ord)[:20]
+    rendered = []
+    original = font_template_match.font_vectors
+
+    def counting_vectors(font_path, labels, index=0):
+        rendered.append(list(labels))
+        return original(font_path, labels, index)
+
+    font_template_match.font_vectors = counting_vectors
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            labels, vectors = reference_vectors(FONT_PATH, chars[:10] + ['啊'], cache_dir=cache_dir)
+            assert labels == chars[:10] and rendered == [chars[:10]]
+            assert len(os.listdir(cache_dir)) == 1
+
+            cached_labels, cached_vectors = reference_vectors(FONT_PATH, chars[:10] + ['啊'], cache_dir=cache_dir)
+            assert cached_labels == labels and (cached_vectors == vectors).all()
+            assert len(rendered) == 1
+
+            labels, vectors = reference_vectors(FONT_PATH, chars[5:], cache_dir=cache_dir)
+            assert labels == chars[5:] and rendered[1] == chars[10:]
+            assert (vectors == original(FONT_PATH, chars[5:])).all()
+    finally:
+        font_template_match.font_vectors = original
+
+
+if __name__ == "__main__":
+    test_default_candidates_without_history()
+    test_template_match_against_reference_font()
+    test_template_match_flags_ambiguous()
+    test_reference_vectors_are_cached()
+    print("测试通过")
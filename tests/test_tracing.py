@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp import tracing
+from mcp.tracing import Tracer, span, traced, profile_run
+from mcp.orchestrator import StageTracker
+
+
+def test_span_is_noop_when_disabled():
+    """
+    未启用追踪时 span/traced 正常执行且不记录
+    """
+    tracing.disable()
+
+    @traced('noop')
+    def add(a, b):
+        return a + b
+
+    with span('nothing'):
+        assert add(1, 2) == 3
+    assert tracing.current_tracer() is None
+
+
+def test_spans_across_threads_export_chrome_trace():
+    """
+    不同线程中的span带各自的线程ID，导出为 ph=X 事件并附线程名元数据
+    """
+    tracer = tracing.enable()
+    try:
+        @traced('work', 'font')
+        def work():
+            time.sleep(0.01)
+
+        def branch():
+            with span('inner', 'api', page_index=3):
+                work()
+
+        thread = threading.Thread(target=branch, name='api-branch')
+        with span('outer'):
+            thread.start()
+            work()
+            thread.join()
+    finally:
+        tracing.disable()
+
+    trace = tracer.chrome_trace()
+    events = trace['traceEvents']
+    complete = [event for event in events if event['ph'] == 'X']
+    assert sorted(event['name'] for event in complete) == ['inner', 'outer', 'work', 'work']
+    names = {event['args']['name'] for event in events if event['ph'] == 'M'}
+    assert 'api-branch' in names
+    inner = next(event for event in complete if event['name'] == 'inner')
+    outer = next(event for event in complete if event['name'] == 'outer')
+    assert inner['args'] == {'page_index': 3}
+    assert inner['tid'] != outer['tid']
+    assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'] + 1
+    summary = tracer.summary()
+    assert summary['work']['count'] == 2
+    assert summary['work']['total'] >= 0.02
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = tracer.write_chrome_trace(os.path.join(temp_dir, 'trace', 'run.json'))
+        import json
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['traceEvents']
+
+
+def test_stage_tracker_emits_spans():
+    """
+    StageTracker 的阶段同时记录为span，类别为所属分支
+    """
+    tracer = tracing.enable()
+    try:
+        tracker = StageTracker()
+        with tracker.stage('fetch', branch='api'):
+            pass
+    finally:
+        tracing.disable()
+    event = tracer.events[0]
+    assert (event['name'], event['cat']) == ('fetch', 'api')
+
+
+def test_profile_run_writes_folded_and_cprofile():
+    """
+    采样分析器写出折叠栈，.prof 写出 cProfile 结果；均返回函数返回值
+    """
+    def busy():
+        deadline = time.perf_counter() + 0.1
+        total = 0
+        while time.perf_counter() < deadline:
+            total += 1
+        return 'done'
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folded = os.path.join(temp_dir, 'run.folded')
+        assert profile_run(busy, folded, interval=0.002) == 'done'
+        with open(folded, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert lines
+        assert any('busy (test_tracing.py' in line for line in lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        assert int(count) > 0 and ';' in stack
+
+        prof = os.path.join(temp_dir, 'run.prof')
+        assert profile_run(busy, prof) == 'done'
+        import pstats
+        stats = pstats.Stats(prof)
+        assert any(key[2] == 'busy' for key in stats.stats)
+
+
+if __name__ == "__main__":
+    test_span_is_noop_when_disabled()
+    test_spans_across_threads_export_chrome_trace()
+    test_stage_tracker_emits_spans()
+    test_profile_run_writes_folded_and_cprofile()
+    print("测试通过")
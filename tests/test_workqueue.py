@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from mcp.workqueue import WorkQueue, crawl_jobs, run_worker, merge_shards
+from tools.fanqie_standin import StandinConfig, start_standin_server
+
+
+def test_crashed_worker_only_loses_its_lease():
+    """
+    一个worker领取任务后崩溃，租约到期后由其他worker接手；两个worker完成全部任务，合并后每个名次只有一条记录
+    """
+    server = start_standin_server(StandinConfig(pages=3))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, 'queue.sqlite')
+            shard_dir = os.path.join(tmp, 'shards')
+            with WorkQueue(db, lease_seconds=0.3) as queue:
+                assert queue.enqueue(crawl_jobs([(-1, -1, 0), (1, -1, 0)], pages=3)) == 6
+                assert queue.enqueue(crawl_jobs([(-1, -1, 0)], pages=1)) == 0
+                crawl_id = queue.current_crawl()
+                # 崩溃的worker：领取后不再完成
+                assert len(queue.claim('crashed')) == 1
+
+            results = {}
+
+            def worker(worker_id):
+                with WorkQueue(db, lease_seconds=0.3) as queue:
+                    results[worker_id] = run_worker(queue, worker_id, shard_dir, api_url=server.book_list_url,
+                                                    poll_interval=0.05)
+
+            threads = [threading.Thread(target=worker, args=(f'w{i}',)) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            with WorkQueue(db) as queue:
+                assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 6, 'failed': 0}
+                assert queue.complete(1, 'crashed') is False
+            assert sum(stats['done'] for stats in results.values()) == 6
+            assert sorted(os.listdir(shard_dir)) == ['w0.ndjson', 'w1.ndjson']
+
+            outputs, count = merge_shards(shard_dir, ['ndjson'], output_dir=tmp, crawl_id=crawl_id)
+            with open(outputs['ndjson'], encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            assert count == len(records) == 120
+            assert {r['crawl_id'] for r in records} == {crawl_id}
+            assert [r['rank'] for r in records if r['list_key'] == 'g1_c-1_s0'] == list(range(1, 61))
+    finally:
+        server.shutdown()
+
+
+def test_failed_jobs_are_retried_then_marked_failed():
+    """
+    请求失败的任务放回队列重试，超过最大尝试次数后标记失败
+    """
+    server = start_standin_server(StandinConfig(error_rate=1.0, seed=0))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            with WorkQueue(os.path.join(tmp, 'queue.sqlite'), max_attempts=2) as queue:
+                queue.enqueue(crawl_jobs([(-1, -1, 0)], pages=1))
+                stats = run_worker(queue, 'w0', os.path.join(tmp, 'shards'), api_url=server.book_list_url)
+                assert stats == {'done': 0, 'failed': 2, 'lost': 0}
+                assert queue.counts()['failed'] == 1
+                assert server.requests == 2
+    finally:
+        server.shutdown()
+
+
+def test_merge_keeps_newest_capture():
+    """
+    合并时按抓取时间保留最新的记录，与分片文件的读取顺序无关
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_dir = os.path.join(tmp, 'shards')
+        os.makedirs(shard_dir)
+        shards = {
+            'a.ndjson': [{'list_key': 'g1_c-1_s0', 'rank': 1, 'book_id': 'new', 'captured_at': 200.0}],
+            'b.ndjson': [{'list_key': 'g1_c-1_s0', 'rank': 1, 'book_id': 'old', 'captured_at': 100.0},
+                         {'list_key': 'g1_c-1_s0', 'rank': 2, 'book_id': 'legacy'}],
+            'c.ndjson': [{'list_key': 'g1_c-1_s0', 'rank': 2, 'book_id': 'stamped', 'captured_at': 50.0}],
+        }
+        for name, records in shards.items():
+            with open(os.path.join(shard_dir, name), 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+
+        outputs, count = merge_shards(shard_dir, ['ndjson'], output_dir=tmp)
+        with open(outputs['ndjson'], encoding='utf-8') as f:
+            assert [json.loads(line)['book_id'] for line in f] == ['new', 'stamped']
+        assert count == 2
+
+
+def test_merge_is_scoped_to_one_crawl():
+    """
+    新的爬取页数较少时，合并结果不包含之前爬取留在分片目录中的更深名次
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        with WorkQueue(os.path.join(tmp, 'queue.sqlite')) as queue:
+            assert queue.current_crawl() is None
+            assert queue.enqueue(crawl_jobs([(-1, -1, 0)], pages=3)) == 3
+            old_crawl = queue.current_crawl()
+            # 相同参数的任务在新的爬取中重新加入队列
+            assert queue.enqueue(crawl_jobs([(-1, -1, 0)], pages=1), new_crawl=True) == 1
+            new_crawl = queue.current_crawl()
+            assert new_crawl != old_crawl
+            assert queue.enqueue(crawl_jobs([(-1, -1, 0)], pages=1)) == 0
+
+        shard_dir = os.path.join(tmp, 'shards')
+        os.makedirs(shard_dir)
+        records = [{'list_key': 'g-1_c-1_s0', 'rank': rank, 'book_id': f'old{rank}', 'crawl_id': old_crawl,
+                    'captured_at': 100.0} for rank in (1, 2, 3)]
+        records += [{'list_key': 'g-1_c-1_s0', 'rank': rank, 'book_id': f'new{rank}', 'crawl_id': new_crawl,
+                     'captured_at': 200.0} for rank in (1, 2)]
+        with open(os.path.join(shard_dir, 'w0.ndjson'), 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+
+        outputs, count = merge_shards(shard_dir, ['ndjson'], output_dir=tmp, crawl_id=new_crawl)
+        with open(outputs['ndjson'], encoding='utf-8') as f:
+            assert [json.loads(line)['book_id'] for line in f] == ['new1', 'new2']
+        assert count == 2
+
+
+if __name__ == "__main__":
+    test_crashed_worker_only_loses_its_lease()
+    test_failed_jobs_are_retried_then_marked_failed()
+    test_merge_keeps_newest_capture()
+    test_merge_is_scoped_to_one_crawl()
+    print("测试通过")
@@ -0,0 +1,251 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fontTools.ttLib import TTFont
+from tools.font_render_utils import render_chars_to_images
+from mcp.jsonio import load_json, dump_json
+
+DEFAULT_MAPPING_DIR = os.path.join('cache', 'mappings')
+DEFAULT_FONT_DIR = os.path.join('cache', 'fonts')
+ALL_BACKENDS = ['paddle', 'easyocr', 'cascade', 'template']
+
+
+def load_ground_truth(mapping_dir=DEFAULT_MAPPING_DIR, font_dir=DEFAULT_FONT_DIR):
+    """
+    以已校验的映射表作为标准答案
+    返回 [(font_path, [(char, truth), ...])]，只保留字体文件存在且答案非空的字符
+    """
+    cases = []
+    for mapping_file in sorted(glob.glob(os.path.join(mapping_dir, '*_mapping.json'))):
+        font_hash = os.path.basename(mapping_file)[:-len('_mapping.json')]
+        font_path = os.path.join(font_dir, f"{font_hash}.otf")
+        if not os.path.exists(font_path):
+            continue
+        mapping = load_json(mapping_file)
+        cmap = TTFont(font_path).getBestCmap()
+        glyphs = [(char, truth) for char, truth in mapping.items() if truth and ord(char) in cmap]
+        if glyphs:
+            cases.append((font_path, glyphs))
+    return cases
+
+
+def peak_rss_mb():
+    """
+    当前进程的峰值常驻内存（MB），无法获取时返回None
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为KB
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def percentile(values, pct):
+    """
+    最近秩法计算百分位数
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def font_hash_of(font_path):
+    return os.path.splitext(os.path.basename(font_path))[0]
+
+
+def make_recognizer(backend, reference_font=None, mapping_dir=DEFAULT_MAPPING_DIR, font_paths=()):
+    """
+    构造识别函数 recognize(font_path, char, img_path) -> text
+    模型在这里加载，加载耗时不计入单字延迟
+    模板匹配对每个字体留出其自身的映射表：候选字符不包含该字体标准答案独有的字符
+    """
+    if backend in ('paddle', 'easyocr', 'cascade'):
+        from tools.font_ocr_mapping_paddle import paddle_ocr_image, easyocr_image, get_paddle_ocr, get_easyocr_reader
+        if backend in ('paddle', 'cascade'):
+            get_paddle_ocr()
+        if backend in ('easyocr', 'cascade'):
+            get_easyocr_reader()
+
+        def recognize(font_path, char, img_path):
+            if backend == 'easyocr':
+                return easyocr_image(img_path)[0]
+            text = paddle_ocr_image(img_path)[0]
+            if not text and backend == 'cascade':
+                text = easyocr_image(img_path)[0]
+            return text
+        return recognize
+
+    if backend == 'template':
+        from tools.font_template_match import (TemplateMatcher, default_candidates, find_reference_font,
+                                               glyph_vector, MATCH_FONT_SIZE)
+        from tools.font_render_utils import load_font
+        reference_font = reference_font or find_reference_font()
+        if not reference_font:
+            raise RuntimeError("未找到本地中文参考字体，请通过 --reference-font 指定")
+        matchers = {
+            font_path: TemplateMatcher.from_reference_font(
+                reference_font, default_candidates(mapping_dir, exclude_hashes={font_hash_of(font_path)}))
+            for font_path in font_paths
+        }
+
+        def recognize(font_path, char, img_path):
+            matcher = matchers[font_path]
+            label, _, ambiguous = matcher.match([glyph_vector(load_font(font_path, MATCH_FONT_SIZE), char)])[0]
+            return '' if ambiguous else label
+        return recognize
+
+    raise ValueError(f"未知的识别后端: {backend}")
+
+
+def run_backend(backend, cases, image_dirs, threads=1, reference_font=None, mapping_dir=DEFAULT_MAPPING_DIR):
+    """
+    在当前进程内跑一个后端，返回指标字典
+    """
+    load_start = time.perf_counter()
+    recognize = make_recognizer(backend, reference_font, mapping_dir, [font_path for font_path, _ in cases])
+    load_time = time.perf_counter() - load_start
+
+    jobs = [
+        (font_path, char, truth, os.path.join(image_dirs[font_path], f"U{ord(char):04X}.png"))
+        for font_path, glyphs in cases for char, truth in glyphs
+    ]
+
+    def task(job):
+        font_path, char, truth, img_path = job
+        start = time.perf_counter()
+        try:
+            text = recognize(font_path, char, img_path)
+        except Exception as e:
+            print(f"[{backend}] 识别失败 {img_path}: {e}")
+            text = ''
+        return time.perf_counter() - start, text == truth
+
+    wall_start = time.perf_counter()
+    if threads <= 1:
+        results = [task(job) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(task, jobs))
+    wall = time.perf_counter() - wall_start
+
+    latencies = [latency for latency, _ in results]
+    correct = sum(1 for _, ok in results if ok)
+    return {
+        'backend': backend,
+        'glyphs': len(jobs),
+        'threads': threads,
+        'load_sec': round(load_time, 3),
+        'glyphs_per_sec': round(len(jobs) / wall, 2) if wall > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'peak_rss_mb': round(peak_rss_mb() or 0.0, 1),
+        'accuracy': round(correct / len(jobs), 4) if jobs else 0.0,
+    }
+
+
+def _run_isolated(backend, cases, image_dirs, threads, reference_font, mapping_dir):
+    """
+    子进程入口：每个后端在独立进程中运行，峰值内存互不干扰
+    """
+    try:
+        return run_backend(backend, cases, image_dirs, threads, reference_font, mapping_dir)
+    except Exception as e:
+        return {'backend': backend, 'error': str(e)}
+
+
+def run_benchmark(backends=None, mapping_dir=DEFAULT_MAPPING_DIR, font_dir=DEFAULT_FONT_DIR,
+                  threads=1, limit=None, reference_font=None, isolate=True):
+    """
+    对各后端运行基准测试，返回结果列表
+    """
+    backends = backends or ALL_BACKENDS
+    cases = load_ground_truth(mapping_dir, font_dir)
+    if limit:
+        cases = [(font_path, glyphs[:limit]) for font_path, glyphs in cases]
+    total = sum(len(glyphs) for _, glyphs in cases)
+    if not total:
+        print(f"没有可用的标准答案: 请检查 {mapping_dir} 与 {font_dir}")
+        return []
+    print(f"标准答案: {len(cases)} 个字体，共 {total} 个字形")
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_ocr_')
+    try:
+        image_dirs = {}
+        render_start = time.perf_counter()
+        for i, (font_path, glyphs) in enumerate(cases):
+            image_dirs[font_path] = os.path.join(tmp_dir, str(i))
+            os.makedirs(image_dirs[font_path])
+            render_chars_to_images(font_path, [
+                (char, os.path.join(image_dirs[font_path], f"U{ord(char):04X}.png")) for char, _ in glyphs
+            ])
+        print(f"渲染 {total} 个字形耗时 {time.perf_counter() - render_start:.2f}秒")
+
+        results = []
+        for backend in backends:
+            print(f"--- 测试后端: {backend} ---")
+            if isolate:
+                ctx = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                    result = executor.submit(_run_isolated, backend, cases, image_dirs, threads, reference_font,
+                                             mapping_dir).result()
+            else:
+                result = _run_isolated(backend, cases, image_dirs, threads, reference_font, mapping_dir)
+            if 'error' in result:
+                print(f"[{backend}] 跳过: {result['error']}")
+            else:
+                print(f"[{backend}] {result['glyphs_per_sec']} 字/秒, p50 {result['p50_ms']}ms, "
+                      f"p95 {result['p95_ms']}ms, 峰值内存 {result['peak_rss_mb']}MB, 准确率 {result['accuracy']:.2%}")
+            results.append(result)
+        return results
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    """
+    命令行入口
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='OCR映射后端吞吐量与准确率基准测试（离线）')
+    parser.add_argument('--backends', default=','.join(ALL_BACKENDS), help='逗号分隔的后端列表: ' + ', '.join(ALL_BACKENDS))
+    parser.add_argument('--mapping-dir', default=DEFAULT_MAPPING_DIR, help='已校验映射表目录（标准答案）')
+    parser.add_argument('--font-dir', default=DEFAULT_FONT_DIR, help='字体文件目录')
+    parser.add_argument('--threads', type=int, default=1, help='识别并发线程数')
+    parser.add_argument('--limit', type=int, default=None, help='每个字体最多测试的字形数')
+    parser.add_argument('--reference-font', default=None, help='模板匹配使用的参考字体')
+    parser.add_argument('--no-isolate', action='store_true', help='所有后端在同一进程中运行（峰值内存会相互叠加）')
+    parser.add_argument('--output', default=None, help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        backends=[b.strip() for b in args.backends.split(',') if b.strip()],
+        mapping_dir=args.mapping_dir,
+        font_dir=args.font_dir,
+        threads=args.threads,
+        limit=args.limit,
+        reference_font=args.reference_font,
+        isolate=not args.no_isolate,
+    )
+    if args.output:
+        dump_json(results, args.output, pretty=True)
+        print(f"基准测试结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import io
+import sys
+import time
+import shutil
+import tempfile
+import contextlib
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from main import build_parser, run
+from tools.fanqie_standin import StandinConfig, start_standin_server
+from mcp.jsonio import dump_json
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_MAPPING_DIR = os.path.join(ROOT_DIR, 'cache', 'mappings')
+
+
+def pipeline_args(server, mapping_dir=DEFAULT_MAPPING_DIR, extra_args=()):
+    """
+    构造指向替身服务器的主流程参数：直接请求页面HTML（不启动浏览器），使用已有映射表（不运行OCR）
+    extra_args 原样追加，如 ['--sink', 'ndjson', '--no-decode-cache']
+    """
+    return build_parser().parse_args([
+        '--api-url', server.book_list_url,
+        '--page-url', server.library_url,
+        '--no-browser',
+        '--ocr-mapping-dir', mapping_dir,
+    ] + list(extra_args))
+
+
+def stage_durations(tracker):
+    """
+    按阶段汇总耗时（秒）
+    """
+    totals = {}
+    for span in tracker.spans:
+        totals[span['stage']] = totals.get(span['stage'], 0.0) + span['end'] - span['start']
+    return totals
+
+
+def run_pipeline_benchmark(repeat=3, config=None, extra_args=(), mapping_dir=DEFAULT_MAPPING_DIR, verbose=False):
+    """
+    启动替身服务器，在临时目录中重复运行 main.run（与生产相同的编排、解码缓存和输出插件），返回汇总结果
+    解码缓存位于临时目录中，第一次运行为冷缓存，之后为热缓存
+    """
+    config = config or StandinConfig()
+    server = start_standin_server(config)
+    work_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    old_cwd = os.getcwd()
+    totals = {}
+    runs = []
+    try:
+        # 主流程写相对路径 debug/、cache/、output/，在临时目录中运行以免覆盖仓库中的数据
+        os.chdir(work_dir)
+        args = pipeline_args(server, mapping_dir, extra_args)
+        wall_start = time.perf_counter()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            with output:
+                tracker = run(args)
+            runs.append({'ok': tracker is not None, 'sec': round(time.perf_counter() - start, 4)})
+            if tracker is not None:
+                for stage, seconds in stage_durations(tracker).items():
+                    totals[stage] = totals.get(stage, 0.0) + seconds
+        wall = time.perf_counter() - wall_start
+    finally:
+        os.chdir(old_cwd)
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'repeat': repeat,
+        'latency_ms': config.latency_ms,
+        'error_rate': config.error_rate,
+        'args': list(extra_args),
+        'wall_sec': round(wall, 4),
+        'per_run_sec': round(wall / repeat, 4),
+        'runs': runs,
+        'runs_ok': sum(1 for item in runs if item['ok']),
+        'stages_sec': {stage: round(total / repeat, 4) for stage, total in totals.items()},
+        'server_requests': server.requests,
+        'server_errors': server.errors,
+    }
+
+
+def main():
+    """
+    命令行入口；未识别的参数原样传给主流程（如 --sink ndjson、--no-decode-cache、--sequential）
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='离线端到端流程基准测试（替身服务器，运行 main.run）')
+    parser.add_argument('--repeat', type=int, default=3, help='重复运行次数')
+    parser.add_argument('--latency-ms', type=float, default=0, help='替身服务器固定延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='替身服务器随机延迟上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='替身服务器错误注入概率（0~1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--mapping-dir', default=DEFAULT_MAPPING_DIR, help='已有映射表目录（基准不运行OCR）')
+    parser.add_argument('--verbose', action='store_true', help='显示主流程的输出')
+    parser.add_argument('--output', default=None, help='结果JSON输出路径')
+    args, extra_args = parser.parse_known_args()
+
+    config = StandinConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                           seed=args.seed)
+    result = run_pipeline_benchmark(args.repeat, config, extra_args, args.mapping_dir, args.verbose)
+
+    print("\n--- 端到端流程基准 ---")
+    print(f"单次运行平均耗时: {result['per_run_sec']:.4f}秒（共 {result['repeat']} 次，成功 {result['runs_ok']} 次）")
+    print("各次耗时: " + ', '.join(f"{item['sec']:.4f}秒" + ('' if item['ok'] else '(失败)') for item in result['runs']))
+    per_run = result['per_run_sec'] or 1
+    for stage, seconds in result['stages_sec'].items():
+        print(f"  {stage:<8} {seconds:.4f}秒  {seconds / per_run:6.1%}")
+    print(f"服务器请求 {result['server_requests']} 次，注入错误 {result['server_errors']} 次")
+    if args.output:
+        dump_json(result, args.output, pretty=True)
+        print(f"基准测试结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+import json
+import glob
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_API_DATA = os.path.join(ROOT_DIR, 'debug', 'raw_api_data.json')
+DEFAULT_PAGE_HTML = os.path.join(ROOT_DIR, 'debug', 'dynamic_page_content.html')
+DEFAULT_FONT_DIR = os.path.join(ROOT_DIR, 'cache', 'fonts')
+
+BOOK_LIST_PATH = '/api/author/library/book_list/v0/'
+LIBRARY_PATH = '/library/all/page_1'
+FONT_URL_RE = re.compile(r'https?://[^"\')\s]+?/awesome-font/c/([A-Za-z0-9_-]+)\.(otf|woff2?)')
+
+
+class StandinConfig:
+    """
+    替身服务器配置
+    latency_ms: 每个请求的固定延迟（毫秒）
+    jitter_ms: 额外的随机延迟上限（毫秒）
+    pages: 榜单总页数，超出后返回空列表且 has_more=False
+    error_rate: 随机返回错误的概率（0~1）
+    error_status: 注入错误时返回的HTTP状态码
+    error_scope: 'api' 只对榜单接口注入错误，'all' 对所有请求注入
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, pages=5, error_rate=0.0, error_status=500, seed=None,
+                 error_scope='api', api_data_path=DEFAULT_API_DATA, page_html_path=DEFAULT_PAGE_HTML, font_dir=DEFAULT_FONT_DIR):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.pages = pages
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_scope = error_scope
+        self.random = random.Random(seed)
+        self.api_data_path = api_data_path
+        self.page_html_path = page_html_path
+        self.font_dir = font_dir
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """
+    回放录制数据的请求处理器：
+      GET /api/author/library/book_list/v0/  回放 debug/raw_api_data.json
+      GET /library/all/page_1                 回放 debug/dynamic_page_content.html，字体URL改写为本服务器
+      GET /font/<name>.otf                    返回 cache/fonts 中缓存的字体
+    """
+    server_version = 'FanqieStandin/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write("[standin] %s\n" % (format % args))
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        config = self.server.config
+        delay = config.latency_ms + (config.random.uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000.0)
+        self.server.count_request()
+        parsed = urlparse(self.path)
+        in_scope = config.error_scope == 'all' or parsed.path == BOOK_LIST_PATH
+        if in_scope and config.error_rate and config.random.random() < config.error_rate:
+            self.server.count_error()
+            self._send(config.error_status, b'{"code": -1, "message": "injected error"}', 'application/json')
+            return
+
+        if parsed.path == BOOK_LIST_PATH:
+            self._send(200, self.server.book_list_page(parse_qs(parsed.query)), 'application/json; charset=utf-8')
+        elif parsed.path.startswith('/library/'):
+            self._send(200, self.server.page_html(), 'text/html; charset=utf-8')
+        elif parsed.path.startswith('/font/'):
+            font_data = self.server.font_data()
+            if font_data is None:
+                self._send(404, b'font not found', 'text/plain')
+            else:
+                self._send(200, font_data, 'font/otf')
+        else:
+            self._send(404, b'not found', 'text/plain')
+
+
+class StandinServer(ThreadingHTTPServer):
+    """
+    番茄小说离线替身服务器，录制数据在启动时读入内存
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), config=None, verbose=False):
+        super().__init__(address, StandinHandler)
+        self.config = config or StandinConfig()
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        with open(self.config.api_data_path, 'r', encoding='utf-8') as f:
+            self._api_data = json.load(f)
+        with open(self.config.page_html_path, 'r', encoding='utf-8') as f:
+            self._html = f.read()
+        font_files = sorted(glob.glob(os.path.join(self.config.font_dir, '*.otf')), key=os.path.getmtime)
+        self._font_path = font_files[-1] if font_files else None
+        self._font_bytes = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def book_list_url(self):
+        return self.base_url + BOOK_LIST_PATH
+
+    @property
+    def library_url(self):
+        return self.base_url + LIBRARY_PATH
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def count_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def book_list_page(self, query):
+        page_index = int(query.get('page_index', ['0'])[0])
+        page_count = int(query.get('page_count', ['20'])[0])
+        records = self._api_data.get('data', {}).get('book_list', [])
+        data = dict(self._api_data)
+        page = dict(data.get('data', {}))
+        if page_index < self.config.pages and records:
+            # 循环复用录制的记录，填满请求的每页数量
+            start = page_index * page_count
+            page['book_list'] = [records[(start + i) % len(records)] for i in range(page_count)]
+        else:
+            page['book_list'] = []
+        page['has_more'] = page_index + 1 < self.config.pages
+        data['data'] = page
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def page_html(self):
+        font_name = os.path.splitext(os.path.basename(self._font_path))[0] if self._font_path else 'missing'
+        html = FONT_URL_RE.sub(lambda m: f"{self.base_url}/font/{font_name}.{m.group(2)}", self._html)
+        return html.encode('utf-8')
+
+    def font_data(self):
+        if not self._font_path:
+            return None
+        if self._font_bytes is None:
+            with open(self._font_path, 'rb') as f:
+                self._font_bytes = f.read()
+        return self._font_bytes
+
+
+def start_standin_server(config=None, host='127.0.0.1', port=0, verbose=False):
+    """
+    在后台线程启动替身服务器，返回 server 对象，使用完毕后调用 server.shutdown()
+    """
+    server = StandinServer((host, port), config, verbose)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    """
+    命令行入口
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='番茄小说离线替身服务器')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=5002, help='监听端口')
+    parser.add_argument('--latency-ms', type=float, default=0, help='每个请求的固定延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='随机附加延迟上限（毫秒）')
+    parser.add_argument('--pages', type=int, default=5, help='榜单总页数')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机注入错误的概率（0~1）')
+    parser.add_argument('--error-status', type=int, default=500, help='注入错误时的HTTP状态码')
+    parser.add_argument('--error-scope', choices=['api', 'all'], default='api', help='错误注入范围：api 只影响榜单接口，all 影响所有请求')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子')
+    args = parser.parse_args()
+
+    config = StandinConfig(args.latency_ms, args.jitter_ms, args.pages, args.error_rate, args.error_status, args.seed,
+                           args.error_scope)
+    server = StandinServer((args.host, args.port), config, verbose=True)
+    print(f"替身服务器已启动: {server.base_url}")
+    print(f"- 榜单接口: {server.book_list_url}")
+    print(f"- 动态页面: {server.library_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("接收到退出信号")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,16 @@
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 from fontTools.ttLib import TTFont
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import easyocr
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
-import json
 from tools.font_render_utils import render_char_to_image, batch_render_all_chars
+from mcp.jsonio import dump_json
 
 # 默认配置
 DEFAULT_OUTPUT_DIR = os.path.join('tools', 'ocr_chars')  # 图片输出目录
 DEFAULT_THREADS = 8  # 并发线程数
-DEFAULT_IMG_SIZE = 160
-DEFAULT_FONT_SIZE = 140
-
-def render_char_to_image(font_path, char, out_path, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE):
-    """
-    居中渲染+二值化+放大图片+加粗字符
-    """
-    font = ImageFont.truetype(font_path, font_size)
-    img = Image.new('L', (img_size, img_size), color=255)
-    draw = ImageDraw.Draw(img)
-    bbox = draw.textbbox((0, 0), char, font=font)
-    w = bbox[2] - bbox[0]
-    h = bbox[3] - bbox[1]
-    x = (img.width - w) // 2 - bbox[0]
-    y = (img.height - h) // 2 - bbox[1]
-    # 加粗：多次偏移绘制
-    offsets = [(0,0), (1,0), (0,1), (-1,0), (0,-1)]
-    for dx, dy in offsets:
-        draw.text((x+dx, y+dy), char, font=font, fill=0)
-    # 也可尝试Pillow 8.2+的stroke_width参数（如有支持）
-    # draw.text((x, y), char, font=font, fill=0, stroke_width=2, stroke_fill=0)
-    # 二值化处理，但保存为'L'模式而非'1'模式，避免OpenCV读取问题
-    img = img.point(lambda p: 0 if p < 128 else 255, 'L')
-    img.save(out_path)
-
-def batch_render_all_chars(font_path, output_dir):
-    """
-    批量渲染字体中所有字符
-    """
-    font = TTFont(font_path)
-    cmap = font.getBestCmap()
-    char_files = []
-    for char_code in cmap:
-        char = chr(char_code)
-        out_path = os.path.join(output_dir, f"U{char_code:04X}.png")
-        render_char_to_image(font_path, char, out_path)
-        char_files.append((char, out_path))
-    return char_files
 
 def ocr_image(image_path, reader):
     """
@@ -101,8 +63,7 @@ def save_mapping(mapping, out_path):
     """
     # 按照 key 的 Unicode 码点值升序排序
     sorted_mapping = dict(sorted(mapping.items(), key=lambda x: ord(x[0])))
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump(sorted_mapping, f, ensure_ascii=False, indent=2)
+    dump_json(sorted_mapping, out_path)
     print(f"映射表已保存到: {out_path}，按Unicode码点升序排序")
 
 def generate_ocr_mapping(font_path, output_path, output_dir=DEFAULT_OUTPUT_DIR, threads=DEFAULT_THREADS):
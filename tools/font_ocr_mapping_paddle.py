@@ -1,14 +1,15 @@
 import os
-from paddleocr import PaddleOCR
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 from fontTools.ttLib import TTFont
 import numpy as np
 import re
-from tools.font_render_utils import render_char_to_image, batch_render_all_chars
-import easyocr
+from tools.font_render_utils import render_char_to_image, batch_render_all_chars, render_chars_to_images
+from tools.glyph_index import (glyph_outline_hashes, load_known_outlines, plan_incremental, raster_fallback_for,
+                               DEFAULT_MAPPING_DIR, DEFAULT_FONT_DIR)
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
-import json
+from mcp.tracing import traced, span
+from mcp.jsonio import dump_json
 
 # 保留汉字、英文、数字
 VALID_CHAR_RE = re.compile(r'[A-Za-z0-9\u4e00-\u9fff]')
@@ -20,58 +21,23 @@ def filter_valid_chars(text):
 # 默认配置
 DEFAULT_OUTPUT_DIR = os.path.join('tools', 'ocr_chars')  # 图片输出目录
 DEFAULT_THREADS = 2  # 并发线程数
-DEFAULT_IMG_SIZE = 160
-DEFAULT_FONT_SIZE = 140
 
 # 线程本地存储
 thread_local = threading.local()
 
 def get_paddle_ocr():
     if not hasattr(thread_local, "ocr_model"):
+        # 延迟导入：只用EasyOCR或模板匹配时不需要安装paddleocr
+        from paddleocr import PaddleOCR
         thread_local.ocr_model = PaddleOCR(use_angle_cls=False, lang='ch')
     return thread_local.ocr_model
 
 def get_easyocr_reader():
     if not hasattr(thread_local, "easyocr_reader"):
+        import easyocr
         thread_local.easyocr_reader = easyocr.Reader(['ch_sim', 'en'], gpu=False)
     return thread_local.easyocr_reader
 
-def render_char_to_image(font_path, char, out_path, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE):
-    """
-    居中渲染+二值化+放大图片+加粗字符
-    """
-    font = ImageFont.truetype(font_path, font_size)
-    img = Image.new('L', (img_size, img_size), color=255)
-    draw = ImageDraw.Draw(img)
-    bbox = draw.textbbox((0, 0), char, font=font)
-    w = bbox[2] - bbox[0]
-    h = bbox[3] - bbox[1]
-    x = (img.width - w) // 2 - bbox[0]
-    y = (img.height - h) // 2 - bbox[1]
-    # 加粗：多次偏移绘制
-    offsets = [(0,0), (1,0), (0,1), (-1,0), (0,-1)]
-    for dx, dy in offsets:
-        draw.text((x+dx, y+dy), char, font=font, fill=0)
-    # 也可尝试Pillow 8.2+的stroke_width参数（如有支持）
-    # draw.text((x, y), char, font=font, fill=0, stroke_width=2, stroke_fill=0)
-    # 二值化处理，但保存为'L'模式而非'1'模式，避免OpenCV读取问题
-    img = img.point(lambda p: 0 if p < 128 else 255, 'L')
-    img.save(out_path)
-
-def batch_render_all_chars(font_path, output_dir):
-    """
-    批量渲染字体中所有字符
-    """
-    font = TTFont(font_path)
-    cmap = font.getBestCmap()
-    char_files = []
-    for char_code in cmap:
-        char = chr(char_code)
-        out_path = os.path.join(output_dir, f"U{char_code:04X}.png")
-        render_char_to_image(font_path, char, out_path)
-        char_files.append((char, out_path))
-    return char_files
-
 def paddle_ocr_image(image_path, ocr_model=None):
     if ocr_model is None:
         ocr_model = get_paddle_ocr()
@@ -115,8 +81,10 @@ def easyocr_image(image_path, reader=None):
         print(f"[ERROR] EasyOCR识别失败: {image_path}, 错误: {e}")
     return '', 0.0
 
-def batch_paddle_easyocr_images(image_dir, max_workers=DEFAULT_THREADS):
-    files = [fname for fname in sorted(os.listdir(image_dir)) if fname.lower().endswith('.png')]
+@traced('ocr.recognize', 'ocr')
+def batch_paddle_easyocr_images(image_dir, max_workers=DEFAULT_THREADS, files=None):
+    if files is None:
+        files = [fname for fname in sorted(os.listdir(image_dir)) if fname.lower().endswith('.png')]
     results = {}
     paddle_scores = {}
     # 1. 先用paddle识别
@@ -151,10 +119,14 @@ def batch_paddle_easyocr_images(image_dir, max_workers=DEFAULT_THREADS):
             print(f"[EasyOCR] {fname}: {repr(text)}, score={score}")
     return results
 
-def generate_ocr_mapping(font_path, output_path, output_dir=DEFAULT_OUTPUT_DIR, threads=DEFAULT_THREADS):
+def generate_ocr_mapping(font_path, output_path, output_dir=DEFAULT_OUTPUT_DIR, threads=DEFAULT_THREADS,
+                         incremental=False, mapping_dir=DEFAULT_MAPPING_DIR, font_dir=DEFAULT_FONT_DIR):
     """
     生成OCR映射表，先渲染图片，再用paddle+easyocr批量识别，输出json，按字体index升序排序
+    incremental=True 时按字形轮廓去重，复用历史映射表中的结果，只识别新字形
     """
+    if incremental:
+        return generate_incremental_ocr_mapping(font_path, output_path, output_dir, threads, mapping_dir, font_dir)
     try:
         os.makedirs(output_dir, exist_ok=True)
         print("--- 批量渲染字体字符为图片 ---")
@@ -165,8 +137,9 @@ def generate_ocr_mapping(font_path, output_path, output_dir=DEFAULT_OUTPUT_DIR,
             index = font.getGlyphID(glyph_name)
             char = chr(char_code)
             out_path = os.path.join(output_dir, f"U{char_code:04X}.png")
-            render_char_to_image(font_path, char, out_path)
             index_char_list.append((index, char, out_path))
+        with span('ocr.render', 'ocr', chars=len(index_char_list)):
+            render_chars_to_images(font_path, [(char, out_path) for _, char, out_path in index_char_list])
         print(f"共渲染 {len(index_char_list)} 个字符图片")
         print("--- 多线程OCR识别 ---")
         results = batch_paddle_easyocr_images(output_dir, max_workers=threads)
@@ -178,14 +151,68 @@ def generate_ocr_mapping(font_path, output_path, output_dir=DEFAULT_OUTPUT_DIR,
         sorted_mapping = {char: val for char, val in sorted(mapping.items(), key=lambda x: x[1][0])}
         # 只保留char: 识别结果
         sorted_mapping = {char: val[1] for char, val in sorted_mapping.items()}
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(sorted_mapping, f, ensure_ascii=False, indent=2)
+        dump_json(sorted_mapping, output_path)
         print(f"映射表已保存到: {output_path}，按index升序排序")
         return True
     except Exception as e:
         print(f"生成OCR映射表失败: {e}")
         return False
 
+def generate_incremental_ocr_mapping(font_path, output_path, output_dir=DEFAULT_OUTPUT_DIR, threads=DEFAULT_THREADS,
+                                     mapping_dir=DEFAULT_MAPPING_DIR, font_dir=DEFAULT_FONT_DIR):
+    """
+    增量生成OCR映射表：
+      1. 计算每个字符的字形轮廓哈希
+      2. 与历史映射表（cache/mappings/<hash>_mapping.json + cache/fonts/<hash>.otf）比对，复用已校验结果
+      3. 字体内轮廓相同的字符只识别一次
+      4. 仅渲染并OCR真正的新字形
+    """
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        font = TTFont(font_path)
+        cmap = font.getBestCmap()
+        current_hash = os.path.basename(output_path)
+        current_hash = current_hash[:-len('_mapping.json')] if current_hash.endswith('_mapping.json') else None
+        print("--- 计算字形轮廓哈希 ---")
+        outlines = glyph_outline_hashes(font_path, raster_fallback_for(font_path))
+        known = load_known_outlines(mapping_dir, font_dir, exclude_hash=current_hash)
+        reused, representatives, duplicates = plan_incremental(outlines, known)
+        # 轮廓和光栅哈希都无法计算的字符直接送去识别，不留空
+        for char in (chr(code) for code in cmap):
+            if char not in outlines:
+                representatives[f"u:{ord(char):04X}"] = char
+        print(f"共 {len(cmap)} 个字符，历史已知字形 {len(known)} 个")
+        print(f"复用历史结果 {len(reused)} 个，字体内重复字形 {len(duplicates)} 个，需识别 {len(representatives)} 个")
+        results = {}
+        if representatives:
+            print("--- 渲染新字形图片 ---")
+            files = [f"U{ord(char):04X}.png" for char in representatives.values()]
+            with span('ocr.render', 'ocr', chars=len(files)):
+                render_chars_to_images(font_path, [
+                    (char, os.path.join(output_dir, fname)) for char, fname in zip(representatives.values(), files)
+                ])
+            print("--- 多线程OCR识别新字形 ---")
+            results = batch_paddle_easyocr_images(output_dir, max_workers=threads, files=files)
+        recognized = {char: results.get(f"U{ord(char):04X}.png", "") for char in representatives.values()}
+        mapping = {}
+        for char_code, glyph_name in sorted(cmap.items(), key=lambda x: font.getGlyphID(x[1])):
+            char = chr(char_code)
+            if char in reused:
+                mapping[char] = reused[char]
+            elif char in duplicates:
+                mapping[char] = recognized.get(duplicates[char], "")
+            else:
+                mapping[char] = recognized.get(char, "")
+        dump_json(mapping, output_path)
+        recognized_count = sum(1 for value in recognized.values() if value)
+        print(f"增量映射完成: 复用 {len(reused) + len(duplicates)} 个，识别 {recognized_count} 个，"
+              f"未识别 {len(recognized) - recognized_count} 个")
+        print(f"映射表已保存到: {output_path}，按index升序排序")
+        return True
+    except Exception as e:
+        print(f"增量生成OCR映射表失败: {e}")
+        return False
+
 if __name__ == "__main__":
     image_dir = os.path.join(os.path.dirname(__file__), 'ocr_chars')
     batch_paddle_easyocr_images(image_dir) 
\ No newline at end of file
@@ -1,15 +1,29 @@
 import os
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from fontTools.ttLib import TTFont
 
-DEFAULT_IMG_SIZE = 100
+DEFAULT_IMG_SIZE = 160
 DEFAULT_FONT_SIZE = 140
+# 少于该数量的字符直接在当前进程渲染，避免进程池启动开销
+PARALLEL_THRESHOLD = 64
+# 精灵图每行字符数
+DEFAULT_SPRITE_COLS = 20
 
-def render_char_to_image(font_path, char, out_path, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE):
+@lru_cache(maxsize=16)
+def load_font(font_path, font_size, index=0):
     """
-    居中渲染+二值化+放大图片+加粗字符
+    加载并缓存字体对象，避免每个字符重复读取字体文件
+    """
+    return ImageFont.truetype(font_path, font_size, index=index)
+
+def render_char_array(font, char, img_size=DEFAULT_IMG_SIZE):
+    """
+    居中渲染+加粗+二值化，返回 uint8 数组（0为笔画，255为背景）
+    font 为已加载的 ImageFont 对象
     """
-    font = ImageFont.truetype(font_path, font_size)
     img = Image.new('L', (img_size, img_size), color=255)
     draw = ImageDraw.Draw(img)
     bbox = draw.textbbox((0, 0), char, font=font)
@@ -17,23 +31,147 @@ def render_char_to_image(font_path, char, out_path, img_size=DEFAULT_IMG_SIZE, f
     h = bbox[3] - bbox[1]
     x = (img.width - w) // 2 - bbox[0]
     y = (img.height - h) // 2 - bbox[1]
-    offsets = [(0,0), (1,0), (0,1), (-1,0), (0,-1)]
-    for dx, dy in offsets:
-        draw.text((x+dx, y+dy), char, font=font, fill=0)
-    img = img.point(lambda p: 0 if p < 128 else 255, 'L')
-    img.save(out_path)
+    draw.text((x, y), char, font=font, fill=0)
+    arr = np.asarray(img)
+    # 加粗：与上下左右各偏移1像素的结果取最小值（十字形腐蚀背景），代替多次偏移绘制
+    bold = arr.copy()
+    np.minimum(bold[1:, :], arr[:-1, :], out=bold[1:, :])
+    np.minimum(bold[:-1, :], arr[1:, :], out=bold[:-1, :])
+    np.minimum(bold[:, 1:], arr[:, :-1], out=bold[:, 1:])
+    np.minimum(bold[:, :-1], arr[:, 1:], out=bold[:, :-1])
+    # 二值化处理，保存为'L'模式而非'1'模式，避免OpenCV读取问题
+    return np.where(bold < 128, 0, 255).astype(np.uint8)
+
+def render_char_to_image(font_path, char, out_path, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE):
+    """
+    居中渲染+二值化+放大图片+加粗字符
+    """
+    font = load_font(font_path, font_size)
+    Image.fromarray(render_char_array(font, char, img_size), 'L').save(out_path)
+
+def _render_files_chunk(font_path, img_size, font_size, char_paths):
+    """
+    进程池任务：在子进程内渲染一批字符并写入文件，字体对象每个进程只加载一次
+    """
+    done = []
+    for char, out_path in char_paths:
+        try:
+            render_char_to_image(font_path, char, out_path, img_size, font_size)
+            done.append((char, out_path))
+        except Exception as e:
+            print(f"生成图片失败: {out_path}, 字符: '{char}', 错误: {e}")
+    return done
+
+def _render_arrays_chunk(font_path, img_size, font_size, chars):
+    """
+    进程池任务：在子进程内渲染一批字符，返回数组列表
+    """
+    font = load_font(font_path, font_size)
+    return [render_char_array(font, char, img_size) for char in chars]
 
-def batch_render_all_chars(font_path, output_dir, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE):
+def _chunks(items, n):
+    size = max(1, (len(items) + n - 1) // n)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _workers(count, workers):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if count < PARALLEL_THRESHOLD:
+        return 1
+    return max(1, min(workers, count // (PARALLEL_THRESHOLD // 4)))
+
+def render_chars_to_images(font_path, char_paths, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE, workers=None):
+    """
+    多进程批量渲染 [(char, out_path)]，返回成功写入的 [(char, out_path)]
+    """
+    char_paths = list(char_paths)
+    workers = _workers(len(char_paths), workers)
+    if workers <= 1:
+        return _render_files_chunk(font_path, img_size, font_size, char_paths)
+    done = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_render_files_chunk, font_path, img_size, font_size, chunk)
+            for chunk in _chunks(char_paths, workers)
+        ]
+        for future in futures:
+            done.extend(future.result())
+    return done
+
+def render_char_arrays(font_path, chars, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE, workers=None):
+    """
+    多进程批量渲染字符，返回与chars顺序一致的 uint8 数组列表
+    """
+    chars = list(chars)
+    workers = _workers(len(chars), workers)
+    if workers <= 1:
+        return _render_arrays_chunk(font_path, img_size, font_size, chars)
+    arrays = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_render_arrays_chunk, font_path, img_size, font_size, chunk)
+            for chunk in _chunks(chars, workers)
+        ]
+        for future in futures:
+            arrays.extend(future.result())
+    return arrays
+
+def render_sprite_sheet(font_path, chars, out_path=None, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE,
+                        cols=DEFAULT_SPRITE_COLS, workers=None):
+    """
+    将多个字符渲染到一张精灵图
+    返回 (PIL.Image, index)，index 为 {char: (x, y)}，每个格子大小为 img_size x img_size
+    """
+    chars = list(chars)
+    arrays = render_char_arrays(font_path, chars, img_size, font_size, workers)
+    cols = max(1, min(cols, len(chars)))
+    rows = (len(chars) + cols - 1) // cols
+    sheet = np.full((max(rows, 1) * img_size, cols * img_size), 255, dtype=np.uint8)
+    index = {}
+    for i, (char, arr) in enumerate(zip(chars, arrays)):
+        row, col = divmod(i, cols)
+        y, x = row * img_size, col * img_size
+        sheet[y:y + img_size, x:x + img_size] = arr
+        index[char] = (x, y)
+    img = Image.fromarray(sheet, 'L')
+    if out_path:
+        img.save(out_path)
+    return img, index
+
+def batch_render_all_chars(font_path, output_dir, img_size=DEFAULT_IMG_SIZE, font_size=DEFAULT_FONT_SIZE, workers=None):
     """
     批量渲染字体中所有字符
     """
     font = TTFont(font_path)
     cmap = font.getBestCmap()
-    char_files = []
     os.makedirs(output_dir, exist_ok=True)
-    for char_code in cmap:
-        char = chr(char_code)
-        out_path = os.path.join(output_dir, f"U{char_code:04X}.png")
-        render_char_to_image(font_path, char, out_path, img_size, font_size)
-        char_files.append((char, out_path))
-    return char_files 
\ No newline at end of file
+    char_paths = [
+        (chr(char_code), os.path.join(output_dir, f"U{char_code:04X}.png"))
+        for char_code in cmap
+    ]
+    return render_chars_to_images(font_path, char_paths, img_size, font_size, workers)
+
+def main():
+    """
+    命令行入口：批量渲染字体字符图片，或输出一张精灵图
+    """
+    import argparse
+    from mcp.jsonio import dump_json
+    parser = argparse.ArgumentParser(description='字体字符批量渲染工具')
+    parser.add_argument('--font', required=True, help='字体文件路径')
+    parser.add_argument('--output-dir', default=os.path.join('tools', 'ocr_chars'), help='字符图片输出目录')
+    parser.add_argument('--sprite', default=None, help='精灵图输出路径（同时输出同名.json索引），指定后不再逐个输出图片')
+    parser.add_argument('--workers', type=int, default=None, help='渲染进程数，默认CPU核数')
+    args = parser.parse_args()
+
+    if args.sprite:
+        chars = [chr(char_code) for char_code in TTFont(args.font).getBestCmap()]
+        _, index = render_sprite_sheet(args.font, chars, args.sprite, workers=args.workers)
+        dump_json({f"U{ord(char):04X}": pos for char, pos in index.items()}, os.path.splitext(args.sprite)[0] + '.json')
+        print(f"精灵图已保存到: {args.sprite}，共 {len(index)} 个字符")
+    else:
+        char_files = batch_render_all_chars(args.font, args.output_dir, workers=args.workers)
+        print(f"共渲染 {len(char_files)} 个字符图片到: {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
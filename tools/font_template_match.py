@@ -0,0 +1,289 @@
+import os
+import glob
+import string
+import time
+import hashlib
+import tempfile
+import numpy as np
+from fontTools.ttLib import TTFont
+from tools.font_render_utils import load_font, render_char_array, render_chars_to_images
+from mcp.tracing import span
+from mcp.jsonio import load_json, dump_json, file_mode_for
+
+# 模板匹配使用的渲染参数：与OCR渲染相同的居中+加粗+二值化，再降采样为 MATCH_SIZE x MATCH_SIZE
+MATCH_IMG_SIZE = 64
+MATCH_FONT_SIZE = 56
+MATCH_SIZE = 32
+
+# 判定阈值：最佳相似度低于 MIN_SCORE 或与次佳差距小于 MIN_MARGIN 时视为歧义，交给OCR兜底
+MIN_SCORE = 0.6
+MIN_MARGIN = 0.05
+
+DEFAULT_OUTPUT_DIR = os.path.join('tools', 'ocr_chars')
+DEFAULT_MAPPING_DIR = os.path.join('cache', 'mappings')
+# 参考字体候选字符特征向量的缓存目录，按参考字体内容哈希和渲染参数区分
+DEFAULT_TEMPLATE_CACHE_DIR = os.path.join('cache', 'templates')
+
+# 常见系统中文字体位置，按顺序查找第一个存在的
+DEFAULT_REFERENCE_FONTS = [
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+    'C:/Windows/Fonts/simsun.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+]
+
+
+def find_reference_font():
+    """
+    返回第一个存在的系统中文参考字体路径，找不到则返回None
+    """
+    for path in DEFAULT_REFERENCE_FONTS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def gb2312_level1():
+    """
+    GB2312 一级汉字（3755个常用字，按拼音排序），由编码表 0xB0A1-0xD7F9 解码得到
+    """
+    return [bytes([high, low]).decode('gb2312')
+            for high in range(0xB0, 0xD8) for low in range(0xA1, 0xFF)
+            if not (high == 0xD7 and low > 0xF9)]
+
+
+def default_candidates(mapping_dir=DEFAULT_MAPPING_DIR, exclude_hashes=()):
+    """
+    候选字符集：数字、英文字母、GB2312一级汉字，以及历史映射表中出现过的所有字符
+    加密字体只替换有限的常用字，首次安装没有历史映射表时一级汉字即可覆盖绝大部分
+    exclude_hashes 中字体哈希对应的映射表不参与（基准测试中留出作为标准答案）
+    """
+    chars = set(string.digits + string.ascii_letters)
+    chars.update(gb2312_level1())
+    for mapping_file in glob.glob(os.path.join(mapping_dir, '*_mapping.json')):
+        if os.path.basename(mapping_file)[:-len('_mapping.json')] in exclude_hashes:
+            continue
+        try:
+            chars.update(v for v in load_json(mapping_file).values() if isinstance(v, str) and len(v) == 1)
+        except Exception as e:
+            print(f"读取候选字符失败 {mapping_file}: {e}")
+    return sorted(chars)
+
+
+def glyph_vector(font, char):
+    """
+    渲染字符并降采样为归一化特征向量（去均值、单位长度），空白字形返回全零向量
+    """
+    arr = render_char_array(font, char, MATCH_IMG_SIZE)
+    factor = MATCH_IMG_SIZE // MATCH_SIZE
+    ink = 1.0 - arr.astype(np.float32) / 255.0
+    small = ink.reshape(MATCH_SIZE, factor, MATCH_SIZE, factor).mean(axis=(1, 3)).ravel()
+    small -= small.mean()
+    norm = np.linalg.norm(small)
+    if norm == 0:
+        return small
+    return small / norm
+
+
+def font_vectors(font_path, chars, index=0):
+    """
+    批量计算字符特征向量，返回 (n, MATCH_SIZE*MATCH_SIZE) 矩阵
+    """
+    font = load_font(font_path, MATCH_FONT_SIZE, index)
+    return np.stack([glyph_vector(font, char) for char in chars]) if chars else np.zeros((0, MATCH_SIZE * MATCH_SIZE), np.float32)
+
+
+def template_cache_path(reference_font, index=0, cache_dir=DEFAULT_TEMPLATE_CACHE_DIR):
+    """
+    参考字体的向量缓存路径：<参考字体内容哈希>-<字体序号>-<渲染参数>.npz，参考字体或渲染参数变化时自动换新文件
+    """
+    digest = hashlib.sha1()
+    with open(reference_font, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    name = f"{digest.hexdigest()[:16]}-{index}-{MATCH_IMG_SIZE}-{MATCH_FONT_SIZE}-{MATCH_SIZE}.npz"
+    return os.path.join(cache_dir, name)
+
+
+def _load_template_cache(path):
+    try:
+        with np.load(path) as data:
+            return list(data['labels']), data['vectors'], set(data['absent'])
+    except FileNotFoundError:
+        return [], np.zeros((0, MATCH_SIZE * MATCH_SIZE), np.float32), set()
+    except Exception as e:
+        print(f"模板缓存损坏，重新生成 {path}: {e}")
+        return [], np.zeros((0, MATCH_SIZE * MATCH_SIZE), np.float32), set()
+
+
+def _save_template_cache(path, labels, vectors, absent):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.templates.', suffix='.tmp', dir=directory)
+    try:
+        os.chmod(tmp_path, file_mode_for(path))
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, labels=np.array(labels, dtype=str), vectors=np.asarray(vectors, np.float32),
+                     absent=np.array(sorted(absent), dtype=str))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def reference_vectors(reference_font, candidates, index=0, cache_dir=DEFAULT_TEMPLATE_CACHE_DIR):
+    """
+    返回参考字体中存在的候选字符及其特征向量 (labels, vectors)
+    cache_dir 不为None时按参考字体缓存：缓存中已有的字符（包括确认参考字体中不存在的）不再渲染，
+    只渲染新增的候选字符并写回缓存
+    """
+    if cache_dir is None:
+        cmap = TTFont(reference_font, fontNumber=index, lazy=True).getBestCmap()
+        labels = [char for char in candidates if ord(char) in cmap]
+        return labels, font_vectors(reference_font, labels, index)
+
+    path = template_cache_path(reference_font, index, cache_dir)
+    cached_labels, cached_vectors, absent = _load_template_cache(path)
+    rows = {label: row for row, label in enumerate(cached_labels)}
+    missing = [char for char in candidates if char not in rows and char not in absent]
+    if missing:
+        cmap = TTFont(reference_font, fontNumber=index, lazy=True).getBestCmap()
+        new_labels = [char for char in missing if ord(char) in cmap]
+        absent.update(char for char in missing if ord(char) not in cmap)
+        cached_vectors = np.concatenate([cached_vectors, font_vectors(reference_font, new_labels, index)])
+        for char in new_labels:
+            rows[char] = len(cached_labels)
+            cached_labels.append(char)
+        _save_template_cache(path, cached_labels, cached_vectors, absent)
+        print(f"模板缓存新增 {len(new_labels)} 个字符: {path}")
+    labels = [char for char in candidates if char in rows]
+    return labels, cached_vectors[[rows[char] for char in labels]]
+
+
+class TemplateMatcher:
+    """
+    基于降采样位图的最近邻匹配器
+    labels: 候选字符列表
+    vectors: 与labels一一对应的特征向量矩阵
+    """
+
+    def __init__(self, labels, vectors, min_score=MIN_SCORE, min_margin=MIN_MARGIN):
+        self.labels = list(labels)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.min_score = min_score
+        self.min_margin = min_margin
+
+    @classmethod
+    def from_reference_font(cls, reference_font, candidates, index=0, cache_dir=DEFAULT_TEMPLATE_CACHE_DIR,
+                            **kwargs):
+        """
+        用本地参考字体渲染候选字符建立模板库，参考字体中不存在的字符会被跳过
+        渲染结果按参考字体缓存在 cache_dir 中，之后只需读取缓存（cache_dir=None 时每次重新渲染）
+        """
+        labels, vectors = reference_vectors(reference_font, candidates, index, cache_dir)
+        return cls(labels, vectors, **kwargs)
+
+    def match(self, vectors):
+        """
+        向量化最近邻匹配
+        返回 [(label, score, ambiguous)]，与输入向量顺序一致
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) == 0 or len(self.labels) == 0:
+            return [('', 0.0, True) for _ in range(len(vectors))]
+        scores = vectors @ self.vectors.T
+        if scores.shape[1] > 1:
+            top2 = np.argpartition(-scores, 1, axis=1)[:, :2]
+            top2_scores = np.take_along_axis(scores, top2, axis=1)
+            order = np.argsort(-top2_scores, axis=1)
+            best = np.take_along_axis(top2, order[:, :1], axis=1)[:, 0]
+            best_score = np.take_along_axis(top2_scores, order[:, :1], axis=1)[:, 0]
+            second_score = np.take_along_axis(top2_scores, order[:, 1:], axis=1)[:, 0]
+        else:
+            best = np.zeros(len(vectors), dtype=np.int64)
+            best_score = scores[:, 0]
+            second_score = np.full(len(vectors), -1.0)
+        ambiguous = (best_score < self.min_score) | (best_score - second_score < self.min_margin)
+        return [
+            (self.labels[b], float(s), bool(a))
+            for b, s, a in zip(best, best_score, ambiguous)
+        ]
+
+
+def generate_template_mapping(font_path, output_path, reference_font=None, candidates=None,
+                              ocr_fallback=True, output_dir=DEFAULT_OUTPUT_DIR, threads=2):
+    """
+    不依赖OCR的映射表生成：用本地参考字体渲染候选字符，与加密字体字形做最近邻匹配
+    歧义字形可选交给 paddle+easyocr 兜底（仅在需要时才加载OCR模型）
+
+    返回:
+        bool: 是否成功生成映射表
+    """
+    try:
+        start_time = time.time()
+        reference_font = reference_font or find_reference_font()
+        if not reference_font:
+            print("未找到本地中文参考字体，请通过 --reference-font 指定")
+            return False
+        if candidates is None:
+            candidates = default_candidates()
+        print(f"--- 模板匹配: 参考字体 {reference_font}，候选字符 {len(candidates)} 个 ---")
+        matcher = TemplateMatcher.from_reference_font(reference_font, candidates)
+
+        font = TTFont(font_path)
+        cmap = font.getBestCmap()
+        items = sorted(cmap.items(), key=lambda x: font.getGlyphID(x[1]))
+        chars = [chr(char_code) for char_code, _ in items]
+        with span('ocr.template_match', 'ocr', chars=len(chars)):
+            results = matcher.match(font_vectors(font_path, chars))
+        mapping = {}
+        ambiguous_chars = []
+        for char, (label, score, ambiguous) in zip(chars, results):
+            mapping[char] = '' if ambiguous else label
+            if ambiguous:
+                ambiguous_chars.append(char)
+        print(f"模板匹配完成: 命中 {len(chars) - len(ambiguous_chars)} 个，歧义 {len(ambiguous_chars)} 个，"
+              f"耗时 {time.time() - start_time:.2f}秒")
+
+        if ambiguous_chars and ocr_fallback:
+            print("--- 歧义字形交给OCR兜底 ---")
+            from tools.font_ocr_mapping_paddle import batch_paddle_easyocr_images
+            os.makedirs(output_dir, exist_ok=True)
+            files = [f"U{ord(char):04X}.png" for char in ambiguous_chars]
+            with span('ocr.render', 'ocr', chars=len(files)):
+                render_chars_to_images(font_path, [
+                    (char, os.path.join(output_dir, fname)) for char, fname in zip(ambiguous_chars, files)
+                ])
+            ocr_results = batch_paddle_easyocr_images(output_dir, max_workers=threads, files=files)
+            for char in ambiguous_chars:
+                mapping[char] = ocr_results.get(f"U{ord(char):04X}.png", "")
+
+        dump_json(mapping, output_path)
+        print(f"映射表已保存到: {output_path}，按index升序排序")
+        return True
+    except Exception as e:
+        print(f"模板匹配生成映射表失败: {e}")
+        return False
+
+
+def main():
+    """
+    命令行入口
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='基于参考字体模板匹配的字体映射生成工具')
+    parser.add_argument('--font', required=True, help='加密字体文件路径')
+    parser.add_argument('--output', required=True, help='映射表输出路径')
+    parser.add_argument('--reference-font', default=None, help='本地中文参考字体路径')
+    parser.add_argument('--no-ocr-fallback', action='store_true', help='歧义字形不调用OCR兜底')
+    args = parser.parse_args()
+
+    generate_template_mapping(args.font, args.output, args.reference_font, ocr_fallback=not args.no_ocr_fallback)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import glob
+import hashlib
+from fontTools.ttLib import TTFont
+from fontTools.pens.recordingPen import RecordingPen
+from mcp.decoder.mapping_store import MappingStore
+
+DEFAULT_MAPPING_DIR = os.path.join('cache', 'mappings')
+DEFAULT_FONT_DIR = os.path.join('cache', 'fonts')
+
+
+def glyph_outline_hashes(font_path, raster_fallback=None):
+    """
+    计算字体中每个字符的字形轮廓哈希，返回 {char: hash}
+    轮廓无法绘制时，若提供 raster_fallback(char) -> bytes，则退化为光栅哈希
+    """
+    font = TTFont(font_path)
+    glyph_set = font.getGlyphSet()
+    hashes = {}
+    for char_code, glyph_name in font.getBestCmap().items():
+        char = chr(char_code)
+        try:
+            pen = RecordingPen()
+            glyph_set[glyph_name].draw(pen)
+            digest = 'o:' + hashlib.sha1(repr(pen.value).encode('utf-8')).hexdigest()
+        except Exception:
+            if raster_fallback is None:
+                continue
+            digest = 'r:' + hashlib.sha1(raster_fallback(char)).hexdigest()
+        hashes[char] = digest
+    return hashes
+
+
+def raster_fallback_for(font_path):
+    """
+    返回 raster_fallback(char)：用该字体渲染字符并返回像素字节，供轮廓无法绘制的字形计算光栅哈希
+    """
+    from tools.font_render_utils import load_font, render_char_array, DEFAULT_FONT_SIZE
+    font = load_font(font_path, DEFAULT_FONT_SIZE)
+    return lambda char: render_char_array(font, char).tobytes()
+
+
+def load_known_outlines(mapping_dir=DEFAULT_MAPPING_DIR, font_dir=DEFAULT_FONT_DIR, exclude_hash=None):
+    """
+    从历史映射表和对应的字体文件建立 {轮廓哈希: 识别结果} 索引
+    映射表通过 MappingStore 读取，校验页面尚未合并的编辑日志也会生效；
+    只收录非空结果，多个映射表冲突时以最新修改的为准。
+    注意：映射表不记录每个字符是否经过人工校验，未校验的OCR结果同样会被复用，
+    新字体的映射应在校验页面核对后再用于下一次增量识别
+    """
+    known = {}
+    mapping_files = glob.glob(os.path.join(mapping_dir, '*_mapping.json'))
+    for mapping_file in sorted(mapping_files, key=os.path.getmtime):
+        font_hash = os.path.basename(mapping_file)[:-len('_mapping.json')]
+        if font_hash == exclude_hash:
+            continue
+        font_path = os.path.join(font_dir, f"{font_hash}.otf")
+        if not os.path.exists(font_path):
+            continue
+        try:
+            _, mapping = MappingStore(mapping_file).snapshot()
+            outlines = glyph_outline_hashes(font_path, raster_fallback_for(font_path))
+        except Exception as e:
+            print(f"跳过历史映射 {mapping_file}: {e}")
+            continue
+        for char, value in mapping.items():
+            digest = outlines.get(char)
+            if digest and value:
+                known[digest] = value
+    return known
+
+
+def plan_incremental(outlines, known):
+    """
+    根据轮廓哈希划分字符
+    返回 (reused, representatives, duplicates):
+      reused: {char: 已知结果}
+      representatives: {hash: 代表字符}，仅这些字符需要OCR
+      duplicates: {char: 代表字符}，与代表字符轮廓相同，直接复用其识别结果
+    """
+    reused = {}
+    representatives = {}
+    duplicates = {}
+    for char in sorted(outlines, key=ord):
+        digest = outlines[char]
+        if digest in known:
+            reused[char] = known[digest]
+        elif digest in representatives:
+            duplicates[char] = representatives[digest]
+        else:
+            representatives[digest] = char
+    return reused, representatives, duplicates
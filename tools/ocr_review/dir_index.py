@@ -0,0 +1,86 @@
+import os
+import glob
+import hashlib
+import threading
+
+
+class DirectoryIndex:
+    """
+    目录内容缓存：只在目录签名变化时调用 build(path) 重建
+    签名为 (目录修改时间, 文件数, 文件最大修改时间, 文件总大小)：新增、删除、重命名文件会改变目录修改时间，
+    原地覆盖文件（如为新字体重新渲染同名的 UE3E8.png）会改变文件修改时间和大小；
+    计算签名只需一次 scandir 和每个文件一次 stat，不调用 build
+    get() 返回 (version, value)，version 可直接用作 ETag
+    """
+
+    def __init__(self, path, build):
+        self.path = path
+        self.build = build
+        self._signature = None
+        self._version = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def _dir_signature(self):
+        try:
+            dir_mtime = os.stat(self.path).st_mtime_ns
+            count = max_mtime = total_size = 0
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    count += 1
+                    max_mtime = max(max_mtime, stat.st_mtime_ns)
+                    total_size += stat.st_size
+            return dir_mtime, count, max_mtime, total_size
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        signature = self._dir_signature()
+        with self._lock:
+            if self._version is None or signature != self._signature:
+                self._value = self.build(self.path)
+                self._signature = signature
+                self._version = hashlib.md5(f"{self.path}:{signature}".encode('utf-8')).hexdigest()[:16]
+            return self._version, self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+
+def scan_images(img_dir):
+    """
+    扫描字符图片目录，返回按文件名排序的图片信息列表
+    """
+    import datetime
+    images = []
+    if not os.path.isdir(img_dir):
+        return images
+    with os.scandir(img_dir) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith('.png') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            images.append({
+                'filename': entry.name,
+                'path': f'/ocr_chars/{entry.name}',
+                'size': stat.st_size,
+                'modified': datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                'unicode': entry.name[1:-4],  # 从文件名中提取Unicode编码，例如UE51D.png -> E51D
+            })
+    images.sort(key=lambda item: item['filename'])
+    return images
+
+
+def latest_mapping_file(mapping_dir):
+    """
+    按修改时间取最新的 *_mapping.json，没有则返回None
+    """
+    mapping_files = glob.glob(os.path.join(mapping_dir, '*_mapping.json'))
+    if not mapping_files:
+        return None
+    return max(mapping_files, key=os.path.getmtime)
@@ -0,0 +1,118 @@
+import os
+import time
+
+BLOCK_SIZE = 8192
+
+
+def tail_lines(path, n=100, block_size=BLOCK_SIZE, encoding='utf-8'):
+    """
+    从文件末尾向前按块读取，返回最后n行（保留换行符），开销与文件大小无关
+    """
+    if n <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        # 多读一行，保证第一行是完整的
+        while pos > 0 and data.count(b'\n') <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines(keepends=True)
+    return [line.decode(encoding, errors='replace') for line in lines[-n:]]
+
+
+def _open_at(path, start):
+    """
+    按 (inode, offset) 重新打开文件：当前文件或轮转后的 path.1 的inode匹配时定位到offset，
+    都不匹配时返回None（由调用方从当前文件开头读取）
+    """
+    inode, offset = start
+    for candidate in (path, path + '.1'):
+        try:
+            f = open(candidate, 'rb')
+        except FileNotFoundError:
+            continue
+        if os.fstat(f.fileno()).st_ino == inode and os.fstat(f.fileno()).st_size >= offset:
+            f.seek(offset)
+            return f
+        f.close()
+    return None
+
+
+def follow(path, poll_interval=0.5, from_end=True, should_stop=None, heartbeat=None, encoding='utf-8', start=None,
+           positions=False):
+    """
+    持续跟踪文件新增的行（类似 tail -f），返回生成器，每次产出一行
+    调用时立即定位到文件末尾，之后写入的行都不会遗漏
+    文件被轮转（inode变化或变短）时先读完旧文件剩余的行，再从头打开新文件
+    heartbeat: 秒数，超过该时间没有新行时产出None，供调用方发送心跳
+    start: 上次读到的位置 (inode, offset)，从该位置继续（文件已轮转时先读完 path.1 中剩余的行）
+    positions: 为True时产出 (行, inode, offset)，offset 为该行之后的位置，可作为下次的 start；
+               开始时先产出一次 (None, inode, offset) 表示起始位置，心跳也带位置
+    """
+    f = None
+    if start is not None:
+        f = _open_at(path, start)
+        from_end = False
+    if f is None and os.path.exists(path):
+        f = open(path, 'rb')
+        if from_end:
+            f.seek(0, os.SEEK_END)
+    return _follow(path, f, poll_interval, should_stop, heartbeat, encoding, positions)
+
+
+def _follow(path, f, poll_interval, should_stop, heartbeat, encoding, positions):
+    inode = os.fstat(f.fileno()).st_ino if f is not None else None
+
+    def emit(line):
+        if not positions:
+            return line
+        return line, inode, f.tell() if f is not None else 0
+
+    partial = b''
+    last_emit = time.time()
+    try:
+        if positions:
+            yield emit(None)
+        while not (should_stop and should_stop()):
+            if f is None:
+                try:
+                    f = open(path, 'rb')
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+            chunk = f.readline()
+            if chunk:
+                if not chunk.endswith(b'\n'):
+                    partial += chunk
+                    continue
+                line, partial = partial + chunk, b''
+                last_emit = time.time()
+                yield emit(line.decode(encoding, errors='replace'))
+                continue
+            # 没有新内容：检查是否被轮转
+            try:
+                st = os.stat(path)
+                rotated = st.st_ino != inode or st.st_size < f.tell()
+            except FileNotFoundError:
+                rotated = False
+            if rotated:
+                # 上次读到末尾之后、改名之前写入旧文件的行仍在旧句柄中，先读完再切换
+                rest = partial + f.read()
+                for line in rest.splitlines(keepends=True):
+                    yield emit(line.decode(encoding, errors='replace'))
+                f.close()
+                f = None
+                partial = b''
+                continue
+            if heartbeat and time.time() - last_emit >= heartbeat:
+                last_emit = time.time()
+                yield emit(None)
+            time.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
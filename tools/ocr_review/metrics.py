@@ -0,0 +1,158 @@
+import threading
+import bisect
+from collections import OrderedDict, deque
+
+# 延迟直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个标签组合保留的最近样本数，用于计算精确分位数
+DEFAULT_RESERVOIR = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_str(label_names, labels):
+    if not label_names:
+        return ''
+    pairs = []
+    for name, value in zip(label_names, labels):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """
+    带标签的线程安全计数器
+    """
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    def prometheus(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in self.items():
+            lines.append(f'{self.name}{_label_str(self.label_names, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """
+    带标签的线程安全延迟直方图
+    分桶计数用于 Prometheus，最近样本用于计算 p50/p95/p99
+    """
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS, reservoir=DEFAULT_RESERVOIR):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.reservoir = reservoir
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = {
+                    'buckets': [0] * (len(self.buckets) + 1),
+                    'sum': 0.0,
+                    'count': 0,
+                    'samples': deque(maxlen=self.reservoir),
+                }
+                self._series[labels] = series
+            series['buckets'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+            series['count'] += 1
+            series['samples'].append(value)
+
+    def summary(self):
+        """
+        返回 {labels: {'count', 'sum', 'avg', 'p50', 'p95', 'p99'}}
+        """
+        with self._lock:
+            snapshot = {
+                labels: (series['count'], series['sum'], sorted(series['samples']))
+                for labels, series in self._series.items()
+            }
+        result = {}
+        for labels, (count, total, samples) in snapshot.items():
+            item = {'count': count, 'sum': total, 'avg': total / count if count else 0.0}
+            for q in QUANTILES:
+                item[f'p{int(q * 100)}'] = samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+            result[labels] = item
+        return result
+
+    def prometheus(self):
+        with self._lock:
+            snapshot = sorted(
+                (labels, list(series['buckets']), series['sum'], series['count'])
+                for labels, series in self._series.items()
+            )
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, buckets, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), buckets):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                label_str = _label_str(self.label_names + ('le',), labels + (le,))
+                lines.append(f'{self.name}_bucket{label_str} {cumulative}')
+            label_str = _label_str(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_str} {total}')
+            lines.append(f'{self.name}_count{label_str} {count}')
+        return lines
+
+
+class BoundedStats:
+    """
+    有上限的按键统计（LRU淘汰），用于每张图片的请求记录，避免无限增长
+    """
+
+    def __init__(self, max_entries=1024, fields=('requests', 'success', 'fail')):
+        self.max_entries = max_entries
+        self.fields = tuple(fields)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key, field, timestamp=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                item = dict.fromkeys(self.fields, 0)
+                item['last_request'] = None
+                self._items[key] = item
+                while len(self._items) > self.max_entries:
+                    self._items.popitem(last=False)
+            else:
+                self._items.move_to_end(key)
+            item[field] += 1
+            if timestamp is not None:
+                item['last_request'] = timestamp
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            return dict(item) if item is not None else default
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(item) for key, item in self._items.items()}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
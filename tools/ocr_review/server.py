@@ -1,17 +1,33 @@
-from flask import Flask, request, send_from_directory, jsonify, abort, send_file, g
+from flask import Flask, request, send_from_directory, jsonify, abort, send_file, g, Response, stream_with_context
 import os
-import json
-import glob
+import sys
+import io
+import gzip
+import zlib
 import mimetypes
 import time
 import logging
 from logging.handlers import RotatingFileHandler
 from functools import wraps
 import datetime
+import threading
 
-app = Flask(__name__)
 BASE_DIR = os.path.dirname(__file__)
+sys.path.insert(0, os.path.abspath(os.path.join(BASE_DIR, '../..')))
+from tools.font_render_utils import render_sprite_sheet
+from tools.ocr_review.metrics import Counter, Histogram, BoundedStats
+from tools.ocr_review.logtail import tail_lines, follow
+from tools.ocr_review.dir_index import DirectoryIndex, scan_images, latest_mapping_file
+from mcp.decoder.mapping_store import MappingStore
+from mcp.jsonio import dumps, loads, load_json
+
+app = Flask(__name__)
 IMG_DIR = os.path.abspath(os.path.join(BASE_DIR, '../ocr_chars'))
+FONT_DIR = os.path.abspath(os.path.join(BASE_DIR, '../../cache/fonts'))
+# 精灵图每个格子的像素大小（页面按48px显示，96px兼顾高分屏）
+SPRITE_CELL = 96
+SPRITE_FONT_SIZE = 84
+SPRITE_COLS = 20
 
 # 设置日志
 LOG_DIR = os.path.abspath(os.path.join(BASE_DIR, '../../logs'))
@@ -25,121 +41,296 @@ file_handler.setFormatter(logging.Formatter(
 app.logger.addHandler(file_handler)
 app.logger.setLevel(logging.INFO)
 
-# 性能统计
-performance_stats = {
-    'total_requests': 0,
-    'successful_requests': 0,
-    'failed_requests': 0,
-    'avg_response_time': 0,
-    'requests_by_type': {},
-    'image_stats': {}
-}
+# 启动方传入的实例令牌，/healthz 原样返回，用于确认端口上响应的是它启动的服务器
+INSTANCE_TOKEN = os.environ.get('OCR_REVIEW_TOKEN', '')
+
+# 性能统计（线程安全，可在多线程服务器下使用）
+START_TIME = time.time()
+MAX_IMAGE_STATS = 2048
+requests_total = Counter('ocr_review_requests_total', '按路由和结果统计的请求数', ('route', 'outcome'))
+request_latency = Histogram('ocr_review_request_duration_seconds', '按路由统计的请求耗时', ('route',))
+image_stats = BoundedStats(max_entries=MAX_IMAGE_STATS)
+
+def route_label():
+    """使用路由规则作为标签（如 /ocr_chars/<path:filename>），避免按文件名产生无限多的标签"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
 
 # 记录请求的中间件
 @app.before_request
 def before_request():
-    g.start_time = time.time()
+    g.start_time = time.perf_counter()
     app.logger.info(f"请求: {request.method} {request.path} 来自 {request.remote_addr}")
 
 @app.after_request
 def after_request(response):
-    global performance_stats
-    
     # 计算响应时间
-    diff = time.time() - g.start_time
-    
-    # 更新统计
-    performance_stats['total_requests'] += 1
-    
-    # 按请求类型分类
-    req_type = request.path.split('/')[1] if len(request.path.split('/')) > 1 else 'root'
-    if req_type not in performance_stats['requests_by_type']:
-        performance_stats['requests_by_type'][req_type] = {'count': 0, 'success': 0, 'fail': 0}
-    
-    performance_stats['requests_by_type'][req_type]['count'] += 1
-    
-    # 记录成功/失败
-    if 200 <= response.status_code < 300:
-        performance_stats['successful_requests'] += 1
-        performance_stats['requests_by_type'][req_type]['success'] += 1
-    else:
-        performance_stats['failed_requests'] += 1
-        performance_stats['requests_by_type'][req_type]['fail'] += 1
-    
-    # 更新平均响应时间
-    performance_stats['avg_response_time'] = ((performance_stats['avg_response_time'] * 
-        (performance_stats['total_requests'] - 1)) + diff) / performance_stats['total_requests']
-    
+    diff = time.perf_counter() - g.start_time
+    route = route_label()
+    # 304等重定向/缓存命中视为成功
+    outcome = 'success' if response.status_code < 400 else 'fail'
+    requests_total.inc(route, outcome)
+    request_latency.observe(diff, route)
     app.logger.info(f"响应: {response.status_code} 用时 {diff:.4f}秒")
-    
     return response
 
-# 动态查找最新的映射文件
-def get_latest_mapping_file():
-    mapping_dir = os.path.abspath(os.path.join(BASE_DIR, '../../cache/mappings'))
-    mapping_files = glob.glob(os.path.join(mapping_dir, '*_mapping.json'))
-    if not mapping_files:
-        return None
-    # 按修改时间排序，取最新的
-    return sorted(mapping_files, key=os.path.getmtime)[-1]
+# JSON等文本响应超过该大小时启用gzip压缩
+GZIP_MIN_SIZE = 1024
+GZIP_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+
+@app.after_request
+def gzip_response(response):
+    """
+    客户端支持gzip时压缩较大的文本响应；压缩后的表示与原始表示字节不同，ETag改为弱ETag
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in GZIP_MIMETYPES or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def performance_stats():
+    """汇总 /stats 使用的统计数据"""
+    by_route = {}
+    total = success = fail = 0
+    for (route, outcome), count in requests_total.items():
+        item = by_route.setdefault(route, {'count': 0, 'success': 0, 'fail': 0})
+        item['count'] += count
+        item[outcome] += count
+        total += count
+        if outcome == 'success':
+            success += count
+        else:
+            fail += count
+    latency_sum = 0.0
+    for (route,), summary in request_latency.summary().items():
+        by_route.setdefault(route, {'count': 0, 'success': 0, 'fail': 0}).update({
+            'avg_response_time': summary['avg'],
+            'p50': summary['p50'],
+            'p95': summary['p95'],
+            'p99': summary['p99'],
+        })
+        latency_sum += summary['sum']
+    return {
+        'uptime': time.time() - START_TIME,
+        'total_requests': total,
+        'successful_requests': success,
+        'failed_requests': fail,
+        'avg_response_time': latency_sum / total if total else 0,
+        'requests_by_type': by_route,
+        'image_stats': image_stats.snapshot(),
+    }
+
+# 映射目录和图片目录的缓存索引，只有目录内容变化（新增/删除文件）时才重新扫描
+MAPPING_DIR = os.path.abspath(os.path.join(BASE_DIR, '../../cache/mappings'))
+mapping_index = DirectoryIndex(MAPPING_DIR, latest_mapping_file)
+images_index = DirectoryIndex(IMG_DIR, scan_images)
 
-MAPPING_PATH = get_latest_mapping_file()
-app.logger.info(f'使用映射文件: {MAPPING_PATH}')
+def current_mapping_path():
+    """当前使用的映射文件（最新的 *_mapping.json），生成新字体的映射后无需重启即可切换"""
+    return mapping_index.get()[1]
+
+app.logger.info(f'使用映射文件: {current_mapping_path()}')
 
 @app.route('/')
 def index():
     app.logger.info("请求主页面")
     return send_from_directory(BASE_DIR, 'ocr_review.html')
 
+# 每个映射文件一个MappingStore，按字修改只追加日志
+_mapping_stores = {}
+_mapping_stores_lock = threading.Lock()
+
+def current_mapping_store():
+    """当前映射文件对应的MappingStore，没有映射文件时返回None"""
+    mapping_path = current_mapping_path()
+    if not mapping_path or not os.path.exists(mapping_path):
+        return None
+    with _mapping_stores_lock:
+        store = _mapping_stores.get(mapping_path)
+        if store is None:
+            store = _mapping_stores[mapping_path] = MappingStore(mapping_path)
+        return store
+
 @app.route('/mapping.json')
 def get_mapping():
-    if not MAPPING_PATH or not os.path.exists(MAPPING_PATH):
-        app.logger.error(f"映射文件不存在: {MAPPING_PATH}")
+    store = current_mapping_store()
+    if store is None:
+        app.logger.error(f"映射文件不存在: {current_mapping_path()}")
         # 如果映射文件不存在，返回404错误
         return jsonify({'error': 'Mapping file not found'}), 404
     
-    app.logger.info(f'提供映射文件: {MAPPING_PATH}')
-    return send_from_directory(os.path.dirname(MAPPING_PATH), os.path.basename(MAPPING_PATH))
+    # 包含尚未合并进文件的编辑
+    version, mapping = store.snapshot()
+    app.logger.info(f'提供映射文件: {store.mapping_path}')
+    etag = f"mapping-{current_font_hash()}-{int(START_TIME)}-{version}"
+    return _cached_response(dumps(mapping, pretty=False), 'application/json', etag,
+                            cache_control='no-cache')
+
+@app.route('/mapping', methods=['PATCH'])
+def patch_mapping():
+    """
+    按字修改映射：请求体为 {加密字符或U+编码: 真实字符或null}，只追加编辑日志
+    """
+    store = current_mapping_store()
+    if store is None:
+        return jsonify({'error': 'Mapping file not found'}), 404
+    edits = request.get_json(silent=True)
+    if not isinstance(edits, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    try:
+        changes = store.apply(edits)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    app.logger.info(f"按字修改映射: 提交 {len(edits)} 项，实际变更 {len(changes)} 项")
+    return jsonify({'status': 'ok', 'changed': len(changes), 'version': store.version})
 
 @app.route('/save', methods=['POST'])
 def save_mapping():
-    if not MAPPING_PATH:
+    store = current_mapping_store()
+    if store is None:
         app.logger.error("没有配置映射文件路径")
         return jsonify({'error': 'No mapping file configured'}), 500
         
     try:
-        data = request.get_json()
+        data = loads(request.get_data())
+    except ValueError:
+        return jsonify({'error': 'Request body must be valid JSON'}), 400
+    if not isinstance(data, dict) or not all(isinstance(value, str) for value in data.values()):
+        return jsonify({'error': 'Request body must be a JSON object of strings'}), 400
+    try:
         app.logger.info(f"保存映射数据，包含 {len(data)} 个项目")
-        
-        with open(MAPPING_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 整体替换：原子写入映射文件并清空编辑日志
+        store.replace_all(data)
         return {'status': 'ok'}
     except Exception as e:
         app.logger.error(f"保存映射时出错: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# 精灵图缓存: {font_hash: (png_bytes, index_dict)}
+_sprite_cache = {}
+_sprite_lock = threading.Lock()
+
+def current_font_hash():
+    """从映射文件名 <hash>_mapping.json 中取字体哈希"""
+    mapping_path = current_mapping_path()
+    if not mapping_path:
+        return None
+    name = os.path.basename(mapping_path)
+    return name[:-len('_mapping.json')] if name.endswith('_mapping.json') else name
+
+def sprite_version(font_hash):
+    """
+    精灵图版本：从字体渲染时为 <hash>-font；字体缺失、由 ocr_chars 图片拼接时随图片目录变化
+    """
+    if os.path.exists(os.path.join(FONT_DIR, f"{font_hash}.otf")):
+        return f"{font_hash}-font"
+    images_version, _ = images_index.get()
+    return f"{font_hash}-images-{images_version}"
+
+def build_sprite(font_hash, version):
+    """
+    生成当前字体所有字形的精灵图，优先从字体文件渲染，字体缺失时拼接 ocr_chars 中已有的图片
+    返回 (png_bytes, index)
+    """
+    from PIL import Image
+    chars = list(load_json(current_mapping_path()).keys())
+    font_path = os.path.join(FONT_DIR, f"{font_hash}.otf")
+    if version.endswith('-font'):
+        img, positions = render_sprite_sheet(font_path, chars, img_size=SPRITE_CELL, font_size=SPRITE_FONT_SIZE,
+                                             cols=SPRITE_COLS)
+    else:
+        app.logger.warning(f"字体文件不存在，使用已有字符图片拼接精灵图: {font_path}")
+        cols = max(1, min(SPRITE_COLS, len(chars)))
+        rows = max(1, (len(chars) + cols - 1) // cols)
+        img = Image.new('L', (cols * SPRITE_CELL, rows * SPRITE_CELL), color=255)
+        positions = {}
+        for i, char in enumerate(chars):
+            file_path = os.path.join(IMG_DIR, f"U{ord(char):04X}.png")
+            if not os.path.exists(file_path):
+                continue
+            row, col = divmod(i, cols)
+            with Image.open(file_path) as glyph:
+                img.paste(glyph.convert('L').resize((SPRITE_CELL, SPRITE_CELL)), (col * SPRITE_CELL, row * SPRITE_CELL))
+            positions[char] = (col * SPRITE_CELL, row * SPRITE_CELL)
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    index = {
+        'font_hash': font_hash,
+        'version': version,
+        'cell': SPRITE_CELL,
+        'width': img.width,
+        'height': img.height,
+        'sprite': f'/sprite.png?v={version}',
+        'glyphs': {f"U{ord(char):04X}": list(pos) for char, pos in positions.items()},
+    }
+    return buf.getvalue(), index
+
+def get_sprite():
+    """按精灵图版本缓存，字体（或拼接用的图片）不变时只生成一次"""
+    font_hash = current_font_hash()
+    version = sprite_version(font_hash)
+    with _sprite_lock:
+        if version not in _sprite_cache:
+            start = time.time()
+            _sprite_cache.clear()
+            _sprite_cache[version] = build_sprite(font_hash, version)
+            app.logger.info(f"生成精灵图: {version}，{len(_sprite_cache[version][1]['glyphs'])} 个字形，"
+                            f"用时 {time.time() - start:.3f}秒")
+        return _sprite_cache[version]
+
+def _cached_response(body, mimetype, etag, cache_control='public, max-age=86400'):
+    """带强ETag的响应，If-None-Match命中时返回304"""
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+@app.route('/sprite.png')
+def get_sprite_png():
+    """当前字体所有字形的精灵图"""
+    mapping_path = current_mapping_path()
+    if not mapping_path or not os.path.exists(mapping_path):
+        return jsonify({'error': 'Mapping file not found'}), 404
+    png, index = get_sprite()
+    requested = request.args.get('v')
+    if requested and requested != index['version']:
+        # 字体已轮换：旧版本的索引与当前精灵图不对应
+        return jsonify({'error': 'Sprite version is not current', 'sprite': index['sprite']}), 404
+    # 带版本号的地址内容不变，可以长期缓存；不带版本号的每次校验ETag
+    cache_control = 'public, max-age=86400, immutable' if requested else 'no-cache'
+    return _cached_response(png, 'image/png', f"sprite-{index['version']}-{SPRITE_CELL}", cache_control=cache_control)
+
+@app.route('/sprite.json')
+def get_sprite_index():
+    """精灵图索引：每个字形在精灵图中的偏移"""
+    mapping_path = current_mapping_path()
+    if not mapping_path or not os.path.exists(mapping_path):
+        return jsonify({'error': 'Mapping file not found'}), 404
+    _, index = get_sprite()
+    # 地址不带版本号，字体轮换后必须重新校验，否则页面会用旧索引显示新映射
+    return _cached_response(dumps(index, pretty=False), 'application/json',
+                            f"index-{index['version']}-{SPRITE_CELL}", cache_control='no-cache')
+
 @app.route('/ocr_chars/<path:filename>')
 def get_image(filename):
-    global performance_stats
-    
     file_path = os.path.join(IMG_DIR, filename)
     app.logger.info(f"请求图片: {filename}, 完整路径: {file_path}")
     
     # 记录图片统计
-    if filename not in performance_stats['image_stats']:
-        performance_stats['image_stats'][filename] = {
-            'requests': 0, 
-            'success': 0, 
-            'fail': 0,
-            'last_request': None
-        }
-    
-    performance_stats['image_stats'][filename]['requests'] += 1
-    performance_stats['image_stats'][filename]['last_request'] = datetime.datetime.now().isoformat()
+    image_stats.record(filename, 'requests', datetime.datetime.now().isoformat())
     
     if not os.path.exists(file_path):
         app.logger.error(f"图片不存在: {file_path}")
-        performance_stats['image_stats'][filename]['fail'] += 1
+        image_stats.record(filename, 'fail')
         # 如果图片不存在，返回404错误
         return jsonify({'error': 'Image not found'}), 404
     
@@ -147,72 +338,170 @@ def get_image(filename):
         # 确保PNG文件使用正确的MIME类型
         if filename.lower().endswith('.png'):
             app.logger.info(f"返回PNG图片: {filename}, 大小: {os.path.getsize(file_path)}字节")
-            performance_stats['image_stats'][filename]['success'] += 1
+            image_stats.record(filename, 'success')
             return send_file(file_path, mimetype='image/png')
         else:
             app.logger.info(f"返回文件: {filename}, 大小: {os.path.getsize(file_path)}字节")
-            performance_stats['image_stats'][filename]['success'] += 1
+            image_stats.record(filename, 'success')
             return send_from_directory(IMG_DIR, filename)
     except Exception as e:
         app.logger.error(f"发送图片时出错 {filename}: {str(e)}")
-        performance_stats['image_stats'][filename]['fail'] += 1
+        image_stats.record(filename, 'fail')
         return jsonify({'error': f'Error serving image: {str(e)}'}), 500
 
 @app.route('/stats')
 def get_stats():
     """提供服务器性能统计数据"""
-    return jsonify(performance_stats)
+    return jsonify(performance_stats())
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus 文本格式的指标"""
+    lines = requests_total.prometheus() + request_latency.prometheus()
+    lines += [
+        '# HELP ocr_review_image_stats_entries 当前保留的图片统计条目数',
+        '# TYPE ocr_review_image_stats_entries gauge',
+        f'ocr_review_image_stats_entries {len(image_stats)}',
+        '# HELP ocr_review_uptime_seconds 服务器运行时间',
+        '# TYPE ocr_review_uptime_seconds gauge',
+        f'ocr_review_uptime_seconds {time.time() - START_TIME}',
+    ]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def get_health():
+    """存活检查：返回实例令牌和进程号"""
+    return jsonify({'status': 'ok', 'token': INSTANCE_TOKEN, 'pid': os.getpid()})
+
+# 可通过 /logs?file=<name> 查看的日志文件
+LOG_FILES = {
+    'ocr_server': log_file,
+    'font_decoder': os.path.join(LOG_DIR, 'font_decoder.log'),
+}
+# SSE 连接空闲时发送心跳的间隔（秒）
+SSE_HEARTBEAT = 15
+# 每个SSE连接最长保持的时间（秒），到期后断开，浏览器按 retry 间隔带 Last-Event-ID 自动重连并从断点继续，
+# 避免日志页面长期占用服务器的工作线程
+SSE_MAX_DURATION = 300
+SSE_RETRY_MS = 1000
+# 同时打开的SSE连接上限，超过时返回503；serve() 按工作线程数调整为一半，保证其余请求有线程可用
+SSE_MAX_STREAMS = 4
+_sse_lock = threading.Lock()
+_sse_active = 0
+
+def _acquire_stream_slot():
+    global _sse_active
+    with _sse_lock:
+        if _sse_active >= SSE_MAX_STREAMS:
+            return False
+        _sse_active += 1
+        return True
+
+def _release_stream_slot():
+    global _sse_active
+    with _sse_lock:
+        _sse_active -= 1
+
+def parse_event_id(value):
+    """
+    解析 Last-Event-ID（"<inode>:<offset>"），无效时返回None
+    """
+    try:
+        inode, offset = (int(part) for part in (value or '').split(':'))
+    except ValueError:
+        return None
+    return inode, offset
+
+def _requested_log_file():
+    name = request.args.get('file', 'ocr_server')
+    return LOG_FILES.get(name)
 
 @app.route('/logs')
 def get_logs():
     """查看最新的日志"""
+    path = _requested_log_file()
+    if not path:
+        return jsonify({'error': 'Unknown log file', 'available': sorted(LOG_FILES)}), 404
     try:
-        with open(log_file, 'r') as f:
-            # 返回最后100行日志
-            lines = f.readlines()[-100:]
-            return jsonify({
-                'log_file': log_file,
-                'lines': lines
-            })
+        lines = tail_lines(path, request.args.get('lines', 100, type=int))
+        return jsonify({
+            'log_file': path,
+            'lines': lines
+        })
     except Exception as e:
         return jsonify({'error': f'Error reading logs: {str(e)}'}), 500
 
+@app.route('/logs/stream')
+def stream_logs():
+    """
+    以 server-sent events 实时推送日志：先发送最后N行，再持续推送新增行
+    每条事件的 id 为 "<inode>:<offset>"；连接保持 SSE_MAX_DURATION 秒后断开，
+    浏览器重连时带 Last-Event-ID，从断点继续推送（不再重复发送积压行）
+    """
+    path = _requested_log_file()
+    if not path:
+        return jsonify({'error': 'Unknown log file', 'available': sorted(LOG_FILES)}), 404
+    backlog = request.args.get('lines', 100, type=int)
+    start = parse_event_id(request.headers.get('Last-Event-ID'))
+    if not _acquire_stream_slot():
+        response = jsonify({'error': 'Too many log streams', 'limit': SSE_MAX_STREAMS})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_MAX_DURATION // 10)
+        return response
+    deadline = time.time() + SSE_MAX_DURATION
+
+    def events():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        # 先定位到文件末尾再读取积压行，两者之间写入的行不会丢失
+        new_lines = follow(path, heartbeat=SSE_HEARTBEAT, start=start, positions=True,
+                           should_stop=lambda: time.time() >= deadline)
+        # 重连时从断点继续，不再发送积压行
+        send_backlog = start is None
+        for line, inode, offset in new_lines:
+            if line is None:
+                if send_backlog and os.path.exists(path):
+                    for backlog_line in tail_lines(path, backlog):
+                        yield f"data: {backlog_line.rstrip()}\n\n"
+                send_backlog = False
+                # 只带 id 的空事件：更新浏览器记录的断点，同时作为心跳
+                yield f"id: {inode or 0}:{offset}\n\n"
+            else:
+                yield f"id: {inode}:{offset}\ndata: {line.rstrip()}\n\n"
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.call_on_close(_release_stream_slot)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/images')
 def get_images_list():
-    """获取图片目录中的所有图片信息，供测试页面使用"""
+    """
+    获取图片目录中的所有图片信息，供测试页面使用
+    列表来自缓存的目录索引，带ETag，目录未变化时返回304；?stats=1 时附带每张图片的请求统计（不缓存）
+    """
     try:
-        # 获取图片文件列表
-        image_files = [f for f in os.listdir(IMG_DIR) if f.lower().endswith('.png')]
-        
-        # 构建图片信息列表
-        images_info = []
-        for filename in sorted(image_files):
-            file_path = os.path.join(IMG_DIR, filename)
-            stat = os.stat(file_path)
-            
-            # 从性能统计中获取该图片的请求记录
-            stats = performance_stats['image_stats'].get(filename, {
-                'requests': 0,
-                'success': 0,
-                'fail': 0,
-                'last_request': None
-            })
-            
-            images_info.append({
-                'filename': filename,
-                'path': f'/ocr_chars/{filename}',
-                'size': stat.st_size,
-                'modified': datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'unicode': filename[1:-4],  # 从文件名中提取Unicode编码，例如UE51D.png -> E51D
-                'stats': stats
-            })
-        
-        app.logger.info(f"获取图片列表: 共 {len(images_info)} 张图片")
-        return jsonify({
-            'total': len(images_info),
-            'images': images_info,
-            'base_url': request.host_url.rstrip('/'),
-        })
+        version, images = images_index.get()
+        base_url = request.host_url.rstrip('/')
+        with_stats = request.args.get('stats', type=int) == 1
+        # base_url 随访问地址变化，一并计入ETag
+        etag = f"images-{version}-{zlib.crc32(base_url.encode('utf-8')):08x}"
+        if not with_stats and request.if_none_match.contains_weak(etag):
+            # 目录未变化，无需重新序列化列表
+            return _cached_response(b'', 'application/json', etag, cache_control='no-cache')
+        if with_stats:
+            # 从性能统计中获取每张图片的请求记录
+            default = {'requests': 0, 'success': 0, 'fail': 0, 'last_request': None}
+            images = [dict(item, stats=image_stats.get(item['filename'], default)) for item in images]
+        body = dumps({
+            'total': len(images),
+            'images': images,
+            'base_url': base_url,
+        }, pretty=False)
+        app.logger.info(f"获取图片列表: 共 {len(images)} 张图片")
+        if with_stats:
+            return Response(body, mimetype='application/json')
+        return _cached_response(body, 'application/json', etag, cache_control='no-cache')
     except Exception as e:
         app.logger.error(f"获取图片列表出错: {str(e)}")
         return jsonify({'error': f'Error getting images list: {str(e)}'}), 500
@@ -222,9 +511,48 @@ def image_test_page():
     """提供图片加载测试页面"""
     return send_from_directory(BASE_DIR, 'image_test.html')
 
-if __name__ == '__main__':
+def serve(host='127.0.0.1', port=5001, threads=8, debug=False):
+    """
+    启动服务器：调试模式使用Flask开发服务器；否则优先使用waitress，未安装时使用werkzeug多线程服务器
+    """
     # 确保正确识别MIME类型
+    global SSE_MAX_STREAMS
+    # 日志流最多占用一半工作线程
+    SSE_MAX_STREAMS = max(1, threads // 2)
     mimetypes.add_type('image/png', '.png')
     app.logger.info(f"启动服务器，图片目录: {IMG_DIR}")
     app.logger.info(f"已配置MIME类型: image/png -> .png")
-    app.run(port=5001, debug=True) 
\ No newline at end of file
+    if debug:
+        app.run(host=host, port=port, debug=True, threaded=True)
+        return
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        waitress_serve = None
+    if waitress_serve is not None:
+        app.logger.info(f"使用waitress服务: http://{host}:{port}/，线程数 {threads}")
+        waitress_serve(app, host=host, port=port, threads=threads)
+    else:
+        from werkzeug.serving import make_server
+        server = make_server(host, port, app, threaded=True)
+        app.logger.info(f"使用werkzeug多线程服务: http://{host}:{port}/（安装waitress可获得更好的并发性能）")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+def main():
+    """
+    命令行入口
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='OCR校验服务器')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=5001, help='监听端口')
+    parser.add_argument('--threads', type=int, default=8, help='waitress工作线程数')
+    parser.add_argument('--debug', action='store_true', help='使用Flask开发服务器（自动重载、调试页面）')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.threads, args.debug)
+
+if __name__ == '__main__':
+    main()